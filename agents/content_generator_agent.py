@@ -1,80 +1,134 @@
-from typing import Any
+from typing import Any, AsyncIterator, Optional
 from crewai import Agent
-import json
-from models.task_outputs import ContentOutput, SearchOutput
-from rich.console import Console
+import logging
+import textwrap
+import litellm
+from config.settings import (
+    GROQ_API_KEY, GROQ_MODEL_NAME, PROMPT_SEARCH_TOKEN_BUDGET, PROMPT_MAX_STEPS_PER_RECIPE,
+    PROMPT_MAX_STEP_CHARS
+)
+from models.task_outputs import ContentOutput, SearchOutput, ContentStreamEvent
+from tools.llm_client import LLMClient
+from utils.incremental_json import IncrementalJSONFieldParser
+from utils.json_repair import parse_model
+from utils.prompt_budget import CompactedSearchResults, compact_search_results, record_compaction
+from utils.logging_setup import crew_verbose
 
-console = Console()
+logger = logging.getLogger(__name__)
 
 class ContentGeneratorAgent:
     """
     Agent responsible for generating SEO-optimized food recipe content based on search results.
     """
 
-    def __init__(self, llm: Any):
+    def __init__(self, llm: Any, llm_client: Optional[LLMClient] = None):
         """
         Initialize the ContentGeneratorAgent.
 
         Args:
             llm (Any): The language model to use for the agent.
+            llm_client (Optional[LLMClient]): Shared client that rate limits, retries and
+                falls back to other models for direct LLM calls.
         """
+        self.model_name = getattr(llm, 'model_name', None) or GROQ_MODEL_NAME
+        self.llm_client = llm_client
         self.agent = Agent(
             name="Content Generator",
             role='Food Recipe Content Creator',
             goal='Generate SEO-optimized, beautiful food recipe content based on search results',
             backstory='I am an expert content writer specializing in food recipes, with a keen eye for SEO optimization.',
             llm=llm,
-            verbose=True
+            verbose=crew_verbose()
         )
 
-    def generate_content(self, search_results: SearchOutput, keywords: str) -> ContentOutput:
+    def compact_search_results(self, search_results: SearchOutput, keywords: str) -> CompactedSearchResults:
         """
-        Generate SEO-optimized content based on search results and keywords.
+        Render search results as compact JSON within the prompt token budget and record
+        the tokens saved.
 
         Args:
             search_results (SearchOutput): The search results containing recipes.
             keywords (str): The keywords used for the search.
 
         Returns:
-            ContentOutput: The generated content for the recipe.
+            CompactedSearchResults: The rendered results and their token counts.
+        """
+        compacted = compact_search_results(
+            search_results,
+            budget=PROMPT_SEARCH_TOKEN_BUDGET,
+            max_steps=PROMPT_MAX_STEPS_PER_RECIPE,
+            max_step_chars=PROMPT_MAX_STEP_CHARS
+        )
+        record_compaction(keywords, compacted)
+        return compacted
+
+    def build_prompt(self, search_results: SearchOutput, keywords: str) -> str:
         """
-        console.log(f"[bold blue]Generating content for keywords: {keywords}[/bold blue]")
-        task = f"""
-        Your task is to create an SEO-optimized food recipe article based on the following recipes for '{keywords}':
-        {json.dumps(search_results.dict(), indent=2)}
+        Build the content generation prompt for the given search results.
+
+        Args:
+            search_results (SearchOutput): The search results containing recipes.
+            keywords (str): The keywords used for the search.
+
+        Returns:
+            str: The prompt text.
+        """
+        recipes = self.compact_search_results(search_results, keywords).text
+        return textwrap.dedent(f"""
+        Your task is to create an SEO-optimized food recipe article based on the following recipes for '{keywords}'.
+        The recipes share one deduplicated ingredient list:
+        {recipes}
 
         Follow these steps:
         1. Analyze the provided recipes and create a unified article.
         2. Format your response as a JSON string with the following structure:
-        {{
-            "title": "Article Title",
-            "introduction": "Introduction text",
-            "ingredients": ["ingredient1", "ingredient2", ...],
-            "instructions": ["step1", "step2", ...],
-            "nutritional_info": "Nutritional information text",
-            "tips_and_variations": "Tips and variations text",
-            "conclusion": "Conclusion text",
-            "seo_optimized_text": "SEO-optimized meta description"
-        }}
+        {{"title": "Article Title", "introduction": "Introduction text", "ingredients": ["ingredient1", ...], "instructions": ["step1", ...], "nutritional_info": "Nutritional information text", "tips_and_variations": "Tips and variations text", "conclusion": "Conclusion text", "seo_optimized_text": "SEO-optimized meta description"}}
         3. Ensure the content is well-structured, easy to read, and optimized for search engines.
         4. The content should be relevant to '{keywords}'.
         5. Do not include any additional text or explanations outside of the JSON structure.
         6. Ensure that all JSON fields are present, even if some are empty strings.
+        """).strip()
+
+    def generate_content(self, search_results: SearchOutput, keywords: str) -> ContentOutput:
         """
-        response = self.agent.execute(task)
+        Generate SEO-optimized content based on search results and keywords.
 
-        try:
-            content_data = json.loads(response)
-            content_output = ContentOutput(**content_data)
-            console.log(f"[bold green]Content generation successful for '{keywords}'.[/bold green]")
+        Args:
+            search_results (SearchOutput): The search results containing recipes.
+            keywords (str): The keywords used for the search.
+
+        Returns:
+            ContentOutput: The generated content for the recipe.
+        """
+        logger.info(f"Generating content for keywords: {keywords}")
+        prompt = self.build_prompt(search_results, keywords)
+        if self.llm_client:
+            # The agent is bound to its own model, so only retries and rate limiting apply
+            response = self.llm_client.call(lambda _model: self.agent.execute(prompt),
+                                            stage="content_task", models=[self.model_name], scope="crew")
+        else:
+            response = self.agent.execute(prompt)
+
+        content_output = parse_model(response, ContentOutput)
+        if content_output is not None:
+            logger.info(f"Content generation successful for '{keywords}'")
             return content_output
-        except json.JSONDecodeError as e:
-            console.print(f"[bold red]Failed to parse JSON: {str(e)}[/bold red]")
-            console.print(f"Raw response: {response}")
-        except Exception as e:
-            console.print(f"[bold red]Failed to process content generation results: {str(e)}[/bold red]")
+        logger.error("Failed to parse content generation results as ContentOutput")
+        logger.debug("Raw response: %s", response)
 
         # Return a default ContentOutput if parsing fails
+        return self.default_content(keywords)
+
+    def default_content(self, keywords: str) -> ContentOutput:
+        """
+        Placeholder content used when the model's response cannot be parsed.
+
+        Args:
+            keywords (str): The keywords used for the search.
+
+        Returns:
+            ContentOutput: Content with only the title and default SEO text set.
+        """
         return ContentOutput(
             title=f"Recipe for {keywords}",
             introduction="Unable to generate content",
@@ -84,4 +138,58 @@ class ContentGeneratorAgent:
             tips_and_variations="",
             conclusion="",
             seo_optimized_text="Default SEO text"
-        )
\ No newline at end of file
+        )
+
+    async def stream_content(self, search_results: SearchOutput, keywords: str) -> AsyncIterator[ContentStreamEvent]:
+        """
+        Stream content generation, yielding tokens and ContentOutput fields as they complete.
+
+        The prompt is sent straight to the model with streaming enabled rather than through
+        the crew, so callers see the first tokens instead of waiting for the whole article.
+
+        Args:
+            search_results (SearchOutput): The search results containing recipes.
+            keywords (str): The keywords used for the search.
+
+        Yields:
+            ContentStreamEvent: "token" events for raw text, "field" events for each completed
+            top-level field, then one "done" event with the validated ContentOutput, marked
+            `failed` when the response could not be parsed.
+        """
+        logger.info(f"Streaming content for keywords: {keywords}")
+        parser = IncrementalJSONFieldParser()
+        chunks = []
+        messages = [{"role": "user", "content": self.build_prompt(search_results, keywords)}]
+        model = self.model_name
+        if self.llm_client:
+            response, model = await self.llm_client.acompletion(messages, stage="content_stream", stream=True,
+                                                                with_model=True)
+        else:
+            response = await litellm.acompletion(
+                model=self.model_name,
+                api_key=GROQ_API_KEY,
+                messages=messages,
+                stream=True
+            )
+        async for chunk in response:
+            token = chunk.choices[0].delta.content or ""
+            if not token:
+                continue
+            chunks.append(token)
+            yield ContentStreamEvent(kind="token", token=token)
+            for field, value in parser.feed(token):
+                yield ContentStreamEvent(kind="field", field=field, value=value)
+
+        try:
+            content_output = ContentOutput(**parser.fields)
+        except Exception:
+            # The incremental parser only sees well-formed fields; repair the full text instead
+            content_output = parse_model("".join(chunks), ContentOutput)
+        failed = content_output is None
+        if failed:
+            logger.error(f"Failed to process streamed content for '{keywords}'")
+            content_output = self.default_content(keywords)
+        else:
+            logger.info(f"Content generation successful for '{keywords}'")
+        yield ContentStreamEvent(kind="done", token="".join(chunks), content=content_output, model=model,
+                                 failed=failed)
@@ -1,28 +1,31 @@
-from typing import Any
+import logging
+from typing import Any, Optional
 from crewai import Agent
-from crewai_tools import SerperDevTool
-from config.settings import SERPER_API_KEY
-from models.task_outputs import SearchOutput, Recipe
-from rich.console import Console
-import json
+from config.settings import SERPER_API_KEY, SEARCH_MAX_RESULTS
+from models.task_outputs import SearchOutput
+from tools.recipe_search_tool import RecipeSearchTool
+from tools.search_cache import SearchCache
+from utils.logging_setup import crew_verbose
 
-console = Console()
+logger = logging.getLogger(__name__)
 
 class InternetSearchAgent:
     """
     Agent responsible for searching the internet for recipes based on user keywords.
     """
 
-    def __init__(self, llm: Any, max_results: int = 1):
+    def __init__(self, llm: Any, max_results: int = SEARCH_MAX_RESULTS, search_cache: Optional[SearchCache] = None):
         """
         Initialize the InternetSearchAgent.
 
         Args:
             llm (Any): The language model to use for the agent.
             max_results (int): Maximum number of recipes to return.
+            search_cache (Optional[SearchCache]): Cache of parsed search results.
         """
-        self.search_tool = SerperDevTool(api_key=SERPER_API_KEY)
+        self.search_tool = RecipeSearchTool(api_key=SERPER_API_KEY, max_results=max_results)
         self.max_results = max_results
+        self.search_cache = search_cache
         self.agent = Agent(
             name="Internet Researcher",
             role='Internet Researcher',
@@ -30,59 +33,35 @@ class InternetSearchAgent:
             backstory='I am an expert at searching the internet for specific food recipes and extracting relevant information.',
             tools=[self.search_tool],
             llm=llm,
-            verbose=True
+            verbose=crew_verbose()
         )
 
-    def search_recipes(self, keywords: str) -> SearchOutput:
+    def search_recipes(self, keywords: str, refresh: bool = False) -> SearchOutput:
         """
         Search for recipes based on the given keywords.
 
         Args:
             keywords (str): The keywords to search for.
+            refresh (bool): Skip the search cache and run the search again; the fresh
+                results still replace the cached ones.
 
         Returns:
             SearchOutput: The search results containing recipes.
         """
-        console.log(f"[bold blue]Searching for recipes with keywords: {keywords}[/bold blue]")
-        task = f"""
-        Your task is to search for recipes related to '{keywords}'. Follow these steps precisely:
-        1. Use the search tool to find relevant recipes.
-        2. Extract information for the top {self.max_results} recipe(s).
-        3. For each recipe, extract the title, ingredients, instructions, and source URL.
-        4. Format the information exactly as shown below:
-
-        Thought: [Your thought process here]
-        Action: [The action you are taking]
-        Action Input: [Input for the action]
-        ```
-
-        ```json
-        {{
-            "recipes": [
-                {{
-                    "title": "Recipe Title",
-                    "ingredients": ["ingredient1", "ingredient2", ...],
-                    "instructions": ["step1", "step2", ...],
-                    "source": "URL of the recipe"
-                }}
-            ]
-        }}
-        ```
-        
-        5. Ensure the JSON is valid and adhere strictly to the structure.
-        6. Do not include any additional text or explanations outside of the JSON structure.
-        """
-        response = self.agent.execute(task)
+        if self.search_cache and not refresh:
+            cached = self.search_cache.get(keywords)
+            if cached:
+                logger.info(f"Using {len(cached.recipes)} cached recipes for '{keywords}'")
+                return cached
 
+        logger.info(f"Searching for recipes with keywords: {keywords}")
+        # One Serper query and parallel page extraction; the LLM is not involved
         try:
-            recipes_data = json.loads(response)
-            search_output = SearchOutput(**recipes_data)
-            console.log(f"[bold green]Successfully fetched {len(search_output.recipes)} recipes.[/bold green]")
-            return search_output
-        except json.JSONDecodeError as e:
-            console.print(f"[bold red]Failed to parse JSON: {str(e)}[/bold red]")
-            console.print(f"Raw response: {response}")
-            return SearchOutput(recipes=[])
+            search_output = self.search_tool.search(keywords)
         except Exception as e:
-            console.print(f"[bold red]Failed to process search results: {str(e)}[/bold red]")
-            return SearchOutput(recipes=[])
\ No newline at end of file
+            logger.error(f"Failed to search for recipes: {str(e)}")
+            return SearchOutput(recipes=[])
+        logger.info(f"Fetched {len(search_output.recipes)} recipes for '{keywords}'")
+        if self.search_cache and search_output.recipes:
+            self.search_cache.put(keywords, search_output)
+        return search_output
@@ -0,0 +1,104 @@
+"""
+Throughput of the resilient LLM client against a rate-limited local fake Groq server.
+
+Fires the same burst of completions straight through litellm and through LLMClient,
+and reports how many succeeded and the achieved rate against the server's quota. A
+second LLMClient run marks the primary model as failing to exercise circuit breaking
+and fallback.
+
+Usage:
+    python benchmarks/bench_llm_client.py --requests 60 --concurrency 20 --rpm 120
+"""
+
+import argparse
+import asyncio
+import os
+import sys
+import threading
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault("GROQ_API_KEY", "bench")
+os.environ.setdefault("LITELLM_LOCAL_MODEL_COST_MAP", "True")
+
+import litellm
+
+from benchmarks.fake_groq_server import create_server
+from tools.llm_client import LLMClient
+
+PRIMARY = "groq/llama-3.1-8b-instant"
+FALLBACK = "groq/llama-3.3-70b-versatile"
+MESSAGES = [{"role": "user", "content": "Say hi"}]
+
+
+async def burst(call, requests, concurrency):
+    semaphore = asyncio.Semaphore(concurrency)
+    outcomes = {"ok": 0, "failed": 0}
+
+    async def one():
+        async with semaphore:
+            try:
+                await call()
+                outcomes["ok"] += 1
+            except Exception:
+                outcomes["failed"] += 1
+
+    start = time.perf_counter()
+    await asyncio.gather(*(one() for _ in range(requests)))
+    wall = time.perf_counter() - start
+    return {**outcomes, "wall_s": round(wall, 2), "ok_per_min": round(outcomes["ok"] / wall * 60, 1)}
+
+
+def run_server(**kwargs):
+    server = create_server(**kwargs)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, f"http://127.0.0.1:{server.server_port}/openai/v1"
+
+
+async def run(args):
+    results = {}
+
+    server, api_base = run_server(rpm=args.rpm, error_rate=args.error_rate)
+    results["litellm (no retries)"] = await burst(
+        lambda: litellm.acompletion(model=PRIMARY, messages=MESSAGES, api_key="bench",
+                                    api_base=api_base, num_retries=0),
+        args.requests, args.concurrency
+    )
+    server.shutdown()
+
+    server, api_base = run_server(rpm=args.rpm, error_rate=args.error_rate)
+    # Start from a deliberately wrong quota so the headers have to correct it
+    client = LLMClient(models=[PRIMARY], api_key="bench", api_base=api_base,
+                       requests_per_minute=args.rpm * 4, tokens_per_minute=10 ** 9, max_attempts=8)
+    results["LLMClient"] = await burst(lambda: client.acompletion(MESSAGES), args.requests, args.concurrency)
+    results["LLMClient"]["server"] = dict(server.stats)
+    client.close()
+    server.shutdown()
+
+    server, api_base = run_server(rpm=args.rpm, failing_models=(PRIMARY.split("/", 1)[1],))
+    client = LLMClient(models=[PRIMARY, FALLBACK], api_key="bench", api_base=api_base,
+                       requests_per_minute=args.rpm, tokens_per_minute=10 ** 9, breaker_threshold=3)
+    results["LLMClient with fallback"] = await burst(lambda: client.acompletion(MESSAGES), args.requests // 2,
+                                                     args.concurrency)
+    results["LLMClient with fallback"]["breakers"] = client.stats()["breakers"]
+    client.close()
+    server.shutdown()
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description="LLM client throughput against a rate-limited fake Groq server")
+    parser.add_argument("--requests", type=int, default=60)
+    parser.add_argument("--concurrency", type=int, default=20)
+    parser.add_argument("--rpm", type=int, default=120, help="Fake server quota, requests per minute")
+    parser.add_argument("--error-rate", type=float, default=0.05, help="Share of requests answered with 503")
+    args = parser.parse_args()
+
+    results = asyncio.run(run(args))
+    print(f"Quota: {args.rpm} requests/min, {args.requests} requests at concurrency {args.concurrency}")
+    for name, result in results.items():
+        print(f"{name:28} {result}")
+
+
+if __name__ == "__main__":
+    main()
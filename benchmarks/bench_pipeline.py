@@ -0,0 +1,360 @@
+"""
+Pipeline overhead benchmark with local stand-ins for Groq, Serper and MongoDB.
+
+The real crew is built through initialize_llm/initialize_agents/create_recipe_crew and
+driven through process_keyword_async, so everything except the network is exercised:
+crew orchestration, output parsing, Pydantic validation and the write-behind queue.
+LLM calls are answered by litellm's mock_response after a configurable delay, Serper and
+the recipe pages by a RecipeSearchTool subclass returning canned links and JSON-LD pages
+(so the parallel fetch and extraction still run), and MongoDB by mongomock (or an
+in-memory stand-in when mongomock is not installed). --database sqlite stores into a
+temporary SQLite file through the real SQLite backend instead.
+
+Usage:
+    python benchmarks/bench_pipeline.py --keywords 50 --concurrency 1 8 32 --profile groq
+    python benchmarks/bench_pipeline.py --profile none --json results.json
+    python benchmarks/bench_pipeline.py --database sqlite --save-iterations 10000
+    python benchmarks/bench_pipeline.py --search-mode direct   # compare with the default agent mode
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import random
+import resource
+import sys
+import tempfile
+import time
+from typing import ClassVar
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+# Keep the benchmark hermetic: no keys, no caches from earlier runs, no remote cost map
+os.environ.setdefault("GROQ_API_KEY", "bench")
+os.environ.setdefault("SERPER_API_KEY", "bench")
+os.environ.setdefault("MONGODB_URI", "mongodb://bench")
+os.environ.setdefault("LITELLM_LOCAL_MODEL_COST_MAP", "True")
+os.environ["RESULT_CACHE_ENABLED"] = "false"
+os.environ["SEARCH_CACHE_ENABLED"] = "false"
+
+import logging
+import litellm
+
+import agents.internet_search_agent as internet_search_agent
+from tools.recipe_search_tool import RecipeSearchTool
+import tools.database_handler as database_handler
+import main
+from tools.storage import open_storage
+from models.task_outputs import ContentOutput, Recipe, SearchOutput
+from utils.batch_runner import run_batch
+from utils.metrics import metrics
+
+# Simulated one-way latencies in seconds: (LLM mean, search mean)
+LATENCY_PROFILES = {
+    "none": (0.0, 0.0),
+    "fast": (0.2, 0.1),
+    "groq": (0.8, 0.4),
+    "slow": (3.0, 1.0),
+}
+
+CANNED_SEARCH = SearchOutput(recipes=[
+    Recipe(
+        title="Classic Vegan Lasagna",
+        ingredients=["lasagna noodles", "tofu ricotta", "marinara sauce", "spinach", "nutritional yeast"],
+        instructions=["Preheat the oven.", "Layer noodles, sauce and filling.", "Bake for 45 minutes."],
+        source="https://example.com/vegan-lasagna"
+    )
+])
+
+CANNED_CONTENT = ContentOutput(
+    title="The Best Vegan Lasagna",
+    introduction="A rich, layered lasagna without any dairy.",
+    ingredients=CANNED_SEARCH.recipes[0].ingredients,
+    instructions=CANNED_SEARCH.recipes[0].instructions,
+    nutritional_info="About 420 kcal per serving.",
+    tips_and_variations="Swap spinach for kale.",
+    conclusion="Serve warm with a green salad.",
+    seo_optimized_text="Easy vegan lasagna recipe with tofu ricotta."
+)
+
+
+def _jittered(mean):
+    return max(0.0, random.gauss(mean, mean * 0.2)) if mean else 0.0
+
+
+def _recipe_page(recipe):
+    ld = {
+        "@context": "https://schema.org",
+        "@graph": [{
+            "@type": "Recipe",
+            "name": recipe.title,
+            "recipeIngredient": recipe.ingredients,
+            "recipeInstructions": [{"@type": "HowToStep", "text": step} for step in recipe.instructions],
+        }],
+    }
+    return (f'<html><head><script type="application/ld+json">{json.dumps(ld)}</script></head>'
+            f'<body>{"<p>filler</p>" * 2000}</body></html>')
+
+
+CANNED_PAGE = _recipe_page(CANNED_SEARCH.recipes[0])
+
+
+class FakeRecipeSearchTool(RecipeSearchTool):
+    """RecipeSearchTool whose Serper query and page fetches return canned data after a simulated delay."""
+
+    latency: ClassVar[float] = 0.0
+
+    def search_links(self, query):
+        time.sleep(_jittered(self.latency))
+        return [f"https://example.com/recipe-{i}" for i in range(self.max_results * 2)]
+
+    def fetch_page(self, url):
+        time.sleep(_jittered(self.latency))
+        return CANNED_PAGE
+
+
+class FakeGroq:
+    """
+    Stand-in for the Groq endpoint behind ChatGroq/litellm.
+
+    Replaces litellm.completion/acompletion. The first search-task turn asks for the
+    search tool, every other turn returns the canned SearchOutput or ContentOutput as a
+    final answer. Responses are built with litellm's mock_response so callers get real
+    ModelResponse objects, including token usage.
+    """
+
+    def __init__(self, latency):
+        self.latency = latency
+        self.calls = 0
+        self._completion = litellm.completion
+        self._acompletion = litellm.acompletion
+
+    def _answer(self, messages):
+        prompt = "\n".join(str(message.get("content", "")) for message in messages)
+        if "Search for food recipes" in prompt:
+            if "Observation" not in prompt and "Search the internet" in prompt:
+                return ('Thought: I should search for recipes.\n'
+                        f'Action: {FakeRecipeSearchTool.model_fields["name"].default}\n'
+                        'Action Input: {"search_query": "recipes"}')
+            return f"Thought: I now know the final answer\nFinal Answer: {CANNED_SEARCH.json()}"
+        return f"Thought: I now know the final answer\nFinal Answer: {CANNED_CONTENT.json()}"
+
+    def completion(self, *args, **kwargs):
+        self.calls += 1
+        time.sleep(_jittered(self.latency))
+        kwargs["mock_response"] = self._answer(kwargs.get("messages", []))
+        return self._completion(*args, **kwargs)
+
+    async def acompletion(self, *args, **kwargs):
+        self.calls += 1
+        await asyncio.sleep(_jittered(self.latency))
+        kwargs["mock_response"] = self._answer(kwargs.get("messages", []))
+        return await self._acompletion(*args, **kwargs)
+
+    def install(self):
+        litellm.completion = self.completion
+        litellm.acompletion = self.acompletion
+
+
+class InMemoryCollection:
+    """Minimal stand-in for a pymongo collection when mongomock is unavailable."""
+
+    def __init__(self, name):
+        self.name = name
+        self.documents = []
+
+    def bulk_write(self, operations, ordered=True):
+        for operation in operations:
+            self.documents.append(getattr(operation, "_doc", operation))
+
+    def count_documents(self, _filter):
+        return len(self.documents)
+
+    def create_index(self, keys, **kwargs):
+        return kwargs.get("name", "")
+
+
+class InMemoryClient:
+    def __init__(self, *_args, **_kwargs):
+        self._collections = {}
+
+    def __getitem__(self, _db_name):
+        # One flat namespace is enough: client[db][collection]
+        return _InMemoryDatabase(self._collections)
+
+    def close(self):
+        pass
+
+
+class _InMemoryDatabase:
+    def __init__(self, collections):
+        self._collections = collections
+
+    def __getitem__(self, name):
+        return self._collections.setdefault(name, InMemoryCollection(name))
+
+
+def install_fake_database():
+    try:
+        import mongomock
+        database_handler.MongoClient = mongomock.MongoClient
+        return "mongomock"
+    except ImportError:
+        database_handler.MongoClient = InMemoryClient
+        return "in-memory"
+
+
+def percentile(values, q):
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(q * len(ordered)))] if ordered else 0.0
+
+
+def peak_rss_mb():
+    # ru_maxrss is KiB on Linux, bytes on macOS
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak / (1024 * 1024) if sys.platform == "darwin" else peak / 1024
+
+
+async def bench_pipeline(context, keywords, concurrency):
+    limits = main.create_stage_limits()
+    report = await run_batch(keywords, lambda kw: main.process_keyword_async(context, limits, kw), concurrency)
+    latencies = [item.latency for item in report.results]
+    return {
+        "concurrency": concurrency,
+        "keywords": len(keywords),
+        "succeeded": report.succeeded,
+        "wall_time": round(report.wall_time, 4),
+        "throughput": round(report.throughput, 3),
+        "p50": round(percentile(latencies, 0.50), 4),
+        "p95": round(percentile(latencies, 0.95), 4),
+        "p99": round(percentile(latencies, 0.99), 4),
+        "peak_rss_mb": round(peak_rss_mb(), 1),
+    }
+
+
+def bench_parse(iterations):
+    responses = [
+        CANNED_CONTENT.json(),
+        f"Here you go:\n```json\n{CANNED_CONTENT.json()}\n```",
+        "Thought: no JSON here at all",
+        CANNED_CONTENT.json().replace('",', '",  ').replace('"]', '",]'),
+        CANNED_CONTENT.json()[:-40],
+    ]
+    results = {}
+    for i, response in enumerate(responses):
+        start = time.perf_counter()
+        for _ in range(iterations):
+            main.parse_llm_response(response)
+        results[f"{i}:{response[:24]}"] = round((time.perf_counter() - start) / iterations * 1e6, 2)
+    return results
+
+
+def bench_save(db_handler, iterations):
+    result = {
+        "raw": CANNED_CONTENT.json(),
+        "tasks_output": [],
+        "token_usage": {"prompt_tokens": 100, "completion_tokens": 200, "total_tokens": 300},
+    }
+    start = time.perf_counter()
+    for i in range(iterations):
+        main.save_to_mongodb(db_handler, f"keyword {i}", result)
+    queued = time.perf_counter() - start
+    db_handler.flush()
+    return {
+        "documents": iterations,
+        "queue_us_per_doc": round(queued / iterations * 1e6, 2),
+        "total_s_with_flush": round(time.perf_counter() - start, 4),
+    }
+
+
+def parse_arguments():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--keywords", type=int, default=20, help="Keywords per concurrency level")
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[1, 4, 16], help="Concurrency levels to run")
+    parser.add_argument("--profile", choices=sorted(LATENCY_PROFILES), default="fast", help="Latency profile")
+    parser.add_argument("--llm-latency", type=float, help="Override the profile's mean LLM latency (s)")
+    parser.add_argument("--search-latency", type=float, help="Override the profile's mean search latency (s)")
+    parser.add_argument("--parse-iterations", type=int, default=2000)
+    parser.add_argument("--save-iterations", type=int, default=2000)
+    parser.add_argument("--database", choices=["mongo", "sqlite"], default="mongo",
+                        help="Storage backend: faked MongoDB or a temporary SQLite file")
+    parser.add_argument("--search-mode", choices=["agent", "direct"], default="agent",
+                        help="Run the search stage through the search agent or call the search tool directly")
+    parser.add_argument("--json", help="Also write results to this JSON file")
+    return parser.parse_args()
+
+
+async def run(args):
+    llm_latency, search_latency = LATENCY_PROFILES[args.profile]
+    llm_latency = args.llm_latency if args.llm_latency is not None else llm_latency
+    search_latency = args.search_latency if args.search_latency is not None else search_latency
+
+    fake_groq = FakeGroq(llm_latency)
+    fake_groq.install()
+    FakeRecipeSearchTool.latency = search_latency
+    internet_search_agent.RecipeSearchTool = FakeRecipeSearchTool
+    if args.database == "sqlite":
+        backend = "sqlite"
+        db_handler = open_storage(f"sqlite:///{os.path.join(tempfile.mkdtemp(), 'bench.db')}")
+    else:
+        backend = install_fake_database()
+        db_handler = database_handler.DatabaseHandler(os.environ["MONGODB_URI"])
+    agents = main.initialize_agents(main.initialize_llm())
+    context = main.PipelineContext(
+        recipe_crew=main.create_recipe_crew(agents),
+        db_handler=db_handler,
+        content_agent=agents[1],
+        search_agent=agents[0],
+        search_mode=args.search_mode
+    )
+
+    results = {
+        "profile": {"name": args.profile, "llm_latency": llm_latency, "search_latency": search_latency},
+        "database": backend,
+        "search_mode": args.search_mode,
+        "pipeline": [],
+    }
+    for concurrency in args.concurrency:
+        keywords = [f"benchmark recipe {concurrency}-{i}" for i in range(args.keywords)]
+        results["pipeline"].append(await bench_pipeline(context, keywords, concurrency))
+    results["llm_calls"] = fake_groq.calls
+    results["stages"] = metrics.snapshot()["histograms"].get("pipeline_stage_seconds", [])
+    results["parse_us_per_call"] = bench_parse(args.parse_iterations)
+    results["save"] = bench_save(db_handler, args.save_iterations)
+    await asyncio.to_thread(db_handler.close)
+    results["peak_rss_mb"] = round(peak_rss_mb(), 1)
+    return results
+
+
+def main_benchmark():
+    args = parse_arguments()
+    # The pipeline logs every keyword (and every deliberately unparseable response);
+    # failures still show up in the OK column
+    logging.disable(logging.ERROR)
+    results = asyncio.run(run(args))
+
+    from rich.console import Console
+    from rich.table import Table
+    console = Console()
+    table = Table(title=f"Pipeline benchmark ({args.profile} profile, {results['database']}, "
+                        f"{results['search_mode']} search)")
+    for column in ("Concurrency", "Keywords", "OK", "Wall (s)", "Keywords/s", "p50 (s)", "p95 (s)", "p99 (s)", "Peak RSS (MB)"):
+        table.add_column(column, justify="right")
+    for row in results["pipeline"]:
+        table.add_row(*(str(row[key]) for key in (
+            "concurrency", "keywords", "succeeded", "wall_time", "throughput", "p50", "p95", "p99", "peak_rss_mb"
+        )))
+    console.print(table)
+    console.print(f"LLM calls: {results['llm_calls']}")
+    console.print(f"parse_llm_response (us/call): {results['parse_us_per_call']}")
+    console.print(f"save_to_mongodb: {results['save']}")
+
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(results, f, indent=2)
+        console.print(f"Results written to {args.json}")
+
+
+if __name__ == "__main__":
+    main_benchmark()
@@ -0,0 +1,141 @@
+"""
+CLI startup time, with a `python -X importtime` breakdown per command.
+
+Each command runs in a fresh interpreter against a temporary SQLite database and empty
+caches. The report shows wall time, total import time and the slowest top-level imports.
+With --check it exits non-zero if a storage-only command (history, cache-stats,
+--help) imports crewai, langchain_groq or litellm, or takes longer than --max-seconds.
+
+Usage:
+    python benchmarks/bench_startup.py
+    python benchmarks/bench_startup.py --runs 5 --top 15 --check --max-seconds 1.5
+"""
+
+import argparse
+import json
+import os
+import re
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+HEAVY_MODULES = ("crewai", "langchain_groq", "litellm")
+
+# Commands that never touch the LLM stack
+LIGHT_COMMANDS = {
+    "help": ["--help"],
+    "history": ["history", "--limit", "5"],
+    "cache-stats": ["cache-stats"],
+}
+
+_IMPORTTIME_RE = re.compile(r"^import time:\s+(\d+) \|\s+(\d+) \|(\s*)(\S+)$")
+
+
+def parse_importtime(stderr):
+    """Return [(module, self_us, cumulative_us, depth)] from -X importtime output."""
+    rows = []
+    for line in stderr.splitlines():
+        match = _IMPORTTIME_RE.match(line)
+        if match:
+            self_us, cumulative_us, indent, module = match.groups()
+            rows.append((module, int(self_us), int(cumulative_us), (len(indent) - 1) // 2))
+    return rows
+
+
+def run_command(argv, env):
+    start = time.perf_counter()
+    completed = subprocess.run(
+        [sys.executable, "-X", "importtime", os.path.join(ROOT, "main.py"), *argv],
+        cwd=env["BENCH_WORKDIR"], env=env, capture_output=True, text=True
+    )
+    wall = time.perf_counter() - start
+    return wall, completed.returncode, parse_importtime(completed.stderr)
+
+
+def bench_command(name, argv, env, runs, top):
+    walls = []
+    rows = []
+    returncode = 0
+    for _ in range(runs):
+        wall, returncode, rows = run_command(argv, env)
+        walls.append(wall)
+    top_level = sorted((row for row in rows if row[3] == 0), key=lambda row: row[2], reverse=True)
+    loaded = {row[0].split(".")[0] for row in rows}
+    return {
+        "command": name,
+        "returncode": returncode,
+        "wall_s_median": round(statistics.median(walls), 3),
+        "wall_s_min": round(min(walls), 3),
+        "import_s": round(sum(row[1] for row in rows) / 1e6, 3),
+        "modules": len(rows),
+        "heavy_modules": sorted(loaded.intersection(HEAVY_MODULES)),
+        "slowest_imports": [(row[0], round(row[2] / 1e3, 1)) for row in top_level[:top]],
+    }
+
+
+def startup_environment(workdir):
+    """Environment for the commands: a throwaway SQLite database and caches under `workdir`."""
+    env = dict(
+        os.environ,
+        BENCH_WORKDIR=workdir,
+        PYTHONPATH=ROOT,
+        DATABASE_URI=f"sqlite:///{os.path.join(workdir, 'startup.db')}",
+        RESULT_CACHE_PATH=os.path.join(workdir, "result_cache.db"),
+        SEARCH_CACHE_PATH=os.path.join(workdir, "search_cache.db"),
+        LITELLM_LOCAL_MODEL_COST_MAP="True",
+    )
+    env.pop("MONGODB_URI", None)
+    return env
+
+
+def check_result(result, max_seconds):
+    """Return what is wrong with one command's result: a failed exit, heavy imports, a blown budget."""
+    failures = []
+    if result["returncode"] != 0:
+        failures.append(f"{result['command']} exited with {result['returncode']}")
+    if result["heavy_modules"]:
+        failures.append(f"{result['command']} imported {', '.join(result['heavy_modules'])}")
+    if result["wall_s_median"] > max_seconds:
+        failures.append(f"{result['command']} took {result['wall_s_median']}s (budget {max_seconds}s)")
+    return failures
+
+
+def parse_arguments():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--runs", type=int, default=3, help="Runs per command; the median is reported")
+    parser.add_argument("--top", type=int, default=10, help="Slowest top-level imports to show")
+    parser.add_argument("--check", action="store_true", help="Fail if a light command loads the LLM stack")
+    parser.add_argument("--max-seconds", type=float, default=2.0, help="Wall-time budget for light commands")
+    parser.add_argument("--json", help="Also write results to this JSON file")
+    return parser.parse_args()
+
+
+def main():
+    args = parse_arguments()
+    env = startup_environment(tempfile.mkdtemp(prefix="food-agent-startup-"))
+
+    results = [bench_command(name, argv, env, args.runs, args.top) for name, argv in LIGHT_COMMANDS.items()]
+
+    failures = []
+    for result in results:
+        print(f"{result['command']:12} wall {result['wall_s_median']:.3f}s (min {result['wall_s_min']:.3f}s), "
+              f"imports {result['import_s']:.3f}s across {result['modules']} modules, "
+              f"heavy: {', '.join(result['heavy_modules']) or 'none'}")
+        for module, cumulative_ms in result["slowest_imports"]:
+            print(f"    {cumulative_ms:9.1f} ms  {module}")
+        failures.extend(check_result(result, args.max_seconds))
+
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(results, f, indent=2)
+    if args.check and failures:
+        print("FAILED: " + "; ".join(failures))
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,139 @@
+"""
+Local stand-in for Groq's OpenAI-compatible chat completions endpoint.
+
+Enforces a requests-per-minute quota and answers with Groq-style x-ratelimit-* headers,
+429s with Retry-After once the quota is spent, and a configurable share of 503s. Models
+listed in --failing-models always fail, which exercises circuit breaking and fallback.
+Point the app at it with GROQ_API_BASE=http://127.0.0.1:<port>/openai/v1.
+
+Usage:
+    python benchmarks/fake_groq_server.py --port 8099 --rpm 120 --error-rate 0.05
+"""
+
+import argparse
+import json
+import random
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+DEFAULT_REPLY = '{"recipes": []}'
+
+
+class Quota:
+    def __init__(self, per_minute):
+        self.limit = per_minute
+        self.rate = per_minute / 60
+        self.remaining = float(per_minute)
+        self.updated = time.monotonic()
+        self.lock = threading.Lock()
+
+    def take(self):
+        """
+        Return (allowed, remaining, seconds until the quota is full again, seconds until
+        one more request is available), mirroring Groq's reset and Retry-After headers.
+        """
+        with self.lock:
+            now = time.monotonic()
+            self.remaining = min(self.limit, self.remaining + (now - self.updated) * self.rate)
+            self.updated = now
+            allowed = self.remaining >= 1
+            if allowed:
+                self.remaining -= 1
+            reset = (self.limit - self.remaining) / self.rate
+            return allowed, int(self.remaining), reset, max(0.0, 1 - self.remaining) / self.rate
+
+
+def create_server(host="127.0.0.1", port=0, rpm=60, error_rate=0.0, latency=0.0,
+                  reply=DEFAULT_REPLY, failing_models=()):
+    quota = Quota(rpm)
+    stats = {"ok": 0, "rate_limited": 0, "errors": 0}
+
+    class Handler(BaseHTTPRequestHandler):
+        def log_message(self, format, *args):
+            pass
+
+        def _send(self, status, payload, headers):
+            body = json.dumps(payload).encode("utf-8")
+            self.send_response(status)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(body)))
+            for name, value in headers.items():
+                self.send_header(name, value)
+            self.end_headers()
+            self.wfile.write(body)
+
+        def do_POST(self):
+            request = json.loads(self.rfile.read(int(self.headers.get("Content-Length") or 0)) or b"{}")
+            model = request.get("model", "")
+            allowed, remaining, reset, retry_after = quota.take()
+            headers = {
+                "x-ratelimit-limit-requests": str(quota.limit),
+                "x-ratelimit-remaining-requests": str(remaining),
+                "x-ratelimit-reset-requests": f"{reset:.2f}s",
+            }
+            if not allowed:
+                stats["rate_limited"] += 1
+                headers["retry-after"] = f"{retry_after:.2f}"
+                self._send(429, {"error": {"message": "Rate limit reached", "type": "tokens"}}, headers)
+                return
+            time.sleep(latency)
+            if model in failing_models or random.random() < error_rate:
+                stats["errors"] += 1
+                self._send(503, {"error": {"message": "Service unavailable"}}, headers)
+                return
+            stats["ok"] += 1
+            if request.get("stream"):
+                self._stream(model, headers)
+                return
+            self._send(200, {
+                "id": "chatcmpl-fake",
+                "object": "chat.completion",
+                "created": int(time.time()),
+                "model": model,
+                "choices": [{"index": 0, "message": {"role": "assistant", "content": reply}, "finish_reason": "stop"}],
+                "usage": {"prompt_tokens": 100, "completion_tokens": 20, "total_tokens": 120},
+                "service_tier": "on_demand",
+                "system_fingerprint": "fp_fake",
+            }, headers)
+
+        def _stream(self, model, headers):
+            self.send_response(200)
+            self.send_header("Content-Type", "text/event-stream")
+            for name, value in headers.items():
+                self.send_header(name, value)
+            self.end_headers()
+            for i in range(0, len(reply), 16):
+                chunk = {
+                    "id": "chatcmpl-fake", "object": "chat.completion.chunk", "created": int(time.time()),
+                    "model": model, "choices": [{"index": 0, "delta": {"content": reply[i:i + 16]}, "finish_reason": None}],
+                }
+                self.wfile.write(f"data: {json.dumps(chunk)}\n\n".encode("utf-8"))
+            self.wfile.write(b"data: [DONE]\n\n")
+
+    server = ThreadingHTTPServer((host, port), Handler)
+    server.daemon_threads = True
+    server.stats = stats
+    return server
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Fake Groq chat completions server")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8099)
+    parser.add_argument("--rpm", type=int, default=60, help="Requests per minute before 429s")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="Share of requests answered with 503")
+    parser.add_argument("--latency", type=float, default=0.0, help="Seconds per request")
+    parser.add_argument("--failing-model", action="append", default=[], help="Model that always fails")
+    args = parser.parse_args()
+    server = create_server(args.host, args.port, args.rpm, args.error_rate, args.latency,
+                           failing_models=tuple(args.failing_model))
+    print(f"Fake Groq listening on http://{args.host}:{server.server_port}/openai/v1")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
@@ -7,4 +7,118 @@ load_dotenv()
 GROQ_API_KEY = os.getenv("GROQ_API_KEY")
 SERPER_API_KEY = os.getenv("SERPER_API_KEY")
 MONGODB_URI = os.getenv("MONGODB_URI")
-# Add other configuration variables as needed
\ No newline at end of file
+# Storage backend chosen by scheme: mongodb://..., mongodb+srv://... or sqlite:///path.
+# Defaults to MONGODB_URI when set, otherwise a local SQLite file
+DATABASE_URI = os.getenv("DATABASE_URI") or MONGODB_URI or "sqlite:///food_recipes.db"
+
+# LLM
+GROQ_MODEL_NAME = os.getenv("GROQ_MODEL_NAME", "groq/llama-3.1-8b-instant")
+# Bump whenever the agent prompts or task descriptions change so cached results are not reused
+PROMPT_VERSION = os.getenv("PROMPT_VERSION", "4")
+# Token budget for the search results embedded in the content prompt, and per-recipe
+# instruction limits applied before budgeting
+PROMPT_SEARCH_TOKEN_BUDGET = int(os.getenv("PROMPT_SEARCH_TOKEN_BUDGET", "1500"))
+PROMPT_MAX_STEPS_PER_RECIPE = int(os.getenv("PROMPT_MAX_STEPS_PER_RECIPE", "12"))
+PROMPT_MAX_STEP_CHARS = int(os.getenv("PROMPT_MAX_STEP_CHARS", "300"))
+
+# Resilient LLM client. GROQ_API_BASE overrides the endpoint, e.g. to test against a local fake server
+GROQ_API_BASE = os.getenv("GROQ_API_BASE") or None
+# Tried in order once the primary model's retries are exhausted or its circuit is open
+GROQ_FALLBACK_MODELS = [m.strip() for m in os.getenv("GROQ_FALLBACK_MODELS", "groq/llama-3.3-70b-versatile").split(",") if m.strip()]
+LLM_MAX_ATTEMPTS = int(os.getenv("LLM_MAX_ATTEMPTS", "4"))
+LLM_BACKOFF_BASE = float(os.getenv("LLM_BACKOFF_BASE", "0.5"))
+LLM_BACKOFF_MAX = float(os.getenv("LLM_BACKOFF_MAX", "20"))
+LLM_BREAKER_THRESHOLD = int(os.getenv("LLM_BREAKER_THRESHOLD", "5"))
+LLM_BREAKER_COOLDOWN = float(os.getenv("LLM_BREAKER_COOLDOWN", "30"))
+# Starting quota; replaced by the provider's x-ratelimit-* headers once responses arrive
+LLM_REQUESTS_PER_MINUTE = float(os.getenv("LLM_REQUESTS_PER_MINUTE", "30"))
+LLM_TOKENS_PER_MINUTE = float(os.getenv("LLM_TOKENS_PER_MINUTE", "20000"))
+LLM_TOKENS_PER_CALL = int(os.getenv("LLM_TOKENS_PER_CALL", "1500"))
+
+# Result cache in front of Crew.kickoff
+RESULT_CACHE_ENABLED = os.getenv("RESULT_CACHE_ENABLED", "true").lower() == "true"
+RESULT_CACHE_PATH = os.getenv("RESULT_CACHE_PATH", "result_cache.db")
+RESULT_CACHE_TTL = int(os.getenv("RESULT_CACHE_TTL", str(7 * 24 * 3600)))
+RESULT_CACHE_MAX_ENTRIES = int(os.getenv("RESULT_CACHE_MAX_ENTRIES", "10000"))
+RESULT_CACHE_MEMORY_ENTRIES = int(os.getenv("RESULT_CACHE_MEMORY_ENTRIES", "256"))
+
+# Search-result cache shared by near-duplicate keywords
+SEARCH_CACHE_ENABLED = os.getenv("SEARCH_CACHE_ENABLED", "true").lower() == "true"
+SEARCH_CACHE_PATH = os.getenv("SEARCH_CACHE_PATH", "search_cache.db")
+SEARCH_CACHE_TTL = int(os.getenv("SEARCH_CACHE_TTL", str(30 * 24 * 3600)))
+
+# Similarity cache over the result cache: keywords worded differently from a stored article.
+# Matches at or above the serve threshold reuse the article; down to the draft threshold
+# it is revised by the content stage, from the keywords' own search results, instead of
+# generated from scratch. Below about 0.75 a match is usually a different dish ("vegan
+# lasagna" and "lasagna soup" score 0.64 against "lasagna"), while the same dish under a
+# longer title ("beef stew recipe" against "beef stew: Hearty Beef Stew") scores about 0.8
+SIMILARITY_CACHE_ENABLED = os.getenv("SIMILARITY_CACHE_ENABLED", "true").lower() == "true"
+SIMILARITY_SERVE_THRESHOLD = float(os.getenv("SIMILARITY_SERVE_THRESHOLD", "0.9"))
+SIMILARITY_DRAFT_THRESHOLD = float(os.getenv("SIMILARITY_DRAFT_THRESHOLD", "0.75"))
+SIMILARITY_DIMENSIONS = int(os.getenv("SIMILARITY_DIMENSIONS", "1024"))
+
+# Recipe search fan-out: one Serper query, then recipe pages fetched in parallel
+# "agent" has the search agent call the tool in a ReAct loop; "direct" calls it programmatically,
+# leaving the LLM only the content stage
+SEARCH_MODE = os.getenv("SEARCH_MODE", "agent")
+SEARCH_MAX_RESULTS = int(os.getenv("SEARCH_MAX_RESULTS", "5"))
+RECIPE_FETCH_CONCURRENCY = int(os.getenv("RECIPE_FETCH_CONCURRENCY", "16"))
+RECIPE_FETCH_TIMEOUT = float(os.getenv("RECIPE_FETCH_TIMEOUT", "8"))
+
+# MongoDB write-behind queue
+DB_WRITE_BATCH_SIZE = int(os.getenv("DB_WRITE_BATCH_SIZE", "50"))
+DB_WRITE_FLUSH_INTERVAL = float(os.getenv("DB_WRITE_FLUSH_INTERVAL", "2.0"))
+# A batch that fails is requeued until it has been tried this many times, then reported as lost
+DB_WRITE_MAX_ATTEMPTS = int(os.getenv("DB_WRITE_MAX_ATTEMPTS", "3"))
+
+# Incremental exports stop this many seconds short of now. created_at is stamped before a
+# generation is queued, so anything younger may still be waiting in a worker's write-behind queue
+EXPORT_WATERMARK_LAG = float(os.getenv("EXPORT_WATERMARK_LAG", "120"))
+
+# Storage schema. Version 2 stores each article once, source recipes deduplicated by URL
+# in their own collection, and raw transcripts compressed in a side collection
+STORAGE_SCHEMA_VERSION = 2
+RAW_OUTPUT_COMPRESSION_LEVEL = int(os.getenv("RAW_OUTPUT_COMPRESSION_LEVEL", "6"))
+
+# Asyncio pipeline stage limits
+LLM_CONCURRENCY = int(os.getenv("LLM_CONCURRENCY", "32"))
+SEARCH_CONCURRENCY = int(os.getenv("SEARCH_CONCURRENCY", "32"))
+DB_CONCURRENCY = int(os.getenv("DB_CONCURRENCY", "8"))
+
+# HTTP service mode
+SERVER_HOST = os.getenv("SERVER_HOST", "127.0.0.1")
+SERVER_PORT = int(os.getenv("SERVER_PORT", "8080"))
+SERVER_MAX_IN_FLIGHT = int(os.getenv("SERVER_MAX_IN_FLIGHT", str(LLM_CONCURRENCY)))
+SERVER_MAX_QUEUE = int(os.getenv("SERVER_MAX_QUEUE", "100"))
+
+# Record/replay of LLM and search calls. CASSETTE_MODE is off, record or replay; replayed
+# calls wait CASSETTE_LATENCY_SCALE times their recorded latency (0: no wait, 1: realistic)
+CASSETTE_MODE = os.getenv("CASSETTE_MODE", "off")
+CASSETTE_PATH = os.getenv("CASSETTE_PATH", "cassettes/default.jsonl.gz")
+CASSETTE_LATENCY_SCALE = float(os.getenv("CASSETTE_LATENCY_SCALE", "0"))
+
+# Logging, written by a background thread. LOG_PROFILE is default, quiet (warnings only on the
+# console, agents and crews not verbose) or debug. Messages longer than LOG_MAX_MESSAGE_CHARS
+# are truncated; info records beyond LOG_QUEUE_SIZE waiting for the writer are dropped
+LOG_PROFILE = os.getenv("LOG_PROFILE", "default")
+LOG_FILE = os.getenv("LOG_FILE", "app.log")
+LOG_MAX_BYTES = int(os.getenv("LOG_MAX_BYTES", str(10 * 1024 * 1024)))
+LOG_BACKUP_COUNT = int(os.getenv("LOG_BACKUP_COUNT", "5"))
+LOG_MAX_MESSAGE_CHARS = int(os.getenv("LOG_MAX_MESSAGE_CHARS", "2000"))
+LOG_QUEUE_SIZE = int(os.getenv("LOG_QUEUE_SIZE", "10000"))
+
+# Metrics
+METRICS_JSON_PATH = os.getenv("METRICS_JSON_PATH")
+METRICS_DUMP_INTERVAL = float(os.getenv("METRICS_DUMP_INTERVAL", "30"))
+
+# Batch mode
+BATCH_CONCURRENCY = int(os.getenv("BATCH_CONCURRENCY", "4"))
+# Failed job keywords are retried on resume until they have this many attempts
+JOB_MAX_ATTEMPTS = int(os.getenv("JOB_MAX_ATTEMPTS", "3"))
+
+# Worker mode: processes per machine, each running BATCH_CONCURRENCY keywords at a time.
+# A keyword claimed longer ago than the lease is assumed abandoned and can be claimed again
+WORKER_PROCESSES = int(os.getenv("WORKER_PROCESSES", str(os.cpu_count() or 1)))
+JOB_CLAIM_LEASE = float(os.getenv("JOB_CLAIM_LEASE", "900"))
+# Add other configuration variables as needed
@@ -1,100 +1,117 @@
+from __future__ import annotations
+
 import os
 import traceback
 import logging
-from typing import List, Dict, Any, Optional, Tuple, Generator
+from typing import TYPE_CHECKING, List, Dict, Any, Callable, Optional, Tuple, Generator, AsyncIterator
 from dotenv import load_dotenv
-from crewai import Crew, Task
-from langchain_groq import ChatGroq
-from agents.internet_search_agent import InternetSearchAgent
-from agents.content_generator_agent import ContentGeneratorAgent
 from utils.terminal_ui import TerminalUI
-from config.settings import GROQ_API_KEY, SERPER_API_KEY, MONGODB_URI
-from rich.console import Console
+from config.settings import (
+    GROQ_API_KEY, SERPER_API_KEY, DATABASE_URI, GROQ_MODEL_NAME, PROMPT_VERSION, BATCH_CONCURRENCY,
+    RESULT_CACHE_ENABLED, RESULT_CACHE_PATH, RESULT_CACHE_TTL, RESULT_CACHE_MAX_ENTRIES,
+    RESULT_CACHE_MEMORY_ENTRIES, SEARCH_CACHE_ENABLED, SEARCH_CACHE_PATH, SEARCH_CACHE_TTL,
+    LLM_CONCURRENCY, SEARCH_CONCURRENCY, DB_CONCURRENCY, SERVER_HOST, SERVER_PORT,
+    SERVER_MAX_IN_FLIGHT, SERVER_MAX_QUEUE, METRICS_JSON_PATH, METRICS_DUMP_INTERVAL, SEARCH_MAX_RESULTS,
+    PROMPT_SEARCH_TOKEN_BUDGET, PROMPT_MAX_STEPS_PER_RECIPE, PROMPT_MAX_STEP_CHARS, GROQ_API_BASE,
+    JOB_MAX_ATTEMPTS, SIMILARITY_CACHE_ENABLED, SIMILARITY_SERVE_THRESHOLD, SIMILARITY_DRAFT_THRESHOLD,
+    SIMILARITY_DIMENSIONS, WORKER_PROCESSES, JOB_CLAIM_LEASE, SEARCH_MODE, CASSETTE_MODE, CASSETTE_PATH,
+    CASSETTE_LATENCY_SCALE, LOG_PROFILE, LOG_FILE, EXPORT_WATERMARK_LAG
+)
 from rich.traceback import install
-from tools.database_handler import DatabaseHandler
-from models.task_outputs import SearchOutput, ContentOutput
-import litellm
-from litellm.exceptions import OpenAIError
+from tools.storage import StorageBackend, encode_cursor, open_storage
+from tools.llm_client import CircuitOpen, LLMClient
+from tools.result_cache import CachedResult, ResultCache
+from tools.search_cache import SearchCache
+from models.task_outputs import SearchOutput, ContentOutput, CachedTaskOutput, ContentStreamEvent
+from utils.batch_runner import BatchReport, current_job_item, read_keywords, run_batch
+from utils.http_service import RecipeService, create_http_server
+from utils.fingerprints import changed_inputs, generation_fingerprints, search_fingerprint, stored_fingerprints
+from utils.keywords import normalize_keywords
+from utils.logging_setup import configure_logging, console, crew_verbose
+from utils.metrics import StageRecorder, current_recorder, metrics, record_task_completion, timed_stage
+from utils.json_repair import extract_json, parse_model
+from utils.prompt_budget import compact_search_results, record_compaction
 import warnings
-import re
-import json
 import signal
+import socket
+import multiprocessing
+import threading
+import queue
 import sys
+import argparse
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from datetime import datetime, timedelta
+
+# crewai, langchain_groq and litellm take seconds to import, so they are imported inside
+# the functions that build and run the pipeline; history and cache-stats never load them
+if TYPE_CHECKING:
+    from crewai import Crew
+    from langchain_groq import ChatGroq
+    from agents.content_generator_agent import ContentGeneratorAgent
+    from agents.internet_search_agent import InternetSearchAgent
+    from tools.similarity_cache import SimilarityCache
 
 # Configure rich traceback handler
-install(show_locals=True)
-
-# Configure logging
-logging.basicConfig(
-    level=logging.INFO,
-    format='%(asctime)s - %(levelname)s - %(message)s',
-    handlers=[
-        logging.FileHandler("app.log"),
-        logging.StreamHandler()
-    ]
-)
+install()
+
 logger = logging.getLogger(__name__)
 
 # Suppress specific SageMaker INFO warnings
 warnings.filterwarnings("ignore", message="Not applying SDK defaults from location:.*")
 
-# Initialize LiteLLM
-litellm.set_verbose = False  # Set to True for debugging
-
-# Initialize rich console
-console = Console()
-
 # Load environment variables
 load_dotenv()
 
-# Add this global variable at the top of the file, after other imports
-db_connection_closed = False
-
-def graceful_shutdown(signum, frame):
-    global db_handler, db_connection_closed
-    if not db_connection_closed:
-        console.print("\n[bold yellow]Received termination signal. Shutting down gracefully...[/bold yellow]")
-        if db_handler:
-            try:
-                db_handler.close()
-                db_connection_closed = True
-                console.print("[bold green]MongoDB connection closed successfully.[/bold green]")
-            except Exception as e:
-                console.print(f"[bold red]Error closing MongoDB connection: {str(e)}[/bold red]")
-        else:
-            console.print("[bold yellow]No active MongoDB connection to close.[/bold yellow]")
-        
-        console.print("[bold blue]Thank you for using the Recipe Content Generator. Goodbye![/bold blue]")
-    sys.exit(0)
-
-def check_environment_variables() -> None:
+def check_environment_variables(replaying: bool = False) -> None:
     """
     Check for required environment variables and exit if any are missing.
+
+    Storage is not required: without DATABASE_URI or MONGODB_URI a local SQLite file is used.
+
+    Args:
+        replaying (bool): Calls are answered from a cassette, so no API keys are needed.
     """
+    if replaying:
+        return
     required_vars = {
         "GROQ_API_KEY": GROQ_API_KEY,
-        "SERPER_API_KEY": SERPER_API_KEY,
-        "MONGODB_URI": MONGODB_URI
+        "SERPER_API_KEY": SERPER_API_KEY
     }
     missing_vars = [var for var, value in required_vars.items() if not value]
     if missing_vars:
         logger.error(f"Missing environment variables: {', '.join(missing_vars)}")
         exit(1)
 
-def initialize_llm() -> ChatGroq:
+def initialize_llm(model_name: str = GROQ_MODEL_NAME) -> ChatGroq:
     """
     Initialize and return the Language Model.
 
+    Retries are left to the shared LLMClient, so the model itself does not retry.
+
+    Args:
+        model_name (str): The model to use.
+
     Returns:
         ChatGroq: Initialized Language Model.
 
     Raises:
         SystemExit: If LLM initialization fails.
     """
+    import litellm
+    from langchain_groq import ChatGroq
+    from litellm.exceptions import OpenAIError
+
+    litellm.set_verbose = False  # Set to True for debugging
+
     try:
         return ChatGroq(
-            groq_api_key=GROQ_API_KEY,
-            model_name="groq/llama-3.1-8b-instant"
+            # Only a cassette replay gets here without a key, and its calls never reach Groq
+            groq_api_key=GROQ_API_KEY or "replay",
+            groq_api_base=GROQ_API_BASE,
+            model_name=model_name,
+            max_retries=0
         )
     except OpenAIError as e:
         logger.error(f"Failed to initialize LLM: {e.message} ([{e.status_code}]) from provider {e.llm_provider}")
@@ -103,48 +120,158 @@ def initialize_llm() -> ChatGroq:
         logger.error(f"Unexpected error initializing LLM: {str(e)}", exc_info=True)
         exit(1)
 
-def initialize_agents(llm: ChatGroq) -> List[Any]:
+def initialize_agents(llm: ChatGroq, search_cache: Optional[SearchCache] = None,
+                      llm_client: Optional[LLMClient] = None) -> List[Any]:
     """
     Initialize and return the agents.
 
     Args:
         llm (ChatGroq): The Language Model to use for the agents.
+        search_cache (Optional[SearchCache]): Cache of parsed search results for the search agent.
+        llm_client (Optional[LLMClient]): Shared rate-limited client for direct LLM calls.
 
     Returns:
         List[Any]: List of initialized agents.
     """
-    internet_search_agent = InternetSearchAgent(llm=llm, max_results=1)
-    content_generator_agent = ContentGeneratorAgent(llm=llm)
+    from agents.internet_search_agent import InternetSearchAgent
+    from agents.content_generator_agent import ContentGeneratorAgent
+
+    internet_search_agent = InternetSearchAgent(llm=llm, max_results=SEARCH_MAX_RESULTS, search_cache=search_cache)
+    content_generator_agent = ContentGeneratorAgent(llm=llm, llm_client=llm_client)
     return [internet_search_agent, content_generator_agent]
 
+# The recipe search tool already fans out and extracts structured recipes, so the agent
+# only needs one tool call and can hand its JSON straight through
+SEARCH_TASK_DESCRIPTION = (
+    "Search for food recipes based on user keywords: {keywords}. "
+    "Call the recipe search tool exactly once with these keywords and return its JSON output unchanged."
+)
+
 def create_recipe_crew(agents: List[Any]) -> Crew:
     """
     Create and return the recipe crew.
 
+    Keyword runs take its agents and run the search and content tasks as separate
+    crews (see `search_with_agent` and `prepare_crew_run`), so the content prompt
+    gets compacted search results.
+
     Args:
         agents (List[Any]): List of agents to include in the crew.
 
     Returns:
         Crew: The created recipe crew.
     """
+    from crewai import Crew, Task
+
     return Crew(
         agents=[agent.agent for agent in agents],
         tasks=[
             Task(
-                description="Search for food recipes based on user keywords: {keywords}",
+                description=SEARCH_TASK_DESCRIPTION,
                 agent=agents[0].agent,
                 expected_output="A list of relevant food recipes based on the provided keywords.",
-                output_pydantic=SearchOutput
+                output_pydantic=SearchOutput,
+                callback=record_task_completion("search_task")
             ),
             Task(
                 description="Generate SEO-optimized food recipe content based on search results for keywords: {keywords}",
                 agent=agents[1].agent,
                 expected_output="SEO-optimized content for the provided food recipes.",
                 output_pydantic=ContentOutput,
-                input_mapping={"search_results": "tasks_output[0].output"}
+                input_mapping={"search_results": "tasks_output[0].output"},
+                callback=record_task_completion("content_task")
+            )
+        ],
+        verbose=crew_verbose()
+    )
+
+def create_search_crew(search_agent: Any) -> Crew:
+    """
+    Create a crew that only runs the search task.
+
+    Args:
+        search_agent (Any): The crew agent that searches for recipes.
+
+    Returns:
+        Crew: A single-task crew expecting a `keywords` input.
+    """
+    from crewai import Crew, Task
+
+    return Crew(
+        agents=[search_agent],
+        tasks=[
+            Task(
+                description=SEARCH_TASK_DESCRIPTION,
+                agent=search_agent,
+                expected_output="A list of relevant food recipes based on the provided keywords.",
+                output_pydantic=SearchOutput,
+                callback=record_task_completion("search_task")
+            )
+        ],
+        verbose=crew_verbose()
+    )
+
+def create_content_crew(content_agent: Any) -> Crew:
+    """
+    Create a crew that only runs the content task, for when search results are already known.
+
+    Args:
+        content_agent (Any): The crew agent that generates content.
+
+    Returns:
+        Crew: A single-task crew expecting `keywords` and `search_results` inputs.
+    """
+    from crewai import Crew, Task
+
+    return Crew(
+        agents=[content_agent],
+        tasks=[
+            Task(
+                description=(
+                    "Generate SEO-optimized food recipe content for keywords: {keywords}\n"
+                    "Base the content on these search results:\n{search_results}"
+                ),
+                agent=content_agent,
+                expected_output="SEO-optimized content for the provided food recipes.",
+                output_pydantic=ContentOutput,
+                callback=record_task_completion("content_task")
+            )
+        ],
+        verbose=crew_verbose()
+    )
+
+def create_edit_crew(content_agent: Any) -> Crew:
+    """
+    Create a crew that revises a stored article for related keywords instead of writing one.
+
+    Args:
+        content_agent (Any): The crew agent that generates content.
+
+    Returns:
+        Crew: A single-task crew expecting `keywords`, `draft_keywords`, `draft` and
+        `search_results` inputs.
+    """
+    from crewai import Crew, Task
+
+    return Crew(
+        agents=[content_agent],
+        tasks=[
+            Task(
+                description=(
+                    "Revise this SEO-optimized food recipe article, written for the keywords "
+                    "'{draft_keywords}', so that it targets the keywords: {keywords}\n"
+                    "Keep everything that still applies; rewrite the title, description and any "
+                    "wording specific to the old keywords, and take ingredients and steps from "
+                    "these search results for the new keywords where they differ:\n{search_results}\n"
+                    "Article:\n{draft}"
+                ),
+                agent=content_agent,
+                expected_output="SEO-optimized content for the provided food recipes.",
+                output_pydantic=ContentOutput,
+                callback=record_task_completion("content_task")
             )
         ],
-        verbose=True
+        verbose=crew_verbose()
     )
 
 def process_user_input(terminal_ui: TerminalUI) -> Generator[str, None, None]:
@@ -167,46 +294,430 @@ def parse_llm_response(response: str) -> Dict[str, Any]:
     """
     Parse the LLM response and extract JSON data.
 
+    The response is validated as a ContentOutput first; otherwise the first JSON object
+    in it is returned. Fences, surrounding prose, trailing commas, smart quotes and
+    truncated tails are handled by `utils.json_repair` in a single pass.
+
     Args:
         response (str): The raw LLM response.
 
     Returns:
         Dict[str, Any]: Parsed JSON data or raw response.
     """
-    try:
-        return json.loads(response)
-    except json.JSONDecodeError:
-        json_match = re.search(r'```json\s*([\s\S]*?)\s*```', response)
-        if json_match:
-            try:
-                return json.loads(json_match.group(1))
-            except json.JSONDecodeError:
-                logger.error("Found JSON block, but it's invalid.")
-        else:
-            logger.error("JSON block not found in the response.")
-        
-        logger.warning("Returning raw response as fallback.")
-        return {"raw_response": response}
+    content_output = parse_model(response, ContentOutput)
+    if content_output is not None:
+        return content_output.dict()
+
+    data = extract_json(response)
+    if data is not None:
+        return data
+
+    logger.error("JSON object not found in the response.")
+    logger.warning("Returning raw response as fallback.")
+    return {"raw_response": response}
+
+def task_model(task: Any) -> Optional[Any]:
+    """
+    Return the Pydantic output of a crew task, if it produced one.
+
+    Args:
+        task (Any): A crew TaskOutput or CachedTaskOutput.
+
+    Returns:
+        Optional[Any]: The task's SearchOutput/ContentOutput, or None.
+    """
+    model = getattr(task, 'pydantic', None) or getattr(task, 'output', None)
+    return model if isinstance(model, (SearchOutput, ContentOutput)) else None
+
+def cached_crew_result(cached: CachedResult) -> Dict[str, Any]:
+    """
+    Rebuild an execution result from a cache entry.
+
+    Args:
+        cached (CachedResult): The cache entry.
+
+    Returns:
+        Dict[str, Any]: A result shaped like the output of a crew run.
+    """
+    return {
+        'raw': cached.raw,
+        'tasks_output': [
+            CachedTaskOutput(description="Search for food recipes", agent="Internet Researcher",
+                             output=cached.search_output),
+            CachedTaskOutput(description="Generate SEO-optimized food recipe content", agent="Content Generator",
+                             raw=cached.raw, output=cached.content_output)
+        ],
+        'parsed': cached.content_output.dict(),
+        'cached': True
+    }
+
+def lookup_cached_result(keywords: str, result_cache: Optional[ResultCache]) -> Optional[Dict[str, Any]]:
+    """
+    Return a stored execution result for the keywords, if the result cache has one.
+
+    Args:
+        keywords (str): The search keywords.
+        result_cache (Optional[ResultCache]): Cache of previous crew results.
+
+    Returns:
+        Optional[Dict[str, Any]]: The cached execution result, or None on a miss.
+    """
+    if not result_cache:
+        return None
+    cached = result_cache.get(keywords, GROQ_MODEL_NAME, PROMPT_VERSION)
+    if not cached:
+        return None
+    logger.info(f"Serving cached result for '{keywords}'")
+    return cached_crew_result(cached)
+
+def similar_cached_result(keywords: str, result_cache: Optional[ResultCache],
+                          similarity_cache: Optional[SimilarityCache]) -> Tuple[Optional[Dict[str, Any]], Optional[CachedResult]]:
+    """
+    Look for a stored article generated for similar keywords.
+
+    Args:
+        keywords (str): The search keywords.
+        result_cache (Optional[ResultCache]): Cache of previous crew results.
+        similarity_cache (Optional[SimilarityCache]): Index of the keywords and titles in the result cache.
+
+    Returns:
+        Tuple[Optional[Dict[str, Any]], Optional[CachedResult]]: An execution result to serve
+        as is, or a cache entry to use as a draft; both None when nothing is close enough.
+    """
+    if not result_cache or not similarity_cache:
+        return None, None
+    outcome, match = similarity_cache.find(keywords)
+    if match is None:
+        return None, None
+    neighbour = result_cache.get(match.keywords, GROQ_MODEL_NAME, PROMPT_VERSION)
+    if neighbour is None:
+        return None, None
+    if outcome == "serve":
+        logger.info(f"Serving cached result for similar keywords '{neighbour.keywords}' "
+                    f"(similarity {match.score:.2f}) for '{keywords}'")
+        result = cached_crew_result(neighbour)
+        result['similar_to'] = neighbour.keywords
+        return result, None
+    logger.info(f"Revising cached result for '{neighbour.keywords}' (similarity {match.score:.2f}) for '{keywords}'")
+    return None, neighbour
+
+def search_output_of(result: Any) -> Optional[SearchOutput]:
+    """
+    Return the SearchOutput of a search crew run, parsing its raw text when the task
+    did not produce a Pydantic output.
+    """
+    if not result.tasks_output:
+        return None
+    task = result.tasks_output[0]
+    return task_model(task) or parse_model(getattr(task, 'raw', ''), SearchOutput)
+
+def search_with_agent(recipe_crew: Crew, keywords: str, llm_client: Optional[LLMClient] = None,
+                      fallback_crews: Optional[FallbackCrews] = None) -> Optional[SearchOutput]:
+    """
+    Run the search agent as a step of its own.
+
+    The content task then gets the results compacted to the prompt budget, like cached
+    search results, instead of the agent's full output. Errors propagate to the caller.
+
+    Args:
+        recipe_crew (Crew): The recipe crew object.
+        keywords (str): The search keywords.
+        llm_client (Optional[LLMClient]): Rate limits, retries and falls back for the kickoff.
+        fallback_crews (Optional[FallbackCrews]): Crews built on each fallback model.
+
+    Returns:
+        Optional[SearchOutput]: The search results, or None if the agent returned none.
+    """
+    def kickoff(model: str) -> Any:
+        crew = crew_for_model(recipe_crew, fallback_crews, model)
+        start_task_timer()
+        return create_search_crew(crew.agents[0]).kickoff(inputs={'keywords': keywords})
+
+    result = llm_client.call(kickoff, stage="search_task", scope="crew") if llm_client else kickoff(GROQ_MODEL_NAME)
+    return search_output_of(result)
+
+async def search_with_agent_async(recipe_crew: Crew, keywords: str, limits: "StageLimits",
+                                  llm_client: Optional[LLMClient] = None,
+                                  fallback_crews: Optional[FallbackCrews] = None) -> Optional[SearchOutput]:
+    """
+    Asynchronous version of `search_with_agent`, on a private copy of the search agent
+    and holding both the search and LLM limits.
+    """
+    async def kickoff(model: str) -> Any:
+        crew = crew_for_model(recipe_crew, fallback_crews, model)
+        search_crew = create_search_crew(crew.copy().agents[0])
+        async with limits.search, limits.llm:
+            start_task_timer()
+            return await search_crew.kickoff_async(inputs={'keywords': keywords})
+
+    result = await llm_client.acall(kickoff, stage="search_task", scope="crew") if llm_client else await kickoff(GROQ_MODEL_NAME)
+    return search_output_of(result)
+
+def prepare_crew_run(recipe_crew: Crew, keywords: str, search_output: SearchOutput,
+                     draft: Optional[CachedResult] = None) -> Tuple[Crew, Dict[str, Any]]:
+    """
+    Pick the crew and inputs for the content stage: the content-only crew, or the edit
+    crew when revising a similar article. Either way the search results are compacted
+    to the prompt budget.
+
+    Args:
+        recipe_crew (Crew): The recipe crew object.
+        keywords (str): The search keywords.
+        search_output (SearchOutput): The keywords' search results, cached or just fetched.
+        draft (Optional[CachedResult]): A stored result for similar keywords to revise.
+
+    Returns:
+        Tuple[Crew, Dict[str, Any]]: The crew to kick off and its inputs.
+    """
+    logger.info(f"Generating content from {len(search_output.recipes)} recipes...")
+    compacted = compact_search_results(
+        search_output,
+        budget=PROMPT_SEARCH_TOKEN_BUDGET,
+        max_steps=PROMPT_MAX_STEPS_PER_RECIPE,
+        max_step_chars=PROMPT_MAX_STEP_CHARS
+    )
+    record_compaction(keywords, compacted)
+    if draft:
+        return create_edit_crew(recipe_crew.agents[1]), {
+            'keywords': keywords,
+            'draft_keywords': draft.keywords,
+            'draft': draft.content_output.json(),
+            'search_results': compacted.text
+        }
+    return create_content_crew(recipe_crew.agents[1]), {
+        'keywords': keywords,
+        'search_results': compacted.text
+    }
+
+def build_crew_result(keywords: str, result: Any, cached_search: Optional[SearchOutput],
+                      result_cache: Optional[ResultCache] = None,
+                      search_cache: Optional[SearchCache] = None,
+                      similarity_cache: Optional[SimilarityCache] = None,
+                      model: str = GROQ_MODEL_NAME) -> Dict[str, Any]:
+    """
+    Turn a crew output into an execution result and fill the caches from it.
+
+    Args:
+        keywords (str): The search keywords.
+        result (Any): The CrewOutput returned by kickoff.
+        cached_search (Optional[SearchOutput]): Cached search results used for the run, if any.
+        result_cache (Optional[ResultCache]): Cache of previous crew results.
+        search_cache (Optional[SearchCache]): Cache of parsed search results.
+        similarity_cache (Optional[SimilarityCache]): Index of the keywords and titles in the result cache.
+        model (str): The model that served the crew run, which is a fallback model after a fallback.
+
+    Returns:
+        Dict[str, Any]: The execution result.
+    """
+    tasks_output = list(result.tasks_output)
+    if cached_search:
+        tasks_output.insert(0, CachedTaskOutput(description="Search for food recipes",
+                                                agent="Internet Researcher", output=cached_search))
+
+    search_output = task_model(tasks_output[0]) if tasks_output else None
+    content_output = task_model(tasks_output[1]) if len(tasks_output) >= 2 else None
+    if search_cache and search_output and not cached_search:
+        search_cache.put(keywords, search_output)
+    if result_cache and search_output and content_output:
+        # Keyed on the serving model, so a fallback model's article is never served as the primary's
+        result_cache.put(keywords, model, PROMPT_VERSION, search_output, content_output, result.raw)
+        if similarity_cache and model == GROQ_MODEL_NAME:
+            similarity_cache.add(keywords, content_output.title)
+
+    usage = getattr(result, 'token_usage', None)
+    token_usage = usage.dict() if hasattr(usage, 'dict') else {}
+    recorder = current_recorder.get()
+    if recorder and token_usage:
+        recorder.add_tokens(
+            prompt=token_usage.get('prompt_tokens', 0),
+            completion=token_usage.get('completion_tokens', 0),
+            total=token_usage.get('total_tokens', 0)
+        )
 
-def execute_crew_tasks(recipe_crew: Crew, keywords: str) -> Optional[Dict[str, Any]]:
+    with timed_stage("parse_llm_response"):
+        parsed_result = parse_llm_response(result.raw)
+    if parsed_result is None:
+        logger.error("Failed to parse LLM response. Using raw output.")
+        return {'raw': result.raw, 'tasks_output': tasks_output, 'token_usage': token_usage, 'model': model}
+    return {'raw': result.raw, 'tasks_output': tasks_output, 'parsed': parsed_result, 'token_usage': token_usage,
+            'model': model}
+
+def crew_for_model(recipe_crew: Crew, fallback_crews: Optional[FallbackCrews], model: str) -> Crew:
+    """
+    Return the crew to run on `model`: a fallback crew built on that model, or the primary crew.
+    """
+    return fallback_crews.get(model, recipe_crew) if fallback_crews else recipe_crew
+
+def start_task_timer() -> None:
+    """
+    Start timing crew tasks for the current keyword; each task's completion callback
+    records the time since the previous task finished.
+    """
+    recorder = current_recorder.get()
+    if recorder:
+        recorder.mark()
+
+def execute_crew_tasks(recipe_crew: Crew, keywords: str,
+                       result_cache: Optional[ResultCache] = None,
+                       search_cache: Optional[SearchCache] = None,
+                       llm_client: Optional[LLMClient] = None,
+                       fallback_crews: Optional[FallbackCrews] = None,
+                       similarity_cache: Optional[SimilarityCache] = None,
+                       direct_search: Optional[Callable[[str], SearchOutput]] = None,
+                       known_search: Optional[SearchOutput] = None) -> Optional[Dict[str, Any]]:
     """
     Execute crew tasks for recipe search and content generation.
 
+    Search and content run as separate steps, so the content task always sees the
+    search results compacted to the prompt budget. When the search cache already holds
+    recipes for the keywords, only the content task is run and the cached SearchOutput
+    stands in for the search task. Keywords close to an earlier run's are served that
+    run's article, or have it revised. With `direct_search` the search API is called
+    programmatically instead of by the search agent, so the LLM only runs the content
+    task. `known_search` skips the caches and the search stage and generates content
+    from the given results, as `refresh` does.
+
     Args:
         recipe_crew (Crew): The recipe crew object.
         keywords (str): The search keywords.
+        result_cache (Optional[ResultCache]): Cache consulted before kicking off the crew.
+        search_cache (Optional[SearchCache]): Cache of parsed search results.
+        llm_client (Optional[LLMClient]): Rate limits, retries and falls back for the kickoff.
+        fallback_crews (Optional[FallbackCrews]): Crews built on each fallback model.
+        similarity_cache (Optional[SimilarityCache]): Finds stored articles for similar keywords.
+        direct_search (Optional[Callable[[str], SearchOutput]]): Searches without the agent loop.
+        known_search (Optional[SearchOutput]): Search results to generate content from.
 
     Returns:
         Optional[Dict[str, Any]]: The execution result or None if an error occurred.
     """
-    logger.info("Starting recipe search and content generation...")
+    from litellm.exceptions import OpenAIError
+
+    cached = None if known_search else lookup_cached_result(keywords, result_cache)
+    if cached:
+        return cached
+    similar, draft = (None, None) if known_search else similar_cached_result(keywords, result_cache, similarity_cache)
+    if similar:
+        return similar
+
     try:
-        result = recipe_crew.kickoff(inputs={'keywords': keywords})
-        parsed_result = parse_llm_response(result.raw)
-        if parsed_result is None:
-            logger.error("Failed to parse LLM response. Using raw output.")
-            return {'raw': result.raw, 'tasks_output': result.tasks_output}
-        return {'raw': result.raw, 'tasks_output': result.tasks_output, 'parsed': parsed_result}
+        if known_search:
+            cached_search = known_search
+        elif direct_search:
+            with timed_stage("search_task"):
+                cached_search = direct_search(keywords)
+            if not cached_search.recipes:
+                logger.error(f"No recipes found for '{keywords}'")
+                return None
+        else:
+            cached_search = search_cache.get(keywords) if search_cache else None
+            if not cached_search:
+                cached_search = search_with_agent(recipe_crew, keywords, llm_client, fallback_crews)
+                if not cached_search or not cached_search.recipes:
+                    logger.error(f"No recipes found for '{keywords}'")
+                    return None
+                if search_cache:
+                    search_cache.put(keywords, cached_search)
+
+        def kickoff(model: str) -> Any:
+            crew, inputs = prepare_crew_run(crew_for_model(recipe_crew, fallback_crews, model), keywords,
+                                            cached_search, draft)
+            start_task_timer()
+            return crew.kickoff(inputs=inputs)
+
+        if llm_client:
+            result, model = llm_client.call(kickoff, stage="crew", with_model=True, scope="crew")
+        else:
+            result, model = kickoff(GROQ_MODEL_NAME), GROQ_MODEL_NAME
+        return build_crew_result(keywords, result, cached_search, result_cache, search_cache, similarity_cache, model)
+    except CircuitOpen as e:
+        logger.error(f"Skipping '{keywords}': {str(e)}")
+        return None
+    except OpenAIError as e:
+        logger.error(f"LiteLLM Error: {e.message} ([{e.status_code}]) from provider {e.llm_provider}")
+        return None
+    except Exception as e:
+        logger.error(f"Unexpected Error during crew execution: {str(e)}", exc_info=True)
+        return None
+
+async def execute_crew_tasks_async(recipe_crew: Crew, keywords: str, limits: "StageLimits",
+                                   result_cache: Optional[ResultCache] = None,
+                                   search_cache: Optional[SearchCache] = None,
+                                   llm_client: Optional[LLMClient] = None,
+                                   fallback_crews: Optional[FallbackCrews] = None,
+                                   similarity_cache: Optional[SimilarityCache] = None,
+                                   direct_search: Optional[Callable[[str], SearchOutput]] = None,
+                                   known_search: Optional[SearchOutput] = None) -> Optional[Dict[str, Any]]:
+    """
+    Asynchronous version of `execute_crew_tasks`.
+
+    Cache lookups run in the default executor and the crew is started with
+    `kickoff_async` on a private copy, so many keywords can be in flight at once.
+    Search and LLM work are bounded by the semaphores in `limits`.
+
+    Args:
+        recipe_crew (Crew): The recipe crew object; it is copied for this run.
+        keywords (str): The search keywords.
+        limits (StageLimits): Per-stage concurrency limits.
+        result_cache (Optional[ResultCache]): Cache consulted before kicking off the crew.
+        search_cache (Optional[SearchCache]): Cache of parsed search results.
+        llm_client (Optional[LLMClient]): Rate limits, retries and falls back for the kickoff.
+        fallback_crews (Optional[FallbackCrews]): Crews built on each fallback model.
+        similarity_cache (Optional[SimilarityCache]): Finds stored articles for similar keywords.
+        direct_search (Optional[Callable[[str], SearchOutput]]): Searches without the agent loop.
+        known_search (Optional[SearchOutput]): Search results to generate content from.
+
+    Returns:
+        Optional[Dict[str, Any]]: The execution result or None if an error occurred.
+    """
+    from litellm.exceptions import OpenAIError
+
+    draft = None
+    if not known_search:
+        cached = await asyncio.to_thread(lookup_cached_result, keywords, result_cache)
+        if cached:
+            return cached
+        similar, draft = await asyncio.to_thread(similar_cached_result, keywords, result_cache, similarity_cache)
+        if similar:
+            return similar
+
+    try:
+        if known_search:
+            cached_search = known_search
+        elif direct_search:
+            async with limits.search:
+                with timed_stage("search_task"):
+                    cached_search = await asyncio.to_thread(direct_search, keywords)
+            if not cached_search.recipes:
+                logger.error(f"No recipes found for '{keywords}'")
+                return None
+        else:
+            cached_search = await asyncio.to_thread(search_cache.get, keywords) if search_cache else None
+            if not cached_search:
+                cached_search = await search_with_agent_async(recipe_crew, keywords, limits, llm_client,
+                                                              fallback_crews)
+                if not cached_search or not cached_search.recipes:
+                    logger.error(f"No recipes found for '{keywords}'")
+                    return None
+                if search_cache:
+                    await asyncio.to_thread(search_cache.put, keywords, cached_search)
+
+        async def kickoff(model: str) -> Any:
+            crew = crew_for_model(recipe_crew, fallback_crews, model).copy()
+            crew, inputs = prepare_crew_run(crew, keywords, cached_search, draft)
+            async with limits.llm:
+                start_task_timer()
+                return await crew.kickoff_async(inputs=inputs)
+
+        if llm_client:
+            result, model = await llm_client.acall(kickoff, stage="crew", with_model=True, scope="crew")
+        else:
+            result, model = await kickoff(GROQ_MODEL_NAME), GROQ_MODEL_NAME
+        return await asyncio.to_thread(build_crew_result, keywords, result, cached_search, result_cache,
+                                       search_cache, similarity_cache, model)
+    except CircuitOpen as e:
+        logger.error(f"Skipping '{keywords}': {str(e)}")
+        return None
     except OpenAIError as e:
         logger.error(f"LiteLLM Error: {e.message} ([{e.status_code}]) from provider {e.llm_provider}")
         return None
@@ -218,6 +729,10 @@ def validate_outputs(result: Any) -> Tuple[Optional[Any], Optional[Any]]:
     """
     Validate the outputs from the crew execution.
 
+    Tasks that did not produce a Pydantic output have their raw text parsed into
+    SearchOutput/ContentOutput, so a response wrapped in prose or slightly malformed
+    JSON does not fail the whole keyword.
+
     Args:
         result (Any): The result from crew execution.
 
@@ -225,95 +740,1366 @@ def validate_outputs(result: Any) -> Tuple[Optional[Any], Optional[Any]]:
         Tuple[Optional[Any], Optional[Any]]: Validated search and content outputs.
     """
     try:
-        if isinstance(result, list) and len(result) >= 2:
-            search_output = result[0].output if hasattr(result[0], 'output') else result[0]
-            content_output = result[1].output if hasattr(result[1], 'output') else result[1]
-        elif isinstance(result, dict) and 'tasks_output' in result:
-            search_output = result['tasks_output'][0].output
-            content_output = result['tasks_output'][1].output
-        else:
+        if isinstance(result, dict) and 'tasks_output' in result:
+            result = result['tasks_output']
+        if not isinstance(result, list) or len(result) < 2:
             raise ValueError("Unexpected result structure")
+        search_output = task_model(result[0]) or parse_model(getattr(result[0], 'raw', ''), SearchOutput)
+        content_output = task_model(result[1]) or parse_model(getattr(result[1], 'raw', ''), ContentOutput)
         return search_output, content_output
     except (AttributeError, IndexError, KeyError) as e:
         logger.error(f"Error in output validation: {str(e)}")
-        logger.debug(f"Result structure: {result}")
+        logger.debug("Result structure: %s", result)
         return None, None
     except Exception as e:
         logger.error(f"Output validation failed: {str(e)}")
         return None, None
 
-def save_to_mongodb(db_handler: DatabaseHandler, keywords: str, result: Dict[str, Any]) -> None:
+def save_to_mongodb(db_handler: StorageBackend, keywords: str, result: Dict[str, Any]) -> None:
     """
-    Save the generated recipe content to MongoDB.
+    Queue the generated recipe content for storage (MongoDB or SQLite).
+
+    The document is written by the handler's write-behind queue, so this does not
+    wait for a database round-trip. The parsed article is stored once on the document,
+    source recipes go to the deduplicated recipe collection, and the raw transcript is
+    compressed into a side collection. The document records fingerprints of its inputs
+    (keywords, search results, prompt version, model) so `refresh` can tell which
+    stages are stale.
 
     Args:
-        db_handler (DatabaseHandler): The database handler object.
+        db_handler (StorageBackend): The storage backend.
         keywords (str): The search keywords.
         result (Dict[str, Any]): The result to be saved.
     """
     try:
+        tasks_output = result.get('tasks_output', [])
+        content_output = task_model(tasks_output[-1]) if tasks_output else None
+        search_output = task_model(tasks_output[0]) if tasks_output else None
         recipe_document = {
             "keywords": keywords,
+            "keywords_normalized": normalize_keywords(keywords),
+            "created_at": datetime.utcnow(),
+            "model": result.get('model') or GROQ_MODEL_NAME,
+            "prompt_version": PROMPT_VERSION,
+            "content": content_output.dict() if isinstance(content_output, ContentOutput) else None,
+            "token_usage": result.get('token_usage', {})
+        }
+        recipes = search_output.dict()["recipes"] if isinstance(search_output, SearchOutput) else []
+        recipe_document["fingerprints"] = generation_fingerprints(keywords, recipes, recipe_document["model"],
+                                                                  PROMPT_VERSION)
+        transcript = {
             "raw_output": result.get('raw', ''),
-            "tasks_output": [
+            "tasks": [
                 {
                     "description": getattr(task, 'description', ''),
-                    "agent": getattr(getattr(task, 'agent', None), 'name', ''),
-                    "result": task.output.dict() if hasattr(task.output, 'dict') else str(task.output)
-                } for task in result.get('tasks_output', [])
-            ],
-            "token_usage": result.get('token_usage', {})
+                    "agent": str(getattr(task, 'agent', '') or ''),
+                    "raw": str(getattr(task, 'raw', task))
+                } for task in tasks_output
+            ]
         }
-        db_handler.recipes_collection.insert_one(recipe_document)
-        logger.info(f"Generated and saved recipe content for '{keywords}'")
+        recorder = current_recorder.get()
+        if recorder:
+            recipe_document["metrics"] = recorder.to_dict()
+        job_item = current_job_item.get()
+        if job_item:
+            recipe_document["_id"] = job_item["generation_id"]
+            recipe_document["job_id"] = job_item["job_id"]
+        with timed_stage("mongo_write"):
+            db_handler.save_generation(recipe_document, recipes, transcript)
+        logger.info(f"Generated and queued recipe content for '{keywords}'")
     except Exception as e:
-        logger.error(f"Failed to save to MongoDB: {str(e)}")
-        logger.debug(f"Result structure: {result}")
+        logger.error(f"Failed to save generation: {str(e)}")
+        logger.debug("Result structure: %s", result)
 
-def main() -> None:
+@dataclass
+class PipelineContext:
     """
-    Main function to run the recipe content generation process.
+    Long-lived objects shared by every keyword processed in a run.
     """
-    global db_handler, db_connection_closed
-    db_handler = None
-    try:
-        # Set up signal handlers
-        signal.signal(signal.SIGINT, graceful_shutdown)
-        signal.signal(signal.SIGTERM, graceful_shutdown)
-
-        check_environment_variables()
-        llm = initialize_llm()
-        db_handler = DatabaseHandler(MONGODB_URI)
-        agents = initialize_agents(llm)
-        recipe_crew = create_recipe_crew(agents)
-        terminal_ui = TerminalUI()
+    recipe_crew: Crew
+    db_handler: StorageBackend
+    result_cache: Optional[ResultCache] = None
+    search_cache: Optional[SearchCache] = None
+    content_agent: Optional[ContentGeneratorAgent] = None
+    llm_client: Optional[LLMClient] = None
+    fallback_crews: Optional[FallbackCrews] = None
+    similarity_cache: Optional[SimilarityCache] = None
+    search_agent: Optional[InternetSearchAgent] = None
+    # "agent" runs the search task through the LLM; "direct" calls the search API itself
+    search_mode: str = SEARCH_MODE
+
+    @property
+    def direct_search(self) -> Optional[Callable[[str], SearchOutput]]:
+        if self.search_mode == "direct" and self.search_agent:
+            return self.search_agent.search_recipes
+        return None
+
+@dataclass
+class StageLimits:
+    """
+    Per-stage concurrency limits for the asyncio pipeline.
+    """
+    llm: asyncio.Semaphore
+    search: asyncio.Semaphore
+    db: asyncio.Semaphore
+
+def create_stage_limits() -> StageLimits:
+    """
+    Create stage semaphores from the configured limits.
+
+    Returns:
+        StageLimits: Semaphores bounding LLM, search and database work.
+    """
+    return StageLimits(
+        llm=asyncio.Semaphore(LLM_CONCURRENCY),
+        search=asyncio.Semaphore(SEARCH_CONCURRENCY),
+        db=asyncio.Semaphore(DB_CONCURRENCY)
+    )
+
+def validate_result(result: Dict[str, Any]) -> Optional[Any]:
+    """
+    Log the raw output of an execution result and return its validated content output.
+
+    Args:
+        result (Dict[str, Any]): The execution result.
+
+    Returns:
+        Optional[Any]: The content output, or None if validation failed.
+    """
+    # Raw output is only logged at debug level, truncated by the log handler
+    logger.debug("Raw Output: %s", result['raw'])
+
+    with timed_stage("validate_outputs"):
+        search_output, content_output = validate_outputs(result.get('tasks_output', []))
+    if search_output is None and content_output is None:
+        logger.error("Failed to validate outputs. Skipping this iteration.")
+        return None
+    return content_output
 
-        terminal_ui.display_welcome_message()
+def process_keyword(context: PipelineContext, keywords: str) -> Optional[Any]:
+    """
+    Run search, content generation, validation and persistence for one keyword.
+
+    Args:
+        context (PipelineContext): The crew, database handler and caches to use.
+        keywords (str): The search keywords.
 
-        for keywords in process_user_input(terminal_ui):
-            result = execute_crew_tasks(recipe_crew, keywords)
+    Returns:
+        Optional[Any]: The validated content output, or None if the keyword failed.
+    """
+    recorder = StageRecorder()
+    token = current_recorder.set(recorder)
+    try:
+        with recorder.stage("total"):
+            result = execute_crew_tasks(
+                context.recipe_crew, keywords, context.result_cache, context.search_cache,
+                context.llm_client, context.fallback_crews, context.similarity_cache, context.direct_search
+            )
             if result is None:
-                continue
+                return None
 
-            logger.info(f"Raw Output: {result['raw']}")
+            content_output = validate_result(result)
+            # Cached results were persisted when they were first generated
+            if content_output is not None and not result.get('cached'):
+                save_to_mongodb(context.db_handler, keywords, result)
+            return content_output
+    finally:
+        current_recorder.reset(token)
 
-            search_output, content_output = validate_outputs(result.get('tasks_output', []))
-            if search_output is None and content_output is None:
-                logger.error("Failed to validate outputs. Skipping this iteration.")
-                continue
+async def process_keyword_async(context: PipelineContext, limits: StageLimits, keywords: str,
+                                known_search: Optional[SearchOutput] = None) -> Optional[Any]:
+    """
+    Asynchronous version of `process_keyword`.
 
-            save_to_mongodb(db_handler, keywords, result)
-            terminal_ui.display_result(content_output)
+    Args:
+        context (PipelineContext): The crew, database handler and caches to use.
+        limits (StageLimits): Per-stage concurrency limits.
+        keywords (str): The search keywords.
+        known_search (Optional[SearchOutput]): Search results to generate content from
+            instead of searching.
 
-    except OpenAIError as e:
-        logger.error(f"LiteLLM Error: {e.message} ([{e.status_code}]) from provider {e.llm_provider}")
-    except Exception as e:
-        logger.error(f"An unexpected error occurred: {str(e)}", exc_info=True)
+    Returns:
+        Optional[Any]: The validated content output, or None if the keyword failed.
+    """
+    recorder = StageRecorder()
+    token = current_recorder.set(recorder)
+    try:
+        with recorder.stage("total"):
+            result = await execute_crew_tasks_async(
+                context.recipe_crew, keywords, limits, context.result_cache, context.search_cache,
+                context.llm_client, context.fallback_crews, context.similarity_cache, context.direct_search,
+                known_search
+            )
+            if result is None:
+                return None
+
+            content_output = validate_result(result)
+            # A job keyword must end with its own stored generation, even on a cache hit
+            if content_output is not None and (not result.get('cached') or current_job_item.get()):
+                async with limits.db:
+                    await asyncio.to_thread(save_to_mongodb, context.db_handler, keywords, result)
+            return content_output
     finally:
-        if db_handler and not db_connection_closed:
-            db_handler.close()
-            db_connection_closed = True
-            logger.info("MongoDB connection closed.")
+        current_recorder.reset(token)
+
+def new_job_id() -> str:
+    """
+    Return a unique, time-ordered id for a new batch job.
+    """
+    return f"batch-{datetime.utcnow():%Y%m%d-%H%M%S}-{os.urandom(2).hex()}"
+
+async def run_batch_mode(context: PipelineContext, terminal_ui: TerminalUI,
+                         keywords_file: str, concurrency: int, job_id: Optional[str] = None) -> BatchReport:
+    """
+    Process every keyword from a file (or stdin) through a bounded pool of worker tasks.
+
+    The batch is recorded as a job, so an interrupted run can be finished with
+    `resume <job_id>`. Passing the id of an existing job adds any new keywords to it
+    and processes only the keywords it has not completed.
+
+    Args:
+        context (PipelineContext): The crew, database handler and caches to use.
+        terminal_ui (TerminalUI): The terminal UI object.
+        keywords_file (str): Path to a keyword file, one per line, or '-' for stdin.
+        concurrency (int): Maximum number of keywords in flight.
+        job_id (Optional[str]): Job to create or extend; generated when omitted.
+
+    Returns:
+        BatchReport: Ordered per-keyword results with latency and throughput.
+    """
+    if keywords_file == "-":
+        keywords = list(read_keywords(sys.stdin))
+    else:
+        with open(keywords_file, encoding="utf-8") as source:
+            keywords = list(read_keywords(source))
+
+    job_id = job_id or new_job_id()
+    added = await asyncio.to_thread(
+        context.db_handler.create_job, job_id, keywords,
+        source=keywords_file, model=GROQ_MODEL_NAME, prompt_version=PROMPT_VERSION
+    )
+    logger.info(f"Job '{job_id}': {added} new keywords of {len(keywords)} read from {keywords_file}")
+    terminal_ui.console.print(f"[bold blue]Job {job_id} (resume with: main.py resume {job_id})[/bold blue]")
+    return await run_job(context, terminal_ui, job_id, concurrency)
+
+def remaining_job_keywords(db_handler: StorageBackend, job_id: str, max_attempts: int) -> List[Dict[str, Any]]:
+    """
+    Return the job keywords that still need a run.
+
+    Pending and running keywords (running ones were interrupted) are always included,
+    failed ones until they reach `max_attempts`, and done ones whose generation never
+    reached the database (the process died before the write-behind queue flushed).
+
+    Args:
+        db_handler (StorageBackend): The storage backend holding the job.
+        job_id (str): The job.
+        max_attempts (int): Attempts after which a failed keyword is left alone.
+
+    Returns:
+        List[Dict[str, Any]]: Job keyword entries in their original order.
+    """
+    items = db_handler.job_keywords(job_id)
+    done_ids = [item["generation_id"] for item in items if item["state"] == "done"]
+    stored = db_handler.existing_generations(done_ids) if done_ids else set()
+    return [
+        item for item in items
+        if item["state"] in ("pending", "running")
+        or (item["state"] == "failed" and item["attempts"] < max_attempts)
+        or (item["state"] == "done" and item["generation_id"] not in stored)
+    ]
+
+async def run_job_item(context: PipelineContext, limits: StageLimits, job_id: str,
+                       item: Dict[str, Any], worker_id: Optional[str] = None) -> Optional[Any]:
+    """
+    Run one job keyword that is already marked running and record how it ended.
+
+    Args:
+        context (PipelineContext): The crew, database handler and caches to use.
+        limits (StageLimits): Per-stage concurrency limits.
+        job_id (str): The job the keyword belongs to.
+        item (Dict[str, Any]): The job keyword entry.
+        worker_id (Optional[str]): The worker that claimed the entry. The outcome is then
+            only recorded while the claim still holds.
+
+    Returns:
+        Optional[Any]: The validated content output, or None if the keyword failed.
+    """
+    db_handler = context.db_handler
+    kw = item["keywords"]
+    claim = {"worker": worker_id, "attempts": item.get("attempts")} if worker_id else {}
+
+    async def record(state: str, error: Optional[str] = None) -> None:
+        updated = await asyncio.to_thread(db_handler.update_job_keyword, job_id, kw, state, error, **claim)
+        if not updated and worker_id:
+            logger.warning(f"Worker {worker_id}: claim on '{kw}' expired and was taken over; "
+                           f"not recording it as {state}")
+
+    token = current_job_item.set(item)
+    try:
+        try:
+            content_output = await process_keyword_async(context, limits, kw)
+        except Exception as e:
+            await record("failed", str(e))
+            raise
+        if content_output is None:
+            await record("failed", "No output produced")
+        else:
+            await record("done")
+        return content_output
+    finally:
+        current_job_item.reset(token)
+
+async def run_job(context: PipelineContext, terminal_ui: TerminalUI, job_id: str, concurrency: int,
+                  max_attempts: int = JOB_MAX_ATTEMPTS) -> Optional[BatchReport]:
+    """
+    Run the remaining keywords of a job, recording each keyword's state as it goes.
+
+    State changes are written synchronously, so after a crash `resume` picks up exactly
+    the keywords that did not finish. Generations are saved under the id each keyword
+    reserved, so a keyword that is run twice still has one generation.
+
+    Args:
+        context (PipelineContext): The crew, database handler and caches to use.
+        terminal_ui (TerminalUI): The terminal UI object.
+        job_id (str): The job to run.
+        concurrency (int): Maximum number of keywords in flight.
+        max_attempts (int): Attempts after which a failed keyword is not retried.
+
+    Returns:
+        Optional[BatchReport]: Results for the keywords run, or None if the job does not exist.
+    """
+    db_handler = context.db_handler
+    job = await asyncio.to_thread(db_handler.get_job, job_id)
+    if job is None:
+        logger.error(f"Job '{job_id}' not found")
+        return None
+    items = await asyncio.to_thread(remaining_job_keywords, db_handler, job_id, max_attempts)
+    by_keywords = {item["keywords"]: item for item in items}
+
+    async def process(kw: str) -> Optional[Any]:
+        await asyncio.to_thread(db_handler.update_job_keyword, job_id, kw, "running")
+        return await run_job_item(context, limits, job_id, by_keywords[kw])
+
+    logger.info(f"Job '{job_id}': {len(items)} of {job.get('total', len(items))} keywords remaining, "
+                f"concurrency {concurrency}")
+    limits = create_stage_limits()
+    report = await run_batch(list(by_keywords), process, concurrency, on_result=terminal_ui.display_batch_result)
+
+    # Done keywords are only finished once their generation is actually stored
+    await asyncio.to_thread(db_handler.flush)
+    remaining = await asyncio.to_thread(remaining_job_keywords, db_handler, job_id, max_attempts)
+    status = "done" if not remaining else "incomplete"
+    await asyncio.to_thread(db_handler.finish_job, job_id, status)
+    logger.info(
+        f"Job '{job_id}' {status}: {report.succeeded}/{len(report.results)} succeeded in "
+        f"{report.wall_time:.2f}s ({report.throughput:.2f} keywords/s), {len(remaining)} remaining"
+    )
+    terminal_ui.display_batch_summary(report)
+    terminal_ui.display_stage_metrics(metrics.snapshot())
+    display_cache_stats(context, terminal_ui)
+    return report
+
+async def run_worker(job_id: str, worker_id: str, args: argparse.Namespace) -> None:
+    """
+    Build a pipeline once, then run keywords claimed from a job until none are left.
+
+    Each of `args.concurrency` slots claims a keyword, runs it and claims the next. On SIGTERM
+    or SIGINT the slots stop claiming and the worker exits once in-flight keywords are
+    done and the write-behind queue is flushed.
+
+    Args:
+        job_id (str): The job to take keywords from.
+        worker_id (str): Recorded on each claimed keyword.
+        args (argparse.Namespace): Parsed `worker` arguments: concurrency, max_attempts,
+            search_mode and the cassette options.
+    """
+    from litellm.exceptions import OpenAIError
+
+    configure_default_executor()
+    stopping = asyncio.Event()
+    loop = asyncio.get_running_loop()
+    for signum in (signal.SIGTERM, signal.SIGINT):
+        loop.add_signal_handler(signum, stopping.set)
+
+    db_handler = None
+    context = None
+    processed = 0
+    succeeded = 0
+    try:
+        check_environment_variables(replaying=args.cassette_mode == "replay")
+        configure_cassette(args)
+        db_handler = open_storage(DATABASE_URI)
+        context = create_pipeline_context(db_handler, args.search_mode)
+        limits = create_stage_limits()
+
+        async def claim_and_run() -> None:
+            nonlocal processed, succeeded
+            while not stopping.is_set():
+                item = await asyncio.to_thread(
+                    db_handler.claim_job_keyword, job_id, worker_id, args.max_attempts, JOB_CLAIM_LEASE
+                )
+                if item is None:
+                    return
+                try:
+                    content_output = await run_job_item(context, limits, job_id, item, worker_id)
+                except Exception as e:
+                    logger.error(f"Worker {worker_id}: '{item['keywords']}' failed: {str(e)}", exc_info=True)
+                    content_output = None
+                processed += 1
+                succeeded += content_output is not None
+
+        logger.info(f"Worker {worker_id} started on job '{job_id}' with concurrency {args.concurrency}")
+        await asyncio.gather(*(claim_and_run() for _ in range(args.concurrency)))
+    except OpenAIError as e:
+        logger.error(f"LiteLLM Error: {e.message} ([{e.status_code}]) from provider {e.llm_provider}")
+    except Exception as e:
+        logger.error(f"Worker {worker_id} stopped on an unexpected error: {str(e)}", exc_info=True)
+    finally:
+        if context:
+            close_caches(context)
+        if db_handler:
+            await asyncio.to_thread(db_handler.close)
+        logger.info(f"Worker {worker_id} {'drained' if stopping.is_set() else 'finished'}: "
+                    f"{succeeded}/{processed} keywords succeeded")
+
+def worker_process_main(job_id: str, args: argparse.Namespace) -> None:
+    """
+    Entry point of a worker process started by `run_workers`.
+    """
+    # Rotating one file from several processes would lose records, so each worker has its own
+    root, extension = os.path.splitext(LOG_FILE)
+    configure_logging(args.log_profile, f"{root}.{multiprocessing.current_process().name}{extension}")
+    asyncio.run(run_worker(job_id, f"{socket.gethostname()}:{os.getpid()}", args))
+
+def run_workers(args: argparse.Namespace) -> None:
+    """
+    Run a job on several worker processes sharing its keywords as a work queue.
+
+    Every process builds its own LLM client, crews and storage connection, so Pydantic
+    validation, JSON parsing and rendering run on separate cores instead of sharing one
+    GIL. Keywords are claimed atomically from the job in storage, so workers started on
+    other machines against the same MongoDB database share the job too (a SQLite file
+    can only be shared by processes on one machine).
+
+    SIGTERM or Ctrl-C drains: workers stop claiming and exit when their in-flight keywords
+    are saved. A second signal kills them; their keywords are claimed again once
+    JOB_CLAIM_LEASE has passed.
+
+    Args:
+        args (argparse.Namespace): Parsed `worker` arguments.
+    """
+    job_id = args.job_id
+    if args.keywords_file:
+        with open(args.keywords_file, encoding="utf-8") as source:
+            keywords = list(read_keywords(source))
+        job_id = job_id or new_job_id()
+        handler = open_storage(DATABASE_URI)
+        try:
+            added = handler.create_job(job_id, keywords, source=args.keywords_file,
+                                       model=GROQ_MODEL_NAME, prompt_version=PROMPT_VERSION)
+        finally:
+            handler.close()
+        logger.info(f"Job '{job_id}': {added} new keywords of {len(keywords)} read from {args.keywords_file}")
+    elif not job_id:
+        logger.error("Give a job id, --keywords-file, or both")
+        return
+
+    # spawn, not fork: the parent's threads and client connections must not leak into workers
+    mp_context = multiprocessing.get_context("spawn")
+    processes = [
+        mp_context.Process(target=worker_process_main, args=(job_id, args),
+                           name=f"worker-{index}")
+        for index in range(args.processes)
+    ]
+    draining = False
+
+    def drain(signum, frame):
+        nonlocal draining
+        if draining:
+            console.print("[bold red]Killing workers; their keywords will be claimed again after the lease.[/bold red]")
+            for process in processes:
+                process.kill()
+            return
+        draining = True
+        console.print("[bold yellow]Draining workers: finishing in-flight keywords...[/bold yellow]")
+        for process in processes:
+            if process.pid and process.is_alive():
+                os.kill(process.pid, signal.SIGTERM)
+
+    signal.signal(signal.SIGTERM, drain)
+    signal.signal(signal.SIGINT, drain)
+    console.print(f"[bold blue]Job {job_id}: starting {args.processes} workers x {args.concurrency} keywords[/bold blue]")
+    for process in processes:
+        process.start()
+    for process in processes:
+        process.join()
+
+    handler = open_storage(DATABASE_URI)
+    try:
+        remaining = remaining_job_keywords(handler, job_id, args.max_attempts)
+        handler.finish_job(job_id, "done" if not remaining else "incomplete")
+        job = handler.get_job(job_id)
+        if job:
+            TerminalUI().display_jobs([job])
+    finally:
+        handler.close()
+
+@dataclass
+class RefreshItem:
+    """
+    The latest stored generation for a keyword, and the inputs that changed since it was generated.
+    """
+    generation_id: Any
+    keywords: str
+    fingerprints: Dict[str, Any]
+    changed: List[str]
+
+def plan_refresh(db_handler: StorageBackend, since: Optional[datetime] = None, search: bool = False,
+                 batch_size: int = 500) -> Tuple[List[RefreshItem], int]:
+    """
+    Find the keywords whose latest generation is stale.
+
+    Generations are streamed oldest first and only the newest one per keyword is kept.
+    Its stored fingerprints are compared with the current prompt version and model;
+    with `search` every keyword is included, since the search results can only be
+    compared once they have been fetched again.
+
+    Args:
+        db_handler (StorageBackend): The storage backend.
+        since (Optional[datetime]): Only consider generations created on or after this time.
+        search (bool): Re-run the search stage for every keyword.
+        batch_size (int): Documents per database round trip.
+
+    Returns:
+        Tuple[List[RefreshItem], int]: The generations to refresh, and the number of keywords considered.
+    """
+    latest = {}
+    for document in db_handler.iter_generations(since=since, batch_size=batch_size):
+        fingerprints = stored_fingerprints(document)
+        latest[fingerprints["keywords"]] = (document["_id"], document.get("keywords", ""), fingerprints)
+    current = {"prompt_version": PROMPT_VERSION, "model": GROQ_MODEL_NAME}
+    items = []
+    for generation_id, keywords, fingerprints in latest.values():
+        changed = changed_inputs(fingerprints, current)
+        if changed or search:
+            items.append(RefreshItem(generation_id, keywords, fingerprints, changed))
+    return items, len(latest)
+
+async def refresh_generation(context: PipelineContext, limits: StageLimits, item: RefreshItem,
+                             search: bool = False) -> Optional[Any]:
+    """
+    Regenerate one stale generation, re-running only the stages whose inputs changed.
+
+    The stored search results stand in for the search stage, so a prompt or model
+    change costs one content-stage LLM call. The search is re-run (directly, without
+    the search agent or the search cache, which then holds the fresh results) when
+    `search` is set or the generation has no stored recipes;
+    if the new results match the stored fingerprint and nothing else changed, the
+    stored article is kept.
+
+    Args:
+        context (PipelineContext): The crew, database handler and caches to use.
+        limits (StageLimits): Per-stage concurrency limits.
+        item (RefreshItem): The generation to refresh.
+        search (bool): Re-run the search stage.
+
+    Returns:
+        Optional[Any]: The new (or kept) content output, or None if the keyword failed.
+    """
+    document = await asyncio.to_thread(context.db_handler.get_generation, item.generation_id, False, True)
+    recipes = (document or {}).get("recipes") or []
+    changed = item.changed
+    if search or not recipes:
+        async with limits.search:
+            with timed_stage("search_task"):
+                search_output = await asyncio.to_thread(context.search_agent.search_recipes, item.keywords, True)
+        if not search_output.recipes:
+            logger.error(f"No recipes found for '{item.keywords}'")
+            return None
+        changed = changed_inputs(item.fingerprints, {
+            "search": search_fingerprint(search_output.dict()["recipes"]),
+            "prompt_version": PROMPT_VERSION,
+            "model": GROQ_MODEL_NAME
+        })
+        if not changed and document and document.get("content"):
+            logger.info(f"Search results for '{item.keywords}' are unchanged; keeping generation {item.generation_id}")
+            return ContentOutput(**document["content"])
+    else:
+        search_output = SearchOutput(recipes=recipes)
+    logger.info(f"Refreshing '{item.keywords}' ({', '.join(changed)} changed)")
+    return await process_keyword_async(context, limits, item.keywords, known_search=search_output)
+
+async def run_refresh(context: PipelineContext, terminal_ui: TerminalUI, concurrency: int,
+                      since: Optional[datetime] = None, search: bool = False,
+                      limit: Optional[int] = None) -> BatchReport:
+    """
+    Regenerate every stale generation, re-running only its stale stages.
+
+    Each refreshed article is saved as a new generation with current fingerprints, so
+    the earlier one stays in history and a second refresh finds nothing to do.
+
+    Args:
+        context (PipelineContext): The crew, database handler and caches to use.
+        terminal_ui (TerminalUI): The terminal UI object.
+        concurrency (int): Maximum number of keywords in flight.
+        since (Optional[datetime]): Only consider generations created on or after this time.
+        search (bool): Re-run the search stage for every keyword.
+        limit (Optional[int]): Refresh at most this many keywords.
+
+    Returns:
+        BatchReport: Results for the refreshed keywords.
+    """
+    items, considered = await asyncio.to_thread(plan_refresh, context.db_handler, since, search)
+    items = items[:limit] if limit else items
+    logger.info(f"Refreshing {len(items)} of {considered} keywords "
+                f"({'search and content' if search else 'content only'}), concurrency {concurrency}")
+    by_keywords = {item.keywords: item for item in items}
+    limits = create_stage_limits()
+
+    async def process(kw: str) -> Optional[Any]:
+        return await refresh_generation(context, limits, by_keywords[kw], search)
+
+    report = await run_batch(list(by_keywords), process, concurrency, on_result=terminal_ui.display_batch_result)
+    await asyncio.to_thread(context.db_handler.flush)
+    terminal_ui.display_batch_summary(report)
+    terminal_ui.display_stage_metrics(metrics.snapshot())
+    return report
+
+def run_refresh_plan(args: argparse.Namespace) -> None:
+    """
+    List the keywords `refresh` would regenerate and which of their inputs changed.
+
+    Args:
+        args (argparse.Namespace): Parsed `refresh --dry-run` arguments.
+    """
+    handler = open_storage(DATABASE_URI)
+    try:
+        items, considered = plan_refresh(handler, args.since, args.search)
+    finally:
+        handler.close()
+    items = items[:args.limit] if args.limit else items
+    for item in items:
+        reason = ", ".join(item.changed) or "search"
+        console.print(f"[cyan]{item.keywords}[/cyan] (generation {item.generation_id}): {reason}")
+    stage = "search and content" if args.search else "content"
+    console.print(f"[bold blue]{len(items)} of {considered} keywords would have their {stage} regenerated[/bold blue]")
+
+async def search_keyword_async(context: PipelineContext, limits: StageLimits, keywords: str) -> Optional[SearchOutput]:
+    """
+    Run only the search stage for one keyword, using the search cache when possible.
+
+    Args:
+        context (PipelineContext): The crew, database handler and caches to use.
+        limits (StageLimits): Per-stage concurrency limits.
+        keywords (str): The search keywords.
+
+    Returns:
+        Optional[SearchOutput]: The search results, or None if the search failed.
+    """
+    from litellm.exceptions import OpenAIError
+
+    if context.direct_search:
+        # search_recipes checks and fills the search cache itself
+        async with limits.search:
+            search_output = await asyncio.to_thread(context.direct_search, keywords)
+        return search_output if search_output.recipes else None
+
+    if context.search_cache:
+        cached_search = await asyncio.to_thread(context.search_cache.get, keywords)
+        if cached_search:
+            return cached_search
+
+    try:
+        search_output = await search_with_agent_async(context.recipe_crew, keywords, limits, context.llm_client,
+                                                      context.fallback_crews)
+    except CircuitOpen as e:
+        logger.error(f"Skipping search for '{keywords}': {str(e)}")
+        return None
+    except OpenAIError as e:
+        logger.error(f"LiteLLM Error: {e.message} ([{e.status_code}]) from provider {e.llm_provider}")
+        return None
+    except Exception as e:
+        logger.error(f"Unexpected Error during search: {str(e)}", exc_info=True)
+        return None
+
+    if search_output and context.search_cache:
+        await asyncio.to_thread(context.search_cache.put, keywords, search_output)
+    return search_output
+
+async def stream_keyword_async(context: PipelineContext, limits: StageLimits,
+                               keywords: str) -> AsyncIterator[ContentStreamEvent]:
+    """
+    Run the pipeline for one keyword, streaming the content stage as it is generated.
+
+    The search stage runs as usual (or comes from the search cache); the content stage
+    streams tokens and completed ContentOutput fields straight from the model. The final
+    content is cached and saved like a regular run, unless the response could not be
+    parsed.
+
+    Args:
+        context (PipelineContext): The crew, content agent, database handler and caches to use.
+        limits (StageLimits): Per-stage concurrency limits.
+        keywords (str): The search keywords.
+
+    Yields:
+        ContentStreamEvent: Token, field and done events from the content stage.
+    """
+    from litellm.exceptions import OpenAIError
+
+    recorder = StageRecorder()
+    with recorder.stage("search_task"):
+        search_output = await search_keyword_async(context, limits, keywords)
+    if search_output is None:
+        logger.error(f"Search failed for '{keywords}'; nothing to stream.")
+        return
+
+    done = None
+    try:
+        async with limits.llm:
+            recorder.mark()
+            async for event in context.content_agent.stream_content(search_output, keywords):
+                if event.kind == "token" and "time_to_first_token" not in recorder.stages:
+                    recorder.lap("time_to_first_token")
+                if event.kind == "done":
+                    done = event
+                yield event
+            recorder.lap("content_stream")
+    except CircuitOpen as e:
+        logger.error(f"Skipping '{keywords}': {str(e)}")
+        return
+    except OpenAIError as e:
+        logger.error(f"LiteLLM Error: {e.message} ([{e.status_code}]) from provider {e.llm_provider}")
+        return
+    except Exception as e:
+        logger.error(f"Unexpected Error during content streaming: {str(e)}", exc_info=True)
+        return
+
+    if done is None:
+        return
+    if done.failed:
+        # Keep the placeholder out of the caches and the database so the next request retries
+        logger.error(f"Not caching or saving unparsed content for '{keywords}'.")
+        return
+    model = done.model or GROQ_MODEL_NAME
+    if context.result_cache:
+        await asyncio.to_thread(context.result_cache.put, keywords, model, PROMPT_VERSION,
+                                search_output, done.content, done.token)
+        if context.similarity_cache and model == GROQ_MODEL_NAME:
+            await asyncio.to_thread(context.similarity_cache.add, keywords, done.content.title)
+    result = {
+        'raw': done.token,
+        'tasks_output': [
+            CachedTaskOutput(description="Search for food recipes", agent="Internet Researcher",
+                             output=search_output),
+            CachedTaskOutput(description="Generate SEO-optimized food recipe content", agent="Content Generator",
+                             raw=done.token, output=done.content)
+        ],
+        'model': model
+    }
+    token = current_recorder.set(recorder)
+    try:
+        async with limits.db:
+            await asyncio.to_thread(save_to_mongodb, context.db_handler, keywords, result)
+    finally:
+        current_recorder.reset(token)
+
+async def run_server_mode(context: PipelineContext, host: str, port: int) -> None:
+    """
+    Serve generate/search endpoints over HTTP until the process is stopped.
+
+    Concurrent requests for the same normalized keywords are coalesced onto one
+    pipeline execution, and new executions beyond SERVER_MAX_IN_FLIGHT running plus
+    SERVER_MAX_QUEUE waiting are rejected with 429.
+
+    Args:
+        context (PipelineContext): The crew, database handler and caches to use.
+        host (str): Interface to bind.
+        port (int): Port to bind.
+    """
+    limits = create_stage_limits()
+
+    async def generate(keywords: str) -> Optional[ContentOutput]:
+        content_output = await process_keyword_async(context, limits, keywords)
+        return content_output if isinstance(content_output, ContentOutput) else task_model(content_output)
+
+    service = RecipeService(
+        generate,
+        lambda keywords: search_keyword_async(context, limits, keywords),
+        max_in_flight=SERVER_MAX_IN_FLIGHT,
+        max_queue=SERVER_MAX_QUEUE
+    )
+    server = create_http_server(service, asyncio.get_running_loop(), host, port)
+    console.print(f"[bold green]Serving on http://{host}:{port}[/bold green]")
+    try:
+        await asyncio.to_thread(server.serve_forever)
+    finally:
+        server.shutdown()
+        server.server_close()
+
+async def dump_metrics_periodically(path: str, interval: float) -> None:
+    """
+    Write a JSON snapshot of the metrics registry to `path` every `interval` seconds.
+
+    Args:
+        path (str): Output file, replaced atomically on each dump.
+        interval (float): Seconds between dumps.
+    """
+    while True:
+        await asyncio.sleep(interval)
+        try:
+            await asyncio.to_thread(metrics.dump_json, path)
+        except OSError as e:
+            logger.error(f"Failed to write metrics to {path}: {str(e)}")
+
+async def read_user_input(terminal_ui: TerminalUI) -> AsyncIterator[str]:
+    """
+    Prompt for keywords without blocking the event loop.
+
+    The prompt runs on a daemon thread rather than the default executor: shutdown joins
+    executor threads, so one waiting on stdin would keep the process alive after a
+    signal until the user pressed Enter. The next prompt is shown only once the caller
+    asks for it, so it never interleaves with a result being displayed.
+
+    Args:
+        terminal_ui (TerminalUI): The terminal UI object.
+
+    Yields:
+        str: User input keywords, until the user quits or stdin is closed.
+    """
+    loop = asyncio.get_running_loop()
+    requests: queue.Queue = queue.Queue()
+    answers: asyncio.Queue = asyncio.Queue()
+
+    def prompt() -> None:
+        user_input = process_user_input(terminal_ui)
+        while True:
+            requests.get()
+            try:
+                keywords = next(user_input, None)
+            except EOFError:
+                keywords = None
+            loop.call_soon_threadsafe(answers.put_nowait, keywords)
+            if keywords is None:
+                return
+
+    threading.Thread(target=prompt, name="keyword-prompt", daemon=True).start()
+    while True:
+        requests.put(None)
+        keywords = await answers.get()
+        if keywords is None:
+            return
+        yield keywords
+
+async def run_interactive_mode(context: PipelineContext, terminal_ui: TerminalUI, stream: bool = False) -> None:
+    """
+    Prompt for keywords and display generated content until the user quits.
+
+    Args:
+        context (PipelineContext): The crew, database handler and caches to use.
+        terminal_ui (TerminalUI): The terminal UI object.
+        stream (bool): Render content live as it is generated instead of after the run.
+    """
+    limits = create_stage_limits()
+    terminal_ui.display_welcome_message()
+
+    async for keywords in read_user_input(terminal_ui):
+        if stream:
+            cached = await asyncio.to_thread(lookup_cached_result, keywords, context.result_cache)
+            if not cached:
+                # Streaming always generates from search results, so a draft match is not used
+                cached, _ = await asyncio.to_thread(similar_cached_result, keywords, context.result_cache,
+                                                    context.similarity_cache)
+            if cached:
+                terminal_ui.display_result(validate_result(cached))
+            else:
+                await terminal_ui.display_streaming_result(stream_keyword_async(context, limits, keywords))
+            continue
+        content_output = await process_keyword_async(context, limits, keywords)
+        if content_output is None:
+            continue
+        terminal_ui.display_result(content_output)
+
+class FallbackCrews:
+    """
+    Recipe crews on the fallback models, built the first time each one is needed.
+
+    Most runs never fall back, so building every fallback crew up front only slows startup.
+    """
+
+    def __init__(self, llm_client: LLMClient, search_cache: Optional[SearchCache]):
+        self.llm_client = llm_client
+        self.search_cache = search_cache
+        self._crews: Dict[str, Crew] = {}
+        self._lock = threading.Lock()
+
+    def get(self, model: str, default: Optional[Crew] = None) -> Optional[Crew]:
+        if model not in self.llm_client.models[1:]:
+            return default
+        with self._lock:
+            if model not in self._crews:
+                logger.info(f"Building fallback crew on {model}")
+                self._crews[model] = create_recipe_crew(
+                    initialize_agents(initialize_llm(model), self.search_cache, self.llm_client)
+                )
+            return self._crews[model]
+
+def create_fallback_crews(llm_client: LLMClient, search_cache: Optional[SearchCache]) -> FallbackCrews:
+    """
+    Set up recipe crews on each fallback model, used when the primary model is failing.
+
+    Args:
+        llm_client (LLMClient): The shared client; its models after the first are fallbacks.
+        search_cache (Optional[SearchCache]): Cache of parsed search results.
+
+    Returns:
+        FallbackCrews: Crews keyed by model name, built on first use.
+    """
+    return FallbackCrews(llm_client, search_cache)
+
+def create_result_cache() -> Optional[ResultCache]:
+    """
+    Create the crew result cache if it is enabled.
+
+    Returns:
+        Optional[ResultCache]: The result cache, or None when caching is disabled.
+    """
+    if not RESULT_CACHE_ENABLED:
+        return None
+    return ResultCache(
+        RESULT_CACHE_PATH,
+        ttl=RESULT_CACHE_TTL,
+        max_entries=RESULT_CACHE_MAX_ENTRIES,
+        memory_entries=RESULT_CACHE_MEMORY_ENTRIES
+    )
+
+def create_similarity_cache(result_cache: Optional[ResultCache]) -> Optional[SimilarityCache]:
+    """
+    Create the similarity cache over the result cache's entries if both are enabled.
+
+    Args:
+        result_cache (Optional[ResultCache]): The result cache holding the articles to index.
+
+    Returns:
+        Optional[SimilarityCache]: The similarity cache, or None when it is disabled.
+    """
+    if not SIMILARITY_CACHE_ENABLED or not result_cache:
+        return None
+    from tools.similarity_cache import SimilarityCache
+
+    similarity_cache = SimilarityCache(
+        serve_threshold=SIMILARITY_SERVE_THRESHOLD,
+        draft_threshold=SIMILARITY_DRAFT_THRESHOLD,
+        dimensions=SIMILARITY_DIMENSIONS
+    )
+    similarity_cache.load(result_cache.entries(GROQ_MODEL_NAME, PROMPT_VERSION))
+    return similarity_cache
+
+def create_search_cache() -> Optional[SearchCache]:
+    """
+    Create the search-result cache if it is enabled.
+
+    Returns:
+        Optional[SearchCache]: The search cache, or None when caching is disabled.
+    """
+    if not SEARCH_CACHE_ENABLED:
+        return None
+    return SearchCache(SEARCH_CACHE_PATH, ttl=SEARCH_CACHE_TTL)
+
+def display_cache_stats(context: PipelineContext, terminal_ui: TerminalUI) -> None:
+    """
+    Display hit/miss counters for every enabled cache.
+
+    Args:
+        context (PipelineContext): Holds the caches to report on.
+        terminal_ui (TerminalUI): The terminal UI object.
+    """
+    if context.result_cache:
+        terminal_ui.display_cache_stats("Result Cache", context.result_cache.stats())
+    if context.search_cache:
+        terminal_ui.display_cache_stats("Search Cache", context.search_cache.stats())
+    if context.similarity_cache:
+        terminal_ui.display_cache_stats("Similarity Cache", context.similarity_cache.stats())
+
+def close_caches(context: PipelineContext) -> None:
+    """
+    Close every cache held by the pipeline context.
+
+    Args:
+        context (PipelineContext): Holds the caches to close.
+    """
+    for cache in (context.result_cache, context.search_cache):
+        if cache:
+            cache.close()
+
+def parse_arguments(argv: Optional[List[str]] = None) -> argparse.Namespace:
+    """
+    Parse command line arguments.
+
+    Args:
+        argv (Optional[List[str]]): Arguments to parse, defaults to sys.argv.
+
+    Returns:
+        argparse.Namespace: Parsed arguments. `command` is None for interactive mode.
+    """
+    parser = argparse.ArgumentParser(description="AI-powered Recipe Content Generator")
+    parser.add_argument("--stream", action="store_true",
+                        help="Interactive mode: render content live as the model writes it")
+    parser.add_argument("--search-mode", choices=("agent", "direct"), default=SEARCH_MODE,
+                        help="agent: the search agent calls the search tool; direct: call it without an LLM "
+                             f"round-trip (default: {SEARCH_MODE})")
+    parser.add_argument("--cassette-mode", choices=("off", "record", "replay"), default=CASSETTE_MODE,
+                        help="record: save every LLM and search response to the cassette; "
+                             f"replay: answer from it without the network (default: {CASSETTE_MODE})")
+    parser.add_argument("--cassette", default=CASSETTE_PATH, help=f"Cassette file (default: {CASSETTE_PATH})")
+    parser.add_argument("--replay-latency", type=float, default=CASSETTE_LATENCY_SCALE,
+                        help="Replayed calls wait this multiple of their recorded latency: 1 for realistic "
+                             f"timing, 0 for none (default: {CASSETTE_LATENCY_SCALE})")
+    parser.add_argument("--log-profile", choices=("default", "quiet", "debug"), default=LOG_PROFILE,
+                        help="quiet: only warnings on the console and no agent/crew output; "
+                             f"debug: everything, including raw model output (default: {LOG_PROFILE})")
+    parser.add_argument("--metrics-json", default=METRICS_JSON_PATH,
+                        help="Periodically write stage latency and token metrics to this JSON file")
+    subparsers = parser.add_subparsers(dest="command")
+
+    batch_parser = subparsers.add_parser("batch", help="Generate content for every keyword in a file")
+    batch_parser.add_argument("keywords_file", help="File with one keyword per line, or '-' for stdin")
+    batch_parser.add_argument("-c", "--concurrency", type=int, default=BATCH_CONCURRENCY,
+                              help=f"Maximum keywords in flight (default: {BATCH_CONCURRENCY})")
+    batch_parser.add_argument("--job-id", help="Name the job (default: generated); an existing job is extended")
+
+    resume_parser = subparsers.add_parser("resume", help="Finish the remaining keywords of a batch job")
+    resume_parser.add_argument("job_id", help="Job id printed when the batch started")
+    resume_parser.add_argument("-c", "--concurrency", type=int, default=BATCH_CONCURRENCY,
+                               help=f"Maximum keywords in flight (default: {BATCH_CONCURRENCY})")
+    resume_parser.add_argument("--max-attempts", type=int, default=JOB_MAX_ATTEMPTS,
+                               help=f"Retry failed keywords until this many attempts (default: {JOB_MAX_ATTEMPTS})")
+
+    worker_parser = subparsers.add_parser("worker", help="Run a job on several worker processes")
+    worker_parser.add_argument("job_id", nargs="?", help="Job to work on; workers on other machines may share it")
+    worker_parser.add_argument("--keywords-file", help="First create the job (or add to it) from this keyword file")
+    worker_parser.add_argument("-p", "--processes", type=int, default=WORKER_PROCESSES,
+                               help=f"Worker processes to start (default: {WORKER_PROCESSES})")
+    worker_parser.add_argument("-c", "--concurrency", type=int, default=BATCH_CONCURRENCY,
+                               help=f"Keywords in flight per process (default: {BATCH_CONCURRENCY})")
+    worker_parser.add_argument("--max-attempts", type=int, default=JOB_MAX_ATTEMPTS,
+                               help=f"Retry failed keywords until this many attempts (default: {JOB_MAX_ATTEMPTS})")
+
+    jobs_parser = subparsers.add_parser("jobs", help="List batch jobs or show one job's progress")
+    jobs_parser.add_argument("job_id", nargs="?", help="Show keyword states for this job")
+    jobs_parser.add_argument("-n", "--limit", type=int, default=20, help="Jobs to list (default: 20)")
+
+    serve_parser = subparsers.add_parser("serve", help="Serve generate/search endpoints over HTTP")
+    serve_parser.add_argument("--host", default=SERVER_HOST, help=f"Interface to bind (default: {SERVER_HOST})")
+    serve_parser.add_argument("--port", type=int, default=SERVER_PORT, help=f"Port to bind (default: {SERVER_PORT})")
+
+    subparsers.add_parser("cache-stats", help="Show cache sizes and hit counters")
+
+    history_parser = subparsers.add_parser("history", help="Search previously generated articles")
+    history_parser.add_argument("-k", "--keywords", help="Exact keywords (normalized before matching)")
+    history_parser.add_argument("-t", "--text", help="Words to find in article titles and ingredients")
+    history_parser.add_argument("--since", type=datetime.fromisoformat, help="Only articles created on or after this date (YYYY-MM-DD)")
+    history_parser.add_argument("--until", type=datetime.fromisoformat, help="Only articles created before this date (YYYY-MM-DD)")
+    history_parser.add_argument("-n", "--limit", type=int, default=20, help="Articles per page (default: 20)")
+    history_parser.add_argument("--cursor", help="Cursor printed by the previous page")
+    history_parser.add_argument("--backfill", action="store_true",
+                                help="First add the indexed fields to documents stored before they existed")
+
+    migrate_parser = subparsers.add_parser("migrate-storage",
+                                           help="Convert stored generations to the compact storage schema")
+    migrate_parser.add_argument("--batch-size", type=int, default=200, help="Documents per batch (default: 200)")
+    migrate_parser.add_argument("--dry-run", action="store_true", help="Report the size change without writing")
+
+    export_parser = subparsers.add_parser("export", help="Stream stored articles to JSONL, Parquet, HTML or Markdown")
+    export_parser.add_argument("-f", "--format", choices=("jsonl", "parquet", "html", "markdown"), default="jsonl",
+                               help="jsonl and parquet write one file; html and markdown one page per article. "
+                                    "With --watermark, parquet adds a part file next to the first one per run")
+    export_parser.add_argument("-o", "--output", required=True,
+                               help="Output file ('-' for JSONL on stdout) or, for pages, a directory")
+    export_parser.add_argument("--since", type=datetime.fromisoformat,
+                               help="Only articles created on or after this date (YYYY-MM-DD)")
+    export_parser.add_argument("--watermark",
+                               help="File holding the position of the last exported article; only newer "
+                                    "articles are exported and the file is updated afterwards")
+    export_parser.add_argument("--batch-size", type=int, default=500, help="Documents per database round trip (default: 500)")
+    export_parser.add_argument("--row-group-size", type=int, default=10000, help="Parquet rows per row group (default: 10000)")
+
+    refresh_parser = subparsers.add_parser(
+        "refresh", help="Regenerate stored articles whose prompt version or model changed, reusing their search results"
+    )
+    refresh_parser.add_argument("-c", "--concurrency", type=int, default=BATCH_CONCURRENCY,
+                                help=f"Keywords processed at once (default: {BATCH_CONCURRENCY})")
+    refresh_parser.add_argument("--search", action="store_true",
+                                help="Also re-run the search; articles are only regenerated if the results changed")
+    refresh_parser.add_argument("--since", type=datetime.fromisoformat,
+                                help="Only articles created on or after this date (YYYY-MM-DD)")
+    refresh_parser.add_argument("--limit", type=int, help="Refresh at most this many keywords")
+    refresh_parser.add_argument("--dry-run", action="store_true",
+                                help="List the stale keywords and what changed without regenerating")
+
+    return parser.parse_args(argv)
+
+def run_history(args: argparse.Namespace) -> None:
+    """
+    Show one page of stored articles matching the history filters.
+
+    Only storage is needed, so the LLM stack is never initialized.
+
+    Args:
+        args (argparse.Namespace): Parsed `history` arguments.
+    """
+    handler = open_storage(DATABASE_URI)
+    try:
+        if args.backfill:
+            handler.backfill_history_fields()
+        documents, next_cursor = handler.search_history(
+            keywords=args.keywords, text=args.text, since=args.since, until=args.until,
+            limit=args.limit, cursor=args.cursor
+        )
+        TerminalUI().display_history(documents, next_cursor)
+    finally:
+        handler.close()
+
+def run_migrate_storage(args: argparse.Namespace) -> None:
+    """
+    Migrate stored generations to the current storage schema and report the size change.
+
+    Args:
+        args (argparse.Namespace): Parsed `migrate-storage` arguments.
+    """
+    handler = open_storage(DATABASE_URI)
+    try:
+        stats = handler.migrate_schema(batch_size=args.batch_size, dry_run=args.dry_run)
+        if stats["bytes_before"]:
+            stats["size_ratio"] = round(stats["bytes_after"] / stats["bytes_before"], 2)
+        title = "Storage Migration (dry run)" if args.dry_run else "Storage Migration"
+        TerminalUI().display_cache_stats(title, stats)
+    finally:
+        handler.close()
+
+def run_jobs(args: argparse.Namespace) -> None:
+    """
+    List recent batch jobs, or show keyword states for one job.
+
+    Args:
+        args (argparse.Namespace): Parsed `jobs` arguments.
+    """
+    handler = open_storage(DATABASE_URI)
+    try:
+        terminal_ui = TerminalUI()
+        if args.job_id:
+            job = handler.get_job(args.job_id)
+            if job is None:
+                logger.error(f"Job '{args.job_id}' not found")
+                return
+            terminal_ui.display_jobs([job])
+            failed = handler.job_keywords(args.job_id, states=["failed"])
+            terminal_ui.display_failed_job_keywords(failed)
+        else:
+            terminal_ui.display_jobs(handler.list_jobs(args.limit))
+    finally:
+        handler.close()
+
+def configure_cassette(args: argparse.Namespace) -> None:
+    """
+    Route LLM and search calls through a record/replay cassette when one is requested.
+
+    Args:
+        args (argparse.Namespace): Parsed arguments with cassette_mode, cassette and replay_latency.
+    """
+    if args.cassette_mode == "off":
+        return
+    from tools.cassette import install_cassette
+
+    install_cassette(args.cassette, args.cassette_mode, args.replay_latency)
+
+def configure_default_executor() -> None:
+    """
+    Size the running loop's default executor for the configured stage limits.
+
+    kickoff_async and the executor-wrapped cache and database calls all run there.
+    """
+    asyncio.get_running_loop().set_default_executor(ThreadPoolExecutor(
+        max_workers=LLM_CONCURRENCY + SEARCH_CONCURRENCY + DB_CONCURRENCY,
+        thread_name_prefix="pipeline"
+    ))
+
+def create_pipeline_context(db_handler: StorageBackend, search_mode: str = SEARCH_MODE) -> PipelineContext:
+    """
+    Build the LLM, agents, crews and caches for processing keywords.
+
+    Args:
+        db_handler (StorageBackend): Where generations are saved.
+        search_mode (str): "agent" or "direct"; see PipelineContext.search_mode.
+
+    Returns:
+        PipelineContext: The objects shared by every keyword in the run.
+    """
+    llm = initialize_llm()
+    search_cache = create_search_cache()
+    llm_client = LLMClient()
+    agents = initialize_agents(llm, search_cache, llm_client)
+    result_cache = create_result_cache()
+    return PipelineContext(
+        recipe_crew=create_recipe_crew(agents),
+        db_handler=db_handler,
+        result_cache=result_cache,
+        search_cache=search_cache,
+        content_agent=agents[1],
+        llm_client=llm_client,
+        fallback_crews=create_fallback_crews(llm_client, search_cache),
+        similarity_cache=create_similarity_cache(result_cache),
+        search_agent=agents[0],
+        search_mode=search_mode
+    )
+
+def run_export(args: argparse.Namespace) -> None:
+    """
+    Stream stored generations into JSONL, Parquet, or static HTML/Markdown pages.
+
+    Documents are read oldest first in batches and written as they arrive, so memory
+    stays flat however many articles are exported. With --watermark, only articles
+    stored after the last one a previous export wrote are exported, and the watermark
+    is advanced once the export completes. Incremental exports leave out articles
+    created in the last EXPORT_WATERMARK_LAG seconds, which other workers may not have
+    written yet; the next run picks them up. A failed export discards what it wrote
+    and keeps the previous watermark.
+
+    Args:
+        args (argparse.Namespace): Parsed `export` arguments.
+    """
+    from utils.export import open_exporter, read_watermark, write_watermark
+
+    after = read_watermark(args.watermark)
+    until = datetime.utcnow() - timedelta(seconds=EXPORT_WATERMARK_LAG) if args.watermark else None
+    handler = open_storage(DATABASE_URI)
+    exported = 0
+    last = None
+    try:
+        exporter = open_exporter(args.format, args.output, append=after is not None, row_group_size=args.row_group_size)
+        try:
+            for document in handler.iter_generations(since=args.since, after=after, until=until,
+                                                     batch_size=args.batch_size):
+                exporter.write(document)
+                last = document
+                exported += 1
+                if exported % 10000 == 0:
+                    logger.info(f"Exported {exported} articles")
+        except BaseException:
+            exporter.close(discard=True)
+            raise
+        exporter.close()
+        if args.watermark and last is not None:
+            write_watermark(args.watermark, encode_cursor(last))
+    finally:
+        handler.close()
+    logger.info(f"Exported {exported} articles as {args.format} to {args.output}"
+                + (f" (after watermark {after})" if after else ""))
+
+async def main_async(args: argparse.Namespace) -> None:
+    """
+    Build the pipeline and run the requested mode on the event loop.
+
+    Args:
+        args (argparse.Namespace): Parsed command line arguments.
+    """
+    from litellm.exceptions import OpenAIError
+
+    db_handler = None
+    context = None
+    metrics_task = None
+
+    # Cancel the run on SIGTERM or SIGINT so the finally block below flushes and closes storage
+    main_task = asyncio.current_task()
+    shutting_down = asyncio.Event()
+
+    def request_shutdown() -> None:
+        if shutting_down.is_set():
+            return
+        shutting_down.set()
+        console.print("\n[bold yellow]Received termination signal. Shutting down gracefully...[/bold yellow]")
+        main_task.cancel()
+
+    loop = asyncio.get_running_loop()
+    for signum in (signal.SIGTERM, signal.SIGINT):
+        loop.add_signal_handler(signum, request_shutdown)
+
+    configure_default_executor()
+    if args.metrics_json:
+        metrics_task = asyncio.create_task(dump_metrics_periodically(args.metrics_json, METRICS_DUMP_INTERVAL))
+    try:
+        check_environment_variables(replaying=args.cassette_mode == "replay")
+        configure_cassette(args)
+        db_handler = open_storage(DATABASE_URI)
+        context = create_pipeline_context(db_handler, args.search_mode)
+        terminal_ui = TerminalUI()
+
+        if args.command == "batch":
+            await run_batch_mode(context, terminal_ui, args.keywords_file, args.concurrency, args.job_id)
+        elif args.command == "resume":
+            await run_job(context, terminal_ui, args.job_id, args.concurrency, args.max_attempts)
+        elif args.command == "refresh":
+            await run_refresh(context, terminal_ui, args.concurrency, args.since, args.search, args.limit)
+        elif args.command == "serve":
+            await run_server_mode(context, args.host, args.port)
+        else:
+            await run_interactive_mode(context, terminal_ui, stream=args.stream)
+
+    except asyncio.CancelledError:
+        if not shutting_down.is_set():
+            raise
+    except OpenAIError as e:
+        logger.error(f"LiteLLM Error: {e.message} ([{e.status_code}]) from provider {e.llm_provider}")
+    except Exception as e:
+        logger.error(f"An unexpected error occurred: {str(e)}", exc_info=True)
+    finally:
+        if metrics_task:
+            metrics_task.cancel()
+            metrics.dump_json(args.metrics_json)
+        if context:
+            close_caches(context)
+        if db_handler:
+            if shutting_down.is_set() and db_handler.pending_writes:
+                console.print(f"[bold yellow]Flushing {db_handler.pending_writes} pending writes...[/bold yellow]")
+            try:
+                await asyncio.to_thread(db_handler.close)
+                logger.info("Database connection closed.")
+            except Exception as e:
+                logger.error(f"Error closing database connection: {str(e)}", exc_info=True)
+        if shutting_down.is_set():
+            console.print("[bold blue]Thank you for using the Recipe Content Generator. Goodbye![/bold blue]")
+
+def main() -> None:
+    """
+    Main function to run the recipe content generation process.
+    """
+    args = parse_arguments()
+    configure_logging(args.log_profile)
+    if args.command == "cache-stats":
+        context = PipelineContext(None, None, create_result_cache(), create_search_cache())
+        display_cache_stats(context, TerminalUI())
+        close_caches(context)
+        return
+    if args.command == "history":
+        run_history(args)
+        return
+    if args.command == "migrate-storage":
+        run_migrate_storage(args)
+        return
+    if args.command == "jobs":
+        run_jobs(args)
+        return
+    if args.command == "export":
+        run_export(args)
+        return
+    if args.command == "refresh" and args.dry_run:
+        run_refresh_plan(args)
+        return
+    if args.command == "worker":
+        # The parent only starts and drains workers; each worker loads the LLM stack itself
+        run_workers(args)
+        return
+
+    asyncio.run(main_async(args))
 
 if __name__ == "__main__":
     main()
\ No newline at end of file
@@ -1,5 +1,5 @@
 from pydantic import BaseModel, Field
-from typing import List, Optional
+from typing import Any, List, Optional, Union
 
 class Recipe(BaseModel):
     title: str
@@ -18,4 +18,33 @@ class ContentOutput(BaseModel):
     nutritional_info: Optional[str] = Field(default="")
     tips_and_variations: Optional[str] = Field(default="")
     conclusion: Optional[str] = Field(default="")
-    seo_optimized_text: str
\ No newline at end of file
+    seo_optimized_text: str
+
+class CachedTaskOutput(BaseModel):
+    """Stand-in for a crew TaskOutput rebuilt from a stored result."""
+    description: str = ""
+    agent: str = ""
+    raw: str = ""
+    output: Optional[Union[SearchOutput, ContentOutput]] = None
+
+    @property
+    def pydantic(self) -> Optional[Union[SearchOutput, ContentOutput]]:
+        return self.output
+
+class ContentStreamEvent(BaseModel):
+    """
+    One event from a streamed content generation.
+
+    kind is "token" (raw text in `token`), "field" (a completed ContentOutput field in
+    `field`/`value`) or "done" (the validated ContentOutput in `content`, plus the full
+    response text in `token` and the model that wrote it in `model`). `failed` is set on
+    the "done" event when the response could not be parsed and `content` is the default
+    placeholder instead.
+    """
+    kind: str
+    token: str = ""
+    field: Optional[str] = None
+    value: Any = None
+    content: Optional[ContentOutput] = None
+    model: Optional[str] = None
+    failed: bool = False
@@ -0,0 +1,10 @@
+# The repo has no package layout; tests import modules from its root, as main.py does
+
+import os
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+# litellm otherwise fetches its model cost map over the network on first import
+os.environ.setdefault("LITELLM_LOCAL_MODEL_COST_MAP", "True")
@@ -0,0 +1,52 @@
+import asyncio
+import io
+
+from utils.batch_runner import read_keywords, run_batch
+
+
+def test_read_keywords_skips_blank_lines_and_comments():
+    source = io.StringIO("pasta\n\n  # a comment\n  vegan lasagna  \n#skip\n")
+    assert list(read_keywords(source)) == ["pasta", "vegan lasagna"]
+
+
+def test_run_batch_reports_results_in_input_order():
+    async def process(keywords):
+        # Later keywords finish first
+        await asyncio.sleep(0.03 if keywords == "a" else 0.0)
+        return keywords.upper()
+
+    reported = []
+    report = asyncio.run(run_batch(["a", "b", "c"], process, concurrency=3,
+                                   on_result=lambda result, total: reported.append((result.keywords, total))))
+    assert [result.result for result in report.results] == ["A", "B", "C"]
+    assert reported == [("a", 3), ("b", 3), ("c", 3)]
+    assert report.succeeded == 3
+    assert report.throughput > 0
+
+
+def test_run_batch_never_exceeds_the_concurrency_limit():
+    in_flight = peak = 0
+
+    async def process(keywords):
+        nonlocal in_flight, peak
+        in_flight += 1
+        peak = max(peak, in_flight)
+        await asyncio.sleep(0.01)
+        in_flight -= 1
+        return keywords
+
+    asyncio.run(run_batch([str(index) for index in range(12)], process, concurrency=3))
+    assert peak == 3
+
+
+def test_run_batch_counts_errors_and_empty_results_as_failures():
+    async def process(keywords):
+        if keywords == "boom":
+            raise RuntimeError("search failed")
+        return None if keywords == "empty" else keywords
+
+    report = asyncio.run(run_batch(["ok", "boom", "empty"], process, concurrency=2))
+    assert report.succeeded == 1
+    assert report.failed == 2
+    assert report.results[1].error == "search failed"
+    assert report.results[2].error == "No output produced"
@@ -0,0 +1,96 @@
+import asyncio
+
+import litellm
+import pytest
+
+from tools.cassette import Cassette, CassetteMiss, CassetteStore, request_key
+
+MESSAGES = [{"role": "user", "content": "Write a lasagna article"}]
+
+
+def test_request_key_ignores_credentials_and_endpoints():
+    base = {"model": "groq/llama", "messages": MESSAGES}
+    key = request_key("llm", base)
+
+    assert request_key("llm", dict(base, api_key="secret", api_base="http://localhost:9", timeout=5)) == key
+    assert request_key("llm", dict(base, messages=[{"role": "user", "content": "Write a stew article"}])) != key
+    assert request_key("llm", dict(base, model="groq/other")) != key
+    assert request_key("page", base) != key
+
+
+def test_store_appends_once_per_key_and_reloads(tmp_path):
+    path = str(tmp_path / "calls" / "cassette.jsonl.gz")
+    store = CassetteStore(path)
+    store.append("k1", "serper", ["https://a"], 0.5)
+    store.append("k1", "serper", ["https://other"], 0.1)
+    store.append("k2", "page", "<html></html>", 0.2)
+
+    reopened = CassetteStore(path)
+    assert len(reopened) == 2
+    assert reopened.get("k1")["response"] == ["https://a"]
+    assert reopened.get("k2")["latency"] == 0.2
+
+
+class Fetcher:
+    calls = 0
+
+    def fetch_page(self, url):
+        Fetcher.calls += 1
+        return f"<html>{url}</html>"
+
+
+def test_methods_replay_what_was_recorded(tmp_path):
+    path = str(tmp_path / "cassette.jsonl.gz")
+    Fetcher.calls = 0
+    record = Cassette(CassetteStore(path), "record").wrap_method("page", Fetcher.fetch_page)
+    assert record(Fetcher(), "https://a") == "<html>https://a</html>"
+
+    replay = Cassette(CassetteStore(path), "replay").wrap_method("page", Fetcher.fetch_page)
+    assert replay(Fetcher(), "https://a") == "<html>https://a</html>"
+    assert Fetcher.calls == 1
+    with pytest.raises(CassetteMiss):
+        replay(Fetcher(), "https://b")
+
+
+def test_unknown_mode_is_rejected(tmp_path):
+    with pytest.raises(ValueError):
+        Cassette(CassetteStore(str(tmp_path / "c.gz")), "rewind")
+
+
+def fake_completion(**kwargs):
+    return litellm.ModelResponse(model=kwargs["model"], choices=[{"message": {"role": "assistant", "content": "Lasagna!"}}])
+
+
+def test_completions_replay_without_the_provider(tmp_path):
+    path = str(tmp_path / "cassette.jsonl.gz")
+    record = Cassette(CassetteStore(path), "record").wrap_completion(fake_completion)
+    record(model="groq/llama", messages=MESSAGES, api_key="recording-key")
+
+    def offline(**kwargs):
+        raise AssertionError("replay reached the provider")
+
+    replay = Cassette(CassetteStore(path), "replay").wrap_completion(offline)
+    response = replay(model="groq/llama", messages=MESSAGES, api_key="another-key")
+    assert response.choices[0].message.content == "Lasagna!"
+
+
+def test_streams_replay_chunk_by_chunk(tmp_path):
+    path = str(tmp_path / "cassette.jsonl.gz")
+
+    async def fake_stream(**kwargs):
+        async def chunks():
+            for text in ("Las", "agna"):
+                yield litellm.ModelResponseStream(choices=[{"delta": {"content": text}}])
+        return chunks()
+
+    async def collect(acompletion):
+        stream = await acompletion(model="groq/llama", messages=MESSAGES, stream=True)
+        return [chunk.choices[0].delta.content async for chunk in stream]
+
+    recorded = asyncio.run(collect(Cassette(CassetteStore(path), "record").wrap_acompletion(fake_stream)))
+
+    async def offline(**kwargs):
+        raise AssertionError("replay reached the provider")
+
+    replayed = asyncio.run(collect(Cassette(CassetteStore(path), "replay").wrap_acompletion(offline)))
+    assert recorded == replayed == ["Las", "agna"]
@@ -0,0 +1,32 @@
+import pytest
+
+from utils import compression
+from utils.compression import compress, decompress
+
+
+TRANSCRIPT = ('{"recipes": [{"title": "Pasta", "instructions": ["Boil water.", "Cook the pasta."]}]}' * 50).encode()
+
+
+@pytest.mark.parametrize("codec", ["zlib", compression.DEFAULT_CODEC])
+def test_round_trip_records_the_codec(codec):
+    used, data = compress(TRANSCRIPT, codec=codec)
+
+    assert used == codec
+    assert len(data) < len(TRANSCRIPT)
+    assert decompress(used, data) == TRANSCRIPT
+
+
+def test_zstd_falls_back_to_zlib_when_unavailable(monkeypatch):
+    monkeypatch.setattr(compression, "zstandard", None)
+
+    used, data = compress(TRANSCRIPT, codec="zstd")
+    assert used == "zlib"
+    assert decompress(used, data) == TRANSCRIPT
+    with pytest.raises(RuntimeError):
+        decompress("zstd", data)
+
+
+def test_unknown_codec_is_rejected():
+    assert decompress("none", b"raw") == b"raw"
+    with pytest.raises(ValueError):
+        decompress("lz4", b"raw")
@@ -0,0 +1,128 @@
+# DatabaseHandler's write-behind queue, against in-memory collections; no MongoDB server is contacted
+
+import time
+
+import pytest
+from pymongo import InsertOne
+from pymongo.errors import BulkWriteError
+
+from tools.database_handler import DatabaseHandler, source_recipe_upsert
+from tools.storage import WriteBehindError
+
+
+class FakeCollection:
+    def __init__(self, name):
+        self.name = name
+        self.batches = []
+
+    def bulk_write(self, operations, ordered=True):
+        self.batches.append(list(operations))
+
+
+@pytest.fixture
+def handler(monkeypatch):
+    # MongoClient connects lazily, so nothing is contacted until an operation runs
+    monkeypatch.setattr(DatabaseHandler, "ensure_indexes", lambda self: None)
+    handler = DatabaseHandler("mongodb://localhost:1", batch_size=3, flush_interval=60)
+    handler.recipes_collection = FakeCollection("recipes")
+    handler.content_collection = FakeCollection("content")
+    yield handler
+    handler.close()
+
+
+def test_writes_wait_for_flush_and_go_out_in_one_bulk_write(handler):
+    handler.queue_write(handler.recipes_collection, InsertOne({"title": "a"}))
+    handler.queue_write(handler.recipes_collection, InsertOne({"title": "b"}))
+    assert handler.pending_writes == 2
+    assert handler.recipes_collection.batches == []
+
+    handler.flush()
+    assert handler.pending_writes == 0
+    assert len(handler.recipes_collection.batches) == 1
+    assert handler.write_round_trips == 1
+    assert handler.documents_written == 2
+
+
+def test_operations_are_batched_per_collection(handler):
+    handler.queue_write(handler.recipes_collection, InsertOne({"title": "a"}))
+    handler.queue_write(handler.content_collection, InsertOne({"text": "b"}))
+    handler.flush()
+    assert [len(batch) for batch in handler.recipes_collection.batches] == [1]
+    assert [len(batch) for batch in handler.content_collection.batches] == [1]
+
+
+def test_a_full_batch_wakes_the_writer(handler):
+    for title in "abc":
+        handler.queue_write(handler.recipes_collection, InsertOne({"title": title}))
+    deadline = time.monotonic() + 5
+    while handler.documents_written < 3 and time.monotonic() < deadline:
+        time.sleep(0.01)
+    assert handler.documents_written == 3
+
+
+def test_close_flushes_and_rejects_later_writes(handler):
+    handler.queue_write(handler.recipes_collection, InsertOne({"title": "a"}))
+    handler.close()
+    assert handler.documents_written == 1
+    with pytest.raises(RuntimeError):
+        handler.queue_write(handler.recipes_collection, InsertOne({"title": "b"}))
+
+
+class PartlyFailingCollection(FakeCollection):
+    """Rejects the listed operation indexes once, as an unordered bulk_write does."""
+
+    def __init__(self, name, failures):
+        super().__init__(name)
+        self.failures = list(failures)
+
+    def bulk_write(self, operations, ordered=True):
+        super().bulk_write(operations, ordered)
+        if self.failures:
+            raise BulkWriteError({"writeErrors": self.failures.pop(0)})
+
+
+def test_only_failed_operations_are_retried(handler, monkeypatch):
+    monkeypatch.setattr(handler, "flush_interval", 0.01)
+    handler.recipes_collection = PartlyFailingCollection("recipes", [[
+        {"index": 1, "code": 6, "errmsg": "host unreachable"},
+        {"index": 2, "code": 11000, "errmsg": "duplicate key"},
+    ]])
+    for title in "abc":
+        handler.queue_write(handler.recipes_collection, InsertOne({"title": title}))
+
+    handler.flush()
+    first, retry = handler.recipes_collection.batches
+    assert len(first) == 3
+    assert [operation._doc["title"] for operation in retry] == ["b"]
+    assert handler.documents_written == 3
+
+
+def test_writes_that_keep_failing_raise(handler, monkeypatch):
+    monkeypatch.setattr(handler, "flush_interval", 0.01)
+    handler.recipes_collection = PartlyFailingCollection("recipes", [[{"index": 0, "code": 6}]] * 5)
+    handler.queue_write(handler.recipes_collection, InsertOne({"title": "a"}))
+
+    with pytest.raises(WriteBehindError):
+        handler.flush()
+    assert len(handler.recipes_collection.batches) == handler.max_attempts
+
+
+def test_late_results_from_an_expired_claim_are_dropped(handler):
+    import mongomock
+
+    handler.job_keywords_collection = mongomock.MongoClient().db.job_keywords
+    handler.job_keywords_collection.insert_one({"_id": "job-1:lasagna", "job_id": "job-1", "keywords": "lasagna",
+                                                "state": "pending", "attempts": 0, "position": 0})
+    first = handler.claim_job_keyword("job-1", "worker-1", max_attempts=3, lease_seconds=600)
+    second = handler.claim_job_keyword("job-1", "worker-2", max_attempts=3, lease_seconds=-1)
+
+    assert not handler.update_job_keyword("job-1", "lasagna", "failed", "timed out",
+                                          worker="worker-1", attempts=first["attempts"])
+    assert handler.update_job_keyword("job-1", "lasagna", "done", worker="worker-2", attempts=second["attempts"])
+    assert handler.job_keywords_collection.find_one({"_id": "job-1:lasagna"})["state"] == "done"
+
+
+def test_source_recipe_upserts_refresh_the_body_but_not_first_seen_at():
+    update = source_recipe_upsert("key", {"title": "Lasagna", "source": "https://a"})._doc
+    assert update["$set"] == {"title": "Lasagna", "source": "https://a"}
+    assert list(update["$setOnInsert"]) == ["first_seen_at"]
@@ -0,0 +1,96 @@
+# Direct search mode: the search tool is called without the search agent's LLM loop
+
+import main
+from agents.internet_search_agent import InternetSearchAgent
+from models.task_outputs import Recipe, SearchOutput
+
+SEARCH = SearchOutput(recipes=[Recipe(title="Lasagna", ingredients=["pasta"], instructions=["Bake"], source="https://a")])
+
+
+class FakeSearchTool:
+    def __init__(self, output):
+        self.output = output
+        self.queries = []
+
+    def search(self, keywords):
+        self.queries.append(keywords)
+        return self.output
+
+
+class FakeSearchCache:
+    def __init__(self):
+        self.entries = {}
+
+    def get(self, keywords):
+        return self.entries.get(keywords)
+
+    def put(self, keywords, output):
+        self.entries[keywords] = output
+
+
+def search_agent(output, search_cache=None):
+    # Skips __init__, which builds a crewai Agent around a chat model
+    agent = InternetSearchAgent.__new__(InternetSearchAgent)
+    agent.search_tool = FakeSearchTool(output)
+    agent.search_cache = search_cache
+    return agent
+
+
+def test_search_recipes_fills_and_reads_the_search_cache():
+    agent = search_agent(SEARCH, FakeSearchCache())
+
+    assert agent.search_recipes("lasagna") == SEARCH
+    assert agent.search_recipes("lasagna") == SEARCH
+    assert agent.search_tool.queries == ["lasagna"]
+
+
+def test_refresh_skips_the_cached_results_and_replaces_them():
+    fresh = SearchOutput(recipes=[Recipe(title="New Lasagna", ingredients=["pasta"], instructions=["Bake"],
+                                         source="https://b")])
+    agent = search_agent(fresh, FakeSearchCache())
+    agent.search_cache.put("lasagna", SEARCH)
+
+    assert agent.search_recipes("lasagna") == SEARCH
+    assert agent.search_recipes("lasagna", refresh=True) == fresh
+    assert agent.search_cache.get("lasagna") == fresh
+
+
+def test_empty_results_are_not_cached():
+    agent = search_agent(SearchOutput(recipes=[]), FakeSearchCache())
+
+    assert agent.search_recipes("nothing").recipes == []
+    assert agent.search_cache.entries == {}
+
+
+def test_direct_search_is_only_offered_in_direct_mode():
+    agent = search_agent(SEARCH)
+    assert main.PipelineContext(recipe_crew=None, db_handler=None, search_agent=agent,
+                                search_mode="direct").direct_search == agent.search_recipes
+    assert main.PipelineContext(recipe_crew=None, db_handler=None, search_agent=agent,
+                                search_mode="agent").direct_search is None
+
+
+def test_direct_results_feed_the_content_only_run(monkeypatch):
+    runs = []
+
+    class FakeCrew:
+        def kickoff(self, inputs):
+            return "article"
+
+    def prepare_crew_run(recipe_crew, keywords, cached_search, draft=None):
+        runs.append(cached_search)
+        return FakeCrew(), {}
+
+    monkeypatch.setattr(main, "prepare_crew_run", prepare_crew_run)
+    monkeypatch.setattr(main, "build_crew_result", lambda keywords, result, cached_search, *caches: result)
+
+    assert main.execute_crew_tasks(FakeCrew(), "lasagna", direct_search=lambda keywords: SEARCH) == "article"
+    assert runs == [SEARCH]
+
+
+def test_keywords_without_recipes_fail_without_a_crew_run(monkeypatch):
+    runs = []
+    monkeypatch.setattr(main, "prepare_crew_run", lambda *args: runs.append(args))
+
+    assert main.execute_crew_tasks(None, "nothing", direct_search=lambda keywords: SearchOutput(recipes=[])) is None
+    assert runs == []
@@ -0,0 +1,153 @@
+import json
+import os
+from datetime import datetime, timedelta
+
+import pytest
+
+import main
+from tools.sqlite_handler import SQLiteHandler
+from utils.export import export_record, open_exporter, read_watermark, write_watermark
+
+START = datetime(2024, 1, 1)
+
+
+def generation(day, title=None):
+    return {
+        "keywords": f"dish {day}",
+        "created_at": START + timedelta(days=day),
+        "model": "model-a",
+        "prompt_version": "1",
+        "content": {"title": title or f"Dish {day}", "introduction": "Intro", "ingredients": ["pasta"],
+                    "instructions": ["Bake"]},
+    }
+
+
+@pytest.fixture
+def database(tmp_path, monkeypatch):
+    path = str(tmp_path / "store.db")
+    monkeypatch.setattr(main, "DATABASE_URI", f"sqlite:///{path}")
+    return path
+
+
+def store(path, *days):
+    handler = SQLiteHandler(path, flush_interval=60)
+    for day in days:
+        handler.save_generation(generation(day), [], {})
+    handler.close()
+
+
+def export(output, watermark=None, export_format="jsonl"):
+    main.run_export(main.parse_arguments(
+        ["export", "-f", export_format, "-o", output, "--batch-size", "2"]
+        + (["--watermark", watermark] if watermark else [])
+    ))
+
+
+def read_jsonl(path):
+    with open(path, encoding="utf-8") as f:
+        return [json.loads(line) for line in f]
+
+
+def test_export_record_flattens_every_content_field():
+    record = export_record({"_id": "abc", **generation(0)})
+
+    assert record["id"] == "abc"
+    assert record["title"] == "Dish 0"
+    assert record["ingredients"] == ["pasta"]
+    assert "seo_optimized_text" in record and record["seo_optimized_text"] is None
+
+
+def test_watermark_round_trip(tmp_path):
+    path = str(tmp_path / "watermark")
+    assert read_watermark(path) is None
+    write_watermark(path, "2024-01-01T00:00:00.000000_abc")
+    assert read_watermark(path) == "2024-01-01T00:00:00.000000_abc"
+
+
+def test_unknown_format_is_rejected(tmp_path):
+    with pytest.raises(ValueError):
+        open_exporter("csv", str(tmp_path / "out.csv"))
+
+
+def test_incremental_jsonl_export_appends_only_new_articles(database, tmp_path):
+    output, watermark = str(tmp_path / "articles.jsonl"), str(tmp_path / "watermark")
+    store(database, 0, 1, 2)
+    export(output, watermark)
+    assert [record["keywords"] for record in read_jsonl(output)] == ["dish 0", "dish 1", "dish 2"]
+
+    store(database, 3)
+    export(output, watermark)
+    export(output, watermark)
+    assert [record["keywords"] for record in read_jsonl(output)] == ["dish 0", "dish 1", "dish 2", "dish 3"]
+    assert read_watermark(watermark).startswith("2024-01-04")
+
+
+def test_parquet_export_has_one_column_per_field(database, tmp_path):
+    parquet = pytest.importorskip("pyarrow.parquet")
+    output = str(tmp_path / "articles.parquet")
+    store(database, 0, 1, 2)
+    export(output, export_format="parquet")
+
+    table = parquet.read_table(output)
+    assert table.num_rows == 3
+    assert table.column("title").to_pylist() == ["Dish 0", "Dish 1", "Dish 2"]
+
+
+def test_page_export_writes_one_page_per_article(database, tmp_path):
+    output = str(tmp_path / "pages")
+    store(database, 0, 1)
+    export(output, export_format="markdown")
+
+    assert sorted(os.listdir(output))[0].startswith("20240101-dish-0-")
+    assert len(os.listdir(output)) == 2
+
+
+def test_incremental_parquet_export_writes_part_files(database, tmp_path):
+    parquet = pytest.importorskip("pyarrow.parquet")
+    output, watermark = str(tmp_path / "articles.parquet"), str(tmp_path / "watermark")
+    store(database, 0, 1)
+    export(output, watermark, export_format="parquet")
+    store(database, 2)
+    export(output, watermark, export_format="parquet")
+    export(output, watermark, export_format="parquet")
+
+    # The third run had nothing new and wrote no part file
+    assert sorted(name for name in os.listdir(tmp_path) if "parquet" in name) == [
+        "articles.parquet", "articles.part-0001.parquet"
+    ]
+    assert parquet.read_table(output).num_rows == 2
+    assert parquet.read_table(str(tmp_path / "articles.part-0001.parquet")).column("title").to_pylist() == ["Dish 2"]
+
+
+def test_incremental_export_leaves_out_articles_inside_the_lag(database, tmp_path):
+    output, watermark = str(tmp_path / "articles.jsonl"), str(tmp_path / "watermark")
+    handler = SQLiteHandler(database, flush_interval=60)
+    handler.save_generation(generation(0), [], {})
+    handler.save_generation(dict(generation(1), keywords="just written", created_at=datetime.utcnow()), [], {})
+    handler.close()
+
+    export(output, watermark)
+    assert [record["keywords"] for record in read_jsonl(output)] == ["dish 0"]
+
+
+def test_failed_export_discards_its_output_and_keeps_the_watermark(database, tmp_path, monkeypatch):
+    from utils import export as export_module
+
+    output, watermark = str(tmp_path / "articles.jsonl"), str(tmp_path / "watermark")
+    store(database, 0)
+    export(output, watermark)
+    before = read_watermark(watermark)
+    store(database, 1, 2)
+
+    def write(self, document):
+        if document["keywords"] == "dish 2":
+            raise OSError("disk full")
+        original_write(self, document)
+
+    original_write = export_module.JsonlExporter.write
+    monkeypatch.setattr(export_module.JsonlExporter, "write", write)
+    with pytest.raises(OSError):
+        export(output, watermark)
+
+    assert [record["keywords"] for record in read_jsonl(output)] == ["dish 0"]
+    assert read_watermark(watermark) == before
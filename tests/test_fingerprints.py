@@ -0,0 +1,82 @@
+from datetime import datetime, timedelta
+
+import main
+from tools.sqlite_handler import SQLiteHandler
+from utils.fingerprints import changed_inputs, generation_fingerprints, search_fingerprint, stored_fingerprints
+
+RECIPES = [{"title": "Lasagna", "ingredients": ["pasta"], "instructions": ["Bake"], "source": "https://a"}]
+
+
+def test_search_fingerprint_ignores_storage_ids_but_not_content():
+    stored = [dict(RECIPES[0], _id="9f86d081")]
+    assert search_fingerprint(stored) == search_fingerprint(RECIPES)
+    assert search_fingerprint([dict(RECIPES[0], instructions=["Bake longer"])]) != search_fingerprint(RECIPES)
+
+
+def test_changed_inputs_reports_only_what_was_compared():
+    stored = generation_fingerprints("Easy  Lasagna", RECIPES, "model-a", "3")
+    assert stored["keywords"] == "easy lasagna"
+
+    assert changed_inputs(stored, {"prompt_version": "3", "model": "model-a"}) == []
+    assert changed_inputs(stored, {"prompt_version": "4", "model": "model-b"}) == ["prompt_version", "model"]
+    assert changed_inputs(stored, {"search": search_fingerprint([]), "model": "model-a"}) == ["search"]
+
+
+def test_generations_without_fingerprints_fall_back_to_their_fields():
+    legacy = {"keywords": "Lasagna", "model": "model-a", "prompt_version": "1"}
+    assert stored_fingerprints(legacy) == {"keywords": "lasagna", "prompt_version": "1", "model": "model-a"}
+    assert changed_inputs(stored_fingerprints(legacy), {"prompt_version": "1", "model": "model-a"}) == []
+
+
+def test_plan_refresh_picks_the_latest_stale_generation_per_keyword(tmp_path, monkeypatch):
+    monkeypatch.setattr(main, "PROMPT_VERSION", "2")
+    monkeypatch.setattr(main, "GROQ_MODEL_NAME", "model-a")
+    handler = SQLiteHandler(str(tmp_path / "store.db"), flush_interval=60)
+    start = datetime(2024, 1, 1)
+
+    def save(keywords, day, prompt_version):
+        return handler.save_generation({
+            "keywords": keywords,
+            "created_at": start + timedelta(days=day),
+            "model": "model-a",
+            "prompt_version": prompt_version,
+            "content": {"title": keywords.title()},
+            "fingerprints": generation_fingerprints(keywords, RECIPES, "model-a", prompt_version),
+        }, RECIPES, {})
+
+    save("lasagna", 0, "1")
+    save("lasagna", 1, "2")
+    stale = save("beef stew", 2, "1")
+    handler.flush()
+
+    try:
+        items, considered = main.plan_refresh(handler)
+        assert considered == 2
+        assert [(item.generation_id, item.changed) for item in items] == [(stale, ["prompt_version"])]
+        assert handler.get_generation(stale)["fingerprints"]["search"] == search_fingerprint(RECIPES)
+
+        items, _ = main.plan_refresh(handler, search=True)
+        assert {item.keywords for item in items} == {"lasagna", "beef stew"}
+    finally:
+        handler.close()
+
+
+def test_mongo_iter_generations_returns_fingerprints_but_not_transcripts(monkeypatch):
+    import mongomock
+    from tools.database_handler import DatabaseHandler
+
+    monkeypatch.setattr(DatabaseHandler, "ensure_indexes", lambda self: None)
+    handler = DatabaseHandler("mongodb://localhost:1", flush_interval=60)
+    handler.recipes_collection = mongomock.MongoClient().db.recipes
+    fingerprints = generation_fingerprints("lasagna", RECIPES, "model-a", "1")
+    handler.recipes_collection.insert_one({
+        "keywords": "lasagna", "keywords_normalized": "lasagna", "created_at": datetime(2024, 1, 1),
+        "model": "model-a", "prompt_version": "1", "fingerprints": fingerprints, "raw_output": "transcript",
+    })
+
+    try:
+        [document] = handler.iter_generations()
+    finally:
+        handler.close()
+    assert stored_fingerprints(document) == fingerprints
+    assert "raw_output" not in document
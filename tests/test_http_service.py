@@ -0,0 +1,63 @@
+import asyncio
+
+import pytest
+
+from utils.http_service import AdmissionController, Overloaded, RecipeService
+
+
+def test_admission_rejects_beyond_running_plus_queued():
+    controller = AdmissionController(max_in_flight=1, max_queue=1)
+    assert controller.try_reserve()
+    assert controller.try_reserve()
+    assert not controller.try_reserve()
+    assert controller.stats()["rejected"] == 1
+
+
+def test_admission_runs_at_most_max_in_flight_at_once():
+    async def scenario():
+        controller = AdmissionController(max_in_flight=2, max_queue=10)
+        in_flight = peak = 0
+
+        async def work():
+            nonlocal in_flight, peak
+            in_flight += 1
+            peak = max(peak, in_flight)
+            await asyncio.sleep(0.01)
+            in_flight -= 1
+
+        for _ in range(6):
+            assert controller.try_reserve()
+        await asyncio.gather(*(controller.run(work()) for _ in range(6)))
+        return controller, peak
+
+    controller, peak = asyncio.run(scenario())
+    assert peak == 2
+    assert controller.stats()["reserved"] == 0
+
+
+def test_service_coalesces_and_sheds_load():
+    async def scenario():
+        release = asyncio.Event()
+        generated = []
+
+        async def generate(keywords):
+            generated.append(keywords)
+            await release.wait()
+            return None
+
+        service = RecipeService(generate, generate, max_in_flight=1, max_queue=0)
+        first = asyncio.ensure_future(service.generate("Vegan Lasagna"))
+        await asyncio.sleep(0)
+        # Same normalized keywords join the running execution without being admitted
+        joined = asyncio.ensure_future(service.generate("vegan  lasagna"))
+        await asyncio.sleep(0)
+        with pytest.raises(Overloaded):
+            await service.generate("beef stew")
+        release.set()
+        await asyncio.gather(first, joined)
+        return service, generated
+
+    service, generated = asyncio.run(scenario())
+    assert generated == ["Vegan Lasagna"]
+    assert service.stats()["single_flight"]["coalesced"] == 1
+    assert service.stats()["admission"]["rejected"] == 1
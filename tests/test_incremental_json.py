@@ -0,0 +1,53 @@
+import json
+
+from utils.incremental_json import IncrementalJSONFieldParser
+
+DOCUMENT = {
+    "title": "Pasta, \"al dente\"",
+    "ingredients": ["pasta", "salt {coarse}"],
+    "nutritional_info": {"calories": 400, "notes": ["high [carb]"]},
+    "servings": 4,
+    "vegan": True,
+}
+
+
+def feed_all(chunks):
+    parser = IncrementalJSONFieldParser()
+    completed = []
+    for chunk in chunks:
+        completed.extend(parser.feed(chunk))
+    return parser, completed
+
+
+def test_fields_surface_as_soon_as_they_are_complete():
+    parser = IncrementalJSONFieldParser()
+    assert parser.feed('{"title": "Pasta", "ingr') == [("title", "Pasta")]
+    assert parser.feed('edients": ["a", "b"]}') == [("ingredients", ["a", "b"])]
+    assert parser.done
+
+
+def test_one_character_at_a_time_matches_json_loads():
+    text = json.dumps(DOCUMENT)
+    parser, completed = feed_all(text)
+    assert dict(completed) == DOCUMENT
+    assert [name for name, _ in completed] == list(DOCUMENT)
+    assert parser.fields == DOCUMENT
+    assert parser.done
+
+
+def test_text_before_the_object_is_ignored():
+    _, completed = feed_all(['```json\n{"title": ', '"Pasta"}\n```'])
+    assert completed == [("title", "Pasta")]
+
+
+def test_incomplete_value_is_not_reported():
+    parser = IncrementalJSONFieldParser()
+    assert parser.feed('{"title": "Pas') == []
+    assert not parser.done
+
+
+def test_input_after_the_object_is_ignored():
+    parser = IncrementalJSONFieldParser()
+    parser.feed('{"a": 1}')
+    assert parser.feed('{"b": 2}') == []
+    assert parser.fields == {"a": 1}
@@ -0,0 +1,63 @@
+from models.task_outputs import ContentOutput, SearchOutput
+from utils.json_repair import extract_json, iter_json_objects, parse_model
+
+CONTENT = {
+    "title": "Pasta",
+    "introduction": "Quick.",
+    "ingredients": ["pasta", "salt"],
+    "instructions": ["Boil", "Drain"],
+    "seo_optimized_text": "Pasta for dinner.",
+}
+
+
+def test_extract_json_skips_prose_and_fences():
+    text = 'Thought: done\n```json\n{"title": "Pasta", "ingredients": ["a"]}\n```\nThat is all.'
+    assert extract_json(text) == {"title": "Pasta", "ingredients": ["a"]}
+
+
+def test_extract_json_returns_none_without_an_object():
+    assert extract_json("no json here") is None
+    assert extract_json("") is None
+
+
+def test_extract_json_repairs_raw_newlines_and_curly_quotes():
+    text = '{"title": “Pasta”, "introduction": "line one\nline two"}'
+    assert extract_json(text) == {"title": "Pasta", "introduction": "line one\nline two"}
+
+
+def test_extract_json_closes_a_truncated_object():
+    value = extract_json('{"title": "Pasta", "ingredients": ["a", "b"')
+    assert value["title"] == "Pasta"
+    assert value["ingredients"][:1] == ["a"]
+
+
+def test_iter_json_objects_yields_every_object_in_order():
+    values = [value for value, _ in iter_json_objects('{"a": 1} then {"b": 2}')]
+    assert values == [{"a": 1}, {"b": 2}]
+
+
+def test_iter_json_objects_flags_repaired_objects():
+    (_, clean), = iter_json_objects('{"a": 1}')
+    assert clean is False
+    repaired = [flag for _, flag in iter_json_objects('{"a": [1, 2')]
+    assert repaired and all(repaired)
+
+
+def test_parse_model_validates_clean_json():
+    import json
+
+    content = parse_model(json.dumps(CONTENT), ContentOutput)
+    assert content.title == "Pasta"
+    assert content.instructions == ["Boil", "Drain"]
+
+
+def test_parse_model_picks_the_object_that_validates():
+    import json
+
+    text = f'Action: search\n{{"query": "pasta"}}\nFinal Answer: {json.dumps(CONTENT)}'
+    assert parse_model(text, ContentOutput).seo_optimized_text == "Pasta for dinner."
+
+
+def test_parse_model_returns_none_when_nothing_validates():
+    assert parse_model('{"recipes": "not a list"}', SearchOutput) is None
+    assert parse_model("", SearchOutput) is None
@@ -0,0 +1,222 @@
+import asyncio
+
+import pytest
+
+from tools.llm_client import CircuitBreaker, CircuitOpen, LLMClient, TokenBucket, is_retryable, parse_duration
+from utils.metrics import MetricsRegistry, StageRecorder, current_recorder
+
+
+class ServiceUnavailable(Exception):
+    status_code = 503
+
+
+class BadRequest(Exception):
+    status_code = 400
+
+
+class RateLimited(Exception):
+    status_code = 429
+
+    def __init__(self, retry_after):
+        super().__init__("rate limited")
+        self.headers = {"retry-after": str(retry_after)}
+
+
+@pytest.fixture
+def client():
+    client = LLMClient(models=["primary", "fallback"], max_attempts=3, backoff_base=0.001, backoff_max=0.001,
+                       breaker_threshold=2, breaker_cooldown=60, requests_per_minute=6000,
+                       tokens_per_minute=10 ** 7)
+    yield client
+    client.close()
+
+
+def test_parse_duration():
+    assert parse_duration("7.66s") == pytest.approx(7.66)
+    assert parse_duration("2m59.5s") == pytest.approx(179.5)
+    assert parse_duration("120ms") == pytest.approx(0.12)
+    assert parse_duration("3") == 3.0
+    assert parse_duration("soon") is None
+
+
+def test_retryable_errors_are_found_through_the_cause_chain():
+    try:
+        try:
+            raise ServiceUnavailable()
+        except ServiceUnavailable as e:
+            raise RuntimeError("crew failed") from e
+    except RuntimeError as wrapped:
+        assert is_retryable(wrapped)
+    assert not is_retryable(BadRequest())
+
+
+def test_token_bucket_reports_wait_and_follows_provider_headers():
+    bucket = TokenBucket(capacity=2, rate=1)
+    assert bucket.reserve(1) == 0
+    assert bucket.reserve(1) == 0
+    assert bucket.reserve(1) == pytest.approx(1, abs=0.05)
+
+    bucket = TokenBucket(capacity=100, rate=1)
+    bucket.sync(limit=30, remaining=0, reset=10)
+    assert bucket.capacity == 30
+    assert bucket.rate == pytest.approx(3)
+    assert bucket.reserve(3) == pytest.approx(1, abs=0.05)
+
+
+def test_circuit_breaker_opens_then_lets_one_trial_through(monkeypatch):
+    now = [100.0]
+    monkeypatch.setattr("tools.llm_client.time.monotonic", lambda: now[0])
+    breaker = CircuitBreaker(threshold=2, cooldown=30)
+
+    breaker.record_failure()
+    assert breaker.allow()
+    breaker.record_failure()
+    assert breaker.state == "open" and not breaker.allow()
+
+    now[0] += 30
+    assert breaker.allow() and breaker.state == "half_open"
+    breaker.record_failure()
+    assert breaker.state == "open" and not breaker.allow()
+
+    now[0] += 30
+    assert breaker.allow()
+    breaker.record_success()
+    assert breaker.state == "closed" and breaker.allow()
+
+
+def test_call_retries_then_succeeds(client):
+    attempts = []
+
+    def fn(model):
+        attempts.append(model)
+        if len(attempts) < 2:
+            raise ServiceUnavailable()
+        return "ok"
+
+    assert client.call(fn) == "ok"
+    assert attempts == ["primary", "primary"]
+
+
+def test_crew_retries_are_counted_apart_from_request_retries(client):
+    recorder = StageRecorder(MetricsRegistry())
+    token = current_recorder.set(recorder)
+    try:
+        for scope in ("request", "crew"):
+            attempts = []
+
+            def fn(model):
+                attempts.append(model)
+                if len(attempts) < 2:
+                    raise ServiceUnavailable()
+                return "ok"
+
+            assert client.call(fn, stage="crew", scope=scope) == "ok"
+    finally:
+        current_recorder.reset(token)
+    assert (recorder.retries, recorder.crew_retries) == (1, 1)
+
+
+def test_call_falls_back_when_the_breaker_opens(client):
+    def fn(model):
+        if model == "primary":
+            raise ServiceUnavailable()
+        return model
+
+    assert client.call(fn) == "fallback"
+    assert client.breakers["primary"].state == "open"
+    # The open breaker skips the primary model without calling it
+    assert client.call(lambda model: model) == "fallback"
+
+
+def test_call_does_not_retry_client_errors(client):
+    attempts = []
+
+    def fn(model):
+        attempts.append(model)
+        raise BadRequest()
+
+    with pytest.raises(BadRequest):
+        client.call(fn)
+    assert attempts == ["primary"]
+
+
+def test_call_raises_circuit_open_when_every_breaker_is_open(client):
+    for breaker in client.breakers.values():
+        breaker.record_failure()
+        breaker.record_failure()
+
+    with pytest.raises(CircuitOpen):
+        client.call(lambda model: model)
+
+
+def test_rate_limits_do_not_trip_the_breaker_and_honour_retry_after(client, monkeypatch):
+    sleeps = []
+    monkeypatch.setattr("tools.llm_client.time.sleep", sleeps.append)
+    attempts = []
+
+    def fn(model):
+        attempts.append(model)
+        if len(attempts) == 1:
+            raise RateLimited(retry_after=2)
+        return "ok"
+
+    assert client.call(fn) == "ok"
+    assert client.breakers["primary"].state == "closed"
+    assert sleeps[0] >= 2
+
+
+def test_acall_retries_without_blocking_the_loop(client):
+    attempts = []
+
+    async def fn(model):
+        attempts.append(model)
+        if len(attempts) < 3:
+            raise ServiceUnavailable()
+        return model
+
+    assert asyncio.run(client.acall(fn)) == "fallback"
+    assert attempts == ["primary", "primary", "fallback"]
+
+
+def test_half_open_trial_is_released_by_a_client_error(client):
+    breaker = client.breakers["primary"]
+    breaker.record_failure()
+    breaker.record_failure()
+    # Cooldown over without patching the clock the rate-limit buckets also read
+    breaker._opened_at -= breaker.cooldown
+
+    def bad_request(model):
+        raise BadRequest()
+
+    with pytest.raises(BadRequest):
+        client.call(bad_request)
+    # The failed request said nothing about the model, so the next call is the new trial
+    assert client.call(lambda model: model) == "primary"
+    assert breaker.state == "closed"
+
+
+def test_half_open_trial_that_never_reports_back_is_replaced(monkeypatch):
+    now = [100.0]
+    monkeypatch.setattr("tools.llm_client.time.monotonic", lambda: now[0])
+    breaker = CircuitBreaker(threshold=1, cooldown=30)
+    breaker.record_failure()
+    now[0] += 30
+    assert breaker.allow()
+    assert not breaker.allow()
+
+    now[0] += 30
+    assert breaker.allow() and breaker.state == "half_open"
+
+
+def test_with_model_reports_the_model_that_served_the_call(client):
+    def fn(model):
+        if model == "primary":
+            raise ServiceUnavailable()
+        return "article"
+
+    assert client.call(fn, with_model=True) == ("article", "fallback")
+
+    async def afn(model):
+        return "article"
+
+    assert asyncio.run(client.acall(afn, with_model=True)) == ("article", "fallback")
@@ -0,0 +1,69 @@
+import logging
+import queue
+import threading
+
+import pytest
+
+from utils import logging_setup
+from utils.logging_setup import BoundedQueueHandler, configure_logging, stop_logging, truncate
+
+
+def record(level, message, *args):
+    return logging.LogRecord("test", level, __file__, 1, message, args, None)
+
+
+def test_truncate_notes_what_was_cut():
+    assert truncate("short", limit=10) == "short"
+    assert truncate("x" * 25, limit=10) == "xxxxxxxxxx... [15 more characters]"
+
+
+def test_messages_are_rendered_and_truncated_before_queueing():
+    handler = BoundedQueueHandler(queue.Queue(), max_chars=10)
+    handler.handle(record(logging.INFO, "payload %s", "y" * 50))
+
+    queued = handler.queue.get_nowait()
+    assert queued.getMessage().startswith("payload yy... [")
+    assert queued.args is None
+
+
+def test_full_queue_drops_info_but_waits_for_warnings():
+    handler = BoundedQueueHandler(queue.Queue(maxsize=1), max_chars=100)
+    handler.handle(record(logging.INFO, "first"))
+    handler.handle(record(logging.INFO, "dropped"))
+    assert handler.dropped == 1
+
+    def drain():
+        # Make room only after the warning has started waiting
+        threading.Event().wait(0.05)
+        handler.queue.get()
+
+    reader = threading.Thread(target=drain)
+    reader.start()
+    handler.handle(record(logging.WARNING, "kept"))
+    reader.join()
+    assert handler.queue.get_nowait().getMessage() == "kept"
+    assert handler.dropped == 1
+
+
+@pytest.fixture
+def restore_root_logger():
+    root = logging.getLogger()
+    handlers, level = list(root.handlers), root.level
+    yield
+    stop_logging()
+    for handler in list(root.handlers):
+        root.removeHandler(handler)
+    for handler in handlers:
+        root.addHandler(handler)
+    root.setLevel(level)
+
+
+def test_quiet_profile_writes_info_to_the_file_only(tmp_path, restore_root_logger):
+    path = tmp_path / "app.log"
+    configure_logging("quiet", path=str(path))
+    assert not logging_setup.crew_verbose()
+
+    logging.getLogger("food").info("Generated 'lasagna'")
+    stop_logging()
+
+    assert "INFO - Generated 'lasagna'" in path.read_text()
@@ -0,0 +1,73 @@
+import json
+
+from utils.metrics import Histogram, MetricsRegistry, StageRecorder, current_recorder, record_task_completion, timed_stage
+
+
+def test_histogram_buckets_and_percentiles():
+    histogram = Histogram(buckets=(1, 10))
+    for value in range(1, 101):
+        histogram.observe(value / 10)
+
+    assert histogram.bucket_counts == [10, 90]
+    summary = histogram.summary()
+    assert summary["count"] == 100
+    assert summary["p50"] == 5.1
+    assert summary["p99"] == 10.0
+
+
+def test_registry_keeps_labelled_series_apart():
+    registry = MetricsRegistry()
+    registry.describe("pipeline_stage_seconds", "Wall time per pipeline stage")
+    registry.observe("pipeline_stage_seconds", 0.2, stage="search")
+    registry.observe("pipeline_stage_seconds", 3, stage="content")
+    registry.inc("pipeline_retries_total", stage="search")
+    registry.inc("pipeline_retries_total", stage="search")
+
+    text = registry.render_prometheus()
+    assert "# HELP pipeline_stage_seconds Wall time per pipeline stage" in text
+    assert 'pipeline_stage_seconds_bucket{stage="search",le="0.25"} 1' in text
+    assert 'pipeline_stage_seconds_count{stage="content"} 1' in text
+    assert 'pipeline_retries_total{stage="search"} 2' in text
+
+
+def test_dump_json_writes_snapshot(tmp_path):
+    registry = MetricsRegistry()
+    registry.inc("pipeline_tokens_total", 42, kind="prompt")
+    path = tmp_path / "metrics.json"
+    registry.dump_json(str(path))
+
+    snapshot = json.loads(path.read_text())
+    assert snapshot["counters"]["pipeline_tokens_total"] == [{"labels": {"kind": "prompt"}, "value": 42}]
+
+
+def test_stage_recorder_accumulates_per_keyword():
+    registry = MetricsRegistry()
+    recorder = StageRecorder(registry)
+    recorder.record("search", 0.5)
+    recorder.record("search", 0.25)
+    recorder.add_tokens(prompt=100, completion=20)
+    recorder.add_retry("content")
+    recorder.add_retry("crew", scope="crew")
+
+    assert recorder.to_dict() == {
+        "stages": {"search": 0.75},
+        "tokens": {"prompt": 100, "completion": 20, "total": 120, "prompt_saved": 0},
+        "retries": 1,
+        "crew_retries": 1,
+    }
+    assert 'pipeline_retries_total{scope="crew",stage="crew"} 1' in registry.render_prometheus()
+    assert registry.snapshot()["histograms"]["pipeline_stage_seconds"][0]["count"] == 2
+
+
+def test_timed_stage_and_task_callbacks_use_the_current_recorder():
+    recorder = StageRecorder(MetricsRegistry())
+    token = current_recorder.set(recorder)
+    try:
+        with timed_stage("parse"):
+            pass
+        recorder.mark()
+        record_task_completion("search")(None)
+    finally:
+        current_recorder.reset(token)
+
+    assert set(recorder.stages) == {"parse", "search"}
@@ -0,0 +1,104 @@
+import json
+
+import pytest
+
+from models.task_outputs import Recipe, SearchOutput
+from utils import prompt_budget
+from utils.prompt_budget import compact_search_results, count_tokens
+
+
+@pytest.fixture(autouse=True)
+def estimated_tokens(monkeypatch):
+    # Keep counts deterministic and avoid downloading the tiktoken encoding
+    monkeypatch.setattr(prompt_budget, "_encoding", None)
+    monkeypatch.setattr(prompt_budget, "_encoding_failed", True)
+
+
+def _search_results(recipes=5, steps=20):
+    return SearchOutput(recipes=[
+        Recipe(
+            title=f"Recipe {i}",
+            ingredients=["2 cups flour", "1 tsp Salt", f"{i} eggs"],
+            instructions=[f"Step {n} of recipe {i}: " + "stir well and keep going " * 20 for n in range(steps)],
+            source=f"https://example.com/{i}",
+        )
+        for i in range(recipes)
+    ])
+
+
+def test_count_tokens_estimates_from_length():
+    assert count_tokens("a" * 9) == 3
+
+
+def test_small_results_are_deduplicated_and_kept_whole():
+    results = SearchOutput(recipes=[
+        Recipe(title="A", ingredients=["1 Egg", "salt"], instructions=["Mix."], source="a"),
+        Recipe(title="B", ingredients=["1  egg", "Pepper"], instructions=["Bake."], source="b"),
+    ])
+    compacted = compact_search_results(results, budget=1000)
+
+    payload = json.loads(compacted.text)
+    assert payload["ingredients"] == ["1 Egg", "salt", "Pepper"]
+    assert [recipe["steps"] for recipe in payload["recipes"]] == [["Mix."], ["Bake."]]
+    assert compacted.recipes_kept == 2
+    assert compacted.tokens < compacted.original_tokens
+
+
+@pytest.mark.parametrize("budget", [2000, 800, 300])
+def test_compaction_respects_the_budget(budget):
+    compacted = compact_search_results(_search_results(), budget=budget)
+
+    assert compacted.tokens <= budget
+    assert compacted.tokens == count_tokens(compacted.text)
+    assert compacted.tokens_saved == compacted.original_tokens - compacted.tokens
+    assert json.loads(compacted.text)["recipes"][0]["title"] == "Recipe 0"
+
+
+def test_steps_are_cut_before_recipes_are_dropped():
+    compacted = compact_search_results(_search_results(recipes=2), budget=1500)
+
+    payload = json.loads(compacted.text)
+    assert compacted.recipes_kept == 2
+    assert all(len(recipe["steps"]) < 12 for recipe in payload["recipes"])
+
+
+def test_record_compaction_adds_savings_to_the_current_recorder():
+    from utils.metrics import MetricsRegistry, StageRecorder, current_recorder
+
+    recorder = StageRecorder(MetricsRegistry())
+    token = current_recorder.set(recorder)
+    try:
+        prompt_budget.record_compaction("pasta", compact_search_results(_search_results(), budget=800))
+    finally:
+        current_recorder.reset(token)
+
+    assert recorder.tokens["prompt_saved"] > 0
+
+
+def test_agent_mode_search_results_are_compacted_for_the_content_task(monkeypatch):
+    from types import SimpleNamespace
+
+    import main
+
+    search_results = _search_results()
+    content_inputs = []
+
+    class SearchCrew:
+        def kickoff(self, inputs):
+            return SimpleNamespace(tasks_output=[SimpleNamespace(pydantic=search_results, raw="")])
+
+    class ContentCrew:
+        def kickoff(self, inputs):
+            content_inputs.append(inputs)
+            return SimpleNamespace(tasks_output=[], raw="")
+
+    recipe_crew = SimpleNamespace(agents=[object(), object()])
+    monkeypatch.setattr(main, "PROMPT_SEARCH_TOKEN_BUDGET", 800)
+    monkeypatch.setattr(main, "create_search_crew", lambda agent: SearchCrew())
+    monkeypatch.setattr(main, "create_content_crew", lambda agent: ContentCrew())
+    monkeypatch.setattr(main, "build_crew_result", lambda keywords, result, cached_search, *args: cached_search)
+
+    assert main.execute_crew_tasks(recipe_crew, "pasta") == search_results
+    [inputs] = content_inputs
+    assert count_tokens(inputs["search_results"]) <= 800
+    assert count_tokens(inputs["search_results"]) < count_tokens(search_results.json())
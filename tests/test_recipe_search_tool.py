@@ -0,0 +1,127 @@
+import json
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+from tools import recipe_search_tool
+from tools.recipe_search_tool import RecipeSearchTool, extract_recipes
+
+
+def _page(*blocks):
+    scripts = "".join(f'<script type="application/ld+json">{json.dumps(block)}</script>' for block in blocks)
+    return f"<html><head>{scripts}</head><body></body></html>"
+
+
+def test_extract_recipes_reads_graph_and_how_to_sections():
+    page = _page({
+        "@context": "https://schema.org",
+        "@graph": [
+            {"@type": "WebPage", "name": "Site"},
+            {
+                "@type": ["Recipe", "NewsArticle"],
+                "name": "Tomato &amp; Basil Pasta",
+                "recipeIngredient": ["200g pasta", "<b>2</b> tomatoes", ""],
+                "recipeInstructions": [
+                    {"@type": "HowToSection", "itemListElement": [
+                        {"@type": "HowToStep", "text": "Boil the pasta."},
+                        {"@type": "HowToStep", "text": "Add the tomatoes."},
+                    ]},
+                ],
+            },
+        ],
+    })
+
+    [recipe] = extract_recipes(page, "https://example.com/pasta")
+    assert recipe.title == "Tomato & Basil Pasta"
+    assert recipe.ingredients == ["200g pasta", "2 tomatoes"]
+    assert recipe.instructions == ["Boil the pasta.", "Add the tomatoes."]
+    assert recipe.source == "https://example.com/pasta"
+
+
+def test_extract_recipes_skips_incomplete_and_unstructured_pages():
+    incomplete = _page({"@type": "Recipe", "name": "Toast", "recipeIngredient": ["bread"]})
+    assert extract_recipes(incomplete, "https://example.com/toast") == []
+    assert extract_recipes("<html><p>No data</p></html>", "https://example.com") == []
+
+
+def test_extract_recipes_splits_string_instructions():
+    page = _page({
+        "@type": "Recipe",
+        "name": "Tea",
+        "recipeIngredient": "1 tea bag",
+        "recipeInstructions": "Boil water.<br/>Steep for 3 minutes.",
+    })
+    [recipe] = extract_recipes(page, "https://example.com/tea")
+    assert recipe.ingredients == ["1 tea bag"]
+    assert recipe.instructions == ["Boil water.", "Steep for 3 minutes."]
+
+
+class FakeSearchTool(RecipeSearchTool):
+    pages: dict = {}
+
+    def search_links(self, query):
+        return list(self.pages)
+
+    def fetch_page(self, url):
+        page = self.pages[url]
+        if isinstance(page, Exception):
+            raise page
+        return page
+
+
+def test_search_keeps_rank_order_and_skips_failed_pages():
+    def recipe_page(name):
+        return _page({"@type": "Recipe", "name": name, "recipeIngredient": ["x"], "recipeInstructions": "Cook."})
+
+    tool = FakeSearchTool(max_results=2, pages={
+        "https://a.example": ConnectionError("refused"),
+        "https://b.example": recipe_page("B"),
+        "https://c.example": "<html></html>",
+        "https://d.example": recipe_page("D"),
+        "https://e.example": recipe_page("E"),
+    })
+
+    output = tool.search("pasta")
+    assert [recipe.title for recipe in output.recipes] == ["B", "D"]
+
+
+def _recipe_page(name):
+    return _page({"@type": "Recipe", "name": name, "recipeIngredient": ["x"], "recipeInstructions": "Cook."})
+
+
+class SlowSearchTool(FakeSearchTool):
+    delays: dict = {}
+
+    def fetch_page(self, url):
+        time.sleep(self.delays.get(url, 0))
+        return super().fetch_page(url)
+
+
+@pytest.fixture
+def small_pool(monkeypatch):
+    pool = ThreadPoolExecutor(max_workers=2)
+    monkeypatch.setattr(recipe_search_tool, "_fetch_pool", pool)
+    yield pool
+    pool.shutdown(wait=True)
+
+
+def test_time_queued_behind_other_fetches_does_not_count(small_pool):
+    # Other keywords' fetches hold every thread for longer than the old overall deadline
+    small_pool.submit(time.sleep, 1.3)
+    small_pool.submit(time.sleep, 1.3)
+    tool = SlowSearchTool(max_results=1, fetch_timeout=0.1, pages={"https://a.example": _recipe_page("A")})
+
+    assert [recipe.title for recipe in tool.search("pasta").recipes] == ["A"]
+
+
+def test_a_slow_page_is_given_up_on(small_pool):
+    tool = SlowSearchTool(max_results=2, fetch_timeout=0.2, pages={
+        "https://slow.example": _recipe_page("Slow"),
+        "https://fast.example": _recipe_page("Fast"),
+    }, delays={"https://slow.example": 1})
+
+    start = time.monotonic()
+    output = tool.search("pasta")
+    assert [recipe.title for recipe in output.recipes] == ["Fast"]
+    assert time.monotonic() - start < 0.9
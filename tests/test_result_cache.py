@@ -0,0 +1,114 @@
+import threading
+import time
+
+import pytest
+
+from models.task_outputs import ContentOutput, Recipe, SearchOutput
+from tools.result_cache import ResultCache
+from utils.keywords import normalize_keywords
+
+SEARCH = SearchOutput(recipes=[Recipe(title="Lasagna", ingredients=["pasta"], instructions=["Bake"], source="https://a")])
+CONTENT = ContentOutput(title="Classic Lasagna", introduction="Layers.", ingredients=["pasta"],
+                        instructions=["Bake"], seo_optimized_text="Lasagna.")
+
+
+@pytest.fixture
+def cache(tmp_path):
+    cache = ResultCache(str(tmp_path / "results.db"), ttl=3600, max_entries=2, memory_entries=1)
+    yield cache
+    cache.close()
+
+
+def test_normalize_keywords_folds_case_whitespace_and_punctuation():
+    assert normalize_keywords("  Vegan   Lasagna! ") == "vegan lasagna"
+
+
+def test_round_trip_with_normalized_keywords(cache):
+    cache.put("Vegan  Lasagna!", "model-a", "1", SEARCH, CONTENT, "raw")
+    cached = cache.get("vegan lasagna", "model-a", "1")
+    assert cached.content_output == CONTENT
+    assert cached.search_output == SEARCH
+    assert cached.raw == "raw"
+
+
+def test_keyed_on_model_and_prompt_version(cache):
+    cache.put("lasagna", "model-a", "1", SEARCH, CONTENT, "raw")
+    assert cache.get("lasagna", "model-b", "1") is None
+    assert cache.get("lasagna", "model-a", "2") is None
+    assert cache.stats()["misses"] == 2
+
+
+def test_reads_through_to_sqlite(tmp_path):
+    path = str(tmp_path / "results.db")
+    cache = ResultCache(path, ttl=3600, max_entries=10)
+    cache.put("lasagna", "m", "1", SEARCH, CONTENT, "raw")
+    cache.close()
+
+    reopened = ResultCache(path, ttl=3600, max_entries=10)
+    assert reopened.get("lasagna", "m", "1").content_output.title == "Classic Lasagna"
+    assert reopened.memory_hits == 0
+    assert reopened.get("lasagna", "m", "1") is not None
+    assert reopened.memory_hits == 1
+    assert reopened.stats()["lifetime_hits"] == 2
+    reopened.close()
+
+
+def test_evicts_least_recently_used(cache):
+    cache.put("one", "m", "1", SEARCH, CONTENT, "raw")
+    time.sleep(0.01)
+    cache.put("two", "m", "1", SEARCH, CONTENT, "raw")
+    time.sleep(0.01)
+    cache.get("one", "m", "1")
+    time.sleep(0.01)
+    cache.put("three", "m", "1", SEARCH, CONTENT, "raw")
+
+    assert cache.stats()["entries"] == 2
+    assert cache.get("two", "m", "1") is None
+    assert cache.get("one", "m", "1") is not None
+
+
+def test_expired_entries_are_misses(tmp_path):
+    cache = ResultCache(str(tmp_path / "results.db"), ttl=0, max_entries=10)
+    cache.put("lasagna", "m", "1", SEARCH, CONTENT, "raw")
+    assert cache.get("lasagna", "m", "1") is None
+    cache.close()
+
+
+def test_hits_are_written_in_batches_and_on_close(tmp_path):
+    import sqlite3
+
+    path = str(tmp_path / "results.db")
+    cache = ResultCache(path, ttl=3600, max_entries=10)
+    cache.put("lasagna", "m", "1", SEARCH, CONTENT, "raw")
+    for _ in range(3):
+        cache.get("lasagna", "m", "1")
+
+    def stored_hits():
+        with sqlite3.connect(path) as conn:
+            return conn.execute("SELECT hit_count FROM crew_results").fetchone()[0]
+
+    assert stored_hits() == 0
+    cache.close()
+    assert stored_hits() == 3
+
+
+def test_processes_sharing_the_file_can_write_at_once(tmp_path):
+    path = str(tmp_path / "results.db")
+    caches = [ResultCache(path, ttl=3600, max_entries=1000) for _ in range(4)]
+
+    def fill(index, cache):
+        for item in range(25):
+            cache.put(f"dish {index} {item}", "model-a", "1", SEARCH, CONTENT, "raw")
+
+    threads = [threading.Thread(target=fill, args=(index, cache)) for index, cache in enumerate(caches)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    for cache in caches:
+        cache.close()
+
+    reopened = ResultCache(path, ttl=3600, max_entries=1000)
+    assert reopened._conn.execute("PRAGMA journal_mode").fetchone()[0] == "wal"
+    assert reopened._conn.execute("SELECT COUNT(*) FROM crew_results").fetchone()[0] == 100
+    reopened.close()
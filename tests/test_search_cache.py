@@ -0,0 +1,76 @@
+import threading
+
+from models.task_outputs import Recipe, SearchOutput
+from tools.search_cache import SearchCache
+from utils.keywords import canonical_keywords
+
+SEARCH = SearchOutput(recipes=[Recipe(title="Lasagna", ingredients=["pasta"], instructions=["Bake"], source="https://a")])
+
+
+def test_canonical_keywords_folds_order_stopwords_and_plurals():
+    assert canonical_keywords("Vegan Lasagna recipe") == canonical_keywords("lasagna vegan")
+    assert canonical_keywords("vegan lasagnas") == canonical_keywords("vegan lasagna")
+    assert canonical_keywords("beef lasagna") != canonical_keywords("vegan lasagna")
+
+
+def test_canonical_keywords_keeps_keywords_that_are_all_stopwords():
+    assert canonical_keywords("The Recipe") == "the recipe"
+
+
+def test_entries_are_shared_across_near_duplicates(tmp_path):
+    cache = SearchCache(str(tmp_path / "search.db"), ttl=3600)
+    cache.put("Vegan Lasagna recipe", SEARCH)
+    assert cache.get("lasagna vegan") == SEARCH
+    assert cache.get("vegan lasagnas") == SEARCH
+    assert cache.get("beef lasagna") is None
+    assert cache.stats()["hits"] == 2
+    assert cache.stats()["misses"] == 1
+    cache.close()
+
+
+def test_empty_results_are_not_cached(tmp_path):
+    cache = SearchCache(str(tmp_path / "search.db"), ttl=3600)
+    cache.put("lasagna", SearchOutput(recipes=[]))
+    assert cache.get("lasagna") is None
+    assert cache.stats()["entries"] == 0
+    cache.close()
+
+
+def test_reads_through_to_sqlite(tmp_path):
+    path = str(tmp_path / "search.db")
+    cache = SearchCache(path, ttl=3600)
+    cache.put("lasagna", SEARCH)
+    cache.close()
+
+    reopened = SearchCache(path, ttl=3600)
+    assert reopened.get("lasagna").recipes[0].source == "https://a"
+    reopened.close()
+
+
+def test_expired_entries_are_misses(tmp_path):
+    cache = SearchCache(str(tmp_path / "search.db"), ttl=0)
+    cache.put("lasagna", SEARCH)
+    assert cache.get("lasagna") is None
+    cache.close()
+
+
+def test_processes_sharing_the_file_can_write_at_once(tmp_path):
+    path = str(tmp_path / "search.db")
+    caches = [SearchCache(path, ttl=3600) for _ in range(4)]
+
+    def fill(index, cache):
+        for item in range(25):
+            cache.put(f"dish{index * 25 + item}", SEARCH)
+
+    threads = [threading.Thread(target=fill, args=(index, cache)) for index, cache in enumerate(caches)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    for cache in caches:
+        cache.close()
+
+    reopened = SearchCache(path, ttl=3600, memory_entries=0)
+    assert reopened._conn.execute("PRAGMA journal_mode").fetchone()[0] == "wal"
+    assert reopened._conn.execute("SELECT COUNT(*) FROM search_results").fetchone()[0] == 100
+    reopened.close()
@@ -0,0 +1,73 @@
+# Interactive mode shuts down on a signal without waiting for the prompt
+
+import argparse
+import asyncio
+import os
+import signal
+import threading
+import time
+
+import main
+
+
+class FakeTerminalUI:
+    def __init__(self, answers):
+        self.answers = list(answers)
+        self.blocked = threading.Event()
+
+    def get_user_input(self, prompt):
+        if self.answers:
+            return self.answers.pop(0)
+        # Nobody is typing; block like input() does
+        self.blocked.set()
+        threading.Event().wait()
+
+
+class FakeStorage:
+    pending_writes = 0
+
+    def __init__(self):
+        self.closed = False
+
+    def close(self):
+        self.closed = True
+
+
+def test_read_user_input_stops_at_quit():
+    async def collect():
+        return [keywords async for keywords in main.read_user_input(FakeTerminalUI(["pasta", "soup", "quit"]))]
+
+    assert asyncio.run(collect()) == ["pasta", "soup"]
+
+
+def test_signal_closes_storage_while_the_prompt_is_waiting(monkeypatch):
+    storage = FakeStorage()
+    ui = FakeTerminalUI(["pasta"])
+    seen = []
+
+    async def interrupt():
+        await asyncio.to_thread(ui.blocked.wait)
+        os.kill(os.getpid(), signal.SIGTERM)
+
+    async def run_interactive_mode(context, terminal_ui, stream=False):
+        interrupting = asyncio.create_task(interrupt())
+        async for keywords in main.read_user_input(ui):
+            seen.append(keywords)
+        await interrupting
+
+    monkeypatch.setattr(main, "check_environment_variables", lambda replaying=False: None)
+    monkeypatch.setattr(main, "configure_cassette", lambda args: None)
+    monkeypatch.setattr(main, "open_storage", lambda uri: storage)
+    monkeypatch.setattr(main, "create_pipeline_context", lambda db_handler, search_mode: main.PipelineContext(None, db_handler))
+    monkeypatch.setattr(main, "run_interactive_mode", run_interactive_mode)
+
+    # main_async imports litellm first; keep that out of the shutdown timing
+    import litellm.exceptions  # noqa: F401
+
+    args = argparse.Namespace(command=None, metrics_json=None, cassette_mode=None, search_mode="agent", stream=False)
+    start = time.monotonic()
+    asyncio.run(main.main_async(args))
+
+    assert seen == ["pasta"]
+    assert storage.closed
+    assert time.monotonic() - start < 5
@@ -0,0 +1,88 @@
+import pytest
+
+from tools import similarity_cache
+from tools.similarity_cache import SimilarityCache, SimilarityIndex
+
+ENTRIES = [("lasagna", "Classic Lasagna"), ("beef stew", "Hearty Beef Stew"), ("pad thai", "Easy Pad Thai")]
+
+
+@pytest.fixture(params=["numpy", "pure python"])
+def vectorized(request, monkeypatch):
+    if request.param == "pure python":
+        monkeypatch.setattr(similarity_cache, "numpy", None)
+    elif similarity_cache.numpy is None:
+        pytest.skip("numpy is not installed")
+
+
+def test_index_ranks_the_closest_text_first(vectorized):
+    index = SimilarityIndex(dimensions=256)
+    index.add_many((keywords, f"{keywords} {title}") for keywords, title in ENTRIES)
+    index.add("chickpea curry", "chickpea curry Chickpea Curry")
+
+    [(score, key)] = index.query("chickpeas curry")
+    assert key == "chickpea curry"
+    assert 0 < score <= 1.0001
+    assert "beef stew" not in [key for _, key in index.query("beef stew", k=2, exclude="beef stew")]
+
+
+def test_serves_reworded_keywords(vectorized):
+    cache = SimilarityCache(serve_threshold=0.9, draft_threshold=0.6)
+    cache.load(ENTRIES)
+
+    outcome, match = cache.find("easy lasagna")
+    assert outcome == "serve"
+    assert match.keywords == "lasagna"
+
+
+def test_drafts_from_a_close_article(vectorized):
+    cache = SimilarityCache(serve_threshold=0.9, draft_threshold=0.6)
+    cache.load(ENTRIES)
+
+    outcome, match = cache.find("pad thai noodles")
+    assert outcome == "draft"
+    assert match.keywords == "pad thai"
+    assert 0.6 <= match.score < 0.9
+
+
+def test_misses_unrelated_keywords_and_ignores_exact_matches(vectorized):
+    cache = SimilarityCache(serve_threshold=0.9, draft_threshold=0.6)
+    cache.load(ENTRIES)
+    cache.add("pho", "Vietnamese Pho")
+
+    assert cache.find("chocolate cake") == ("miss", None)
+    assert cache.find("Lasagna") == ("miss", None)
+    assert cache.stats()["entries"] == 4
+    assert cache.stats()["misses"] == 2
+
+
+def test_default_thresholds_do_not_draft_a_different_dish(vectorized):
+    from config.settings import SIMILARITY_DRAFT_THRESHOLD, SIMILARITY_SERVE_THRESHOLD
+
+    cache = SimilarityCache(SIMILARITY_SERVE_THRESHOLD, SIMILARITY_DRAFT_THRESHOLD)
+    cache.load([("lasagna", "Classic Lasagna"), ("beef stew", "Hearty Beef Stew")])
+
+    assert cache.find("vegan lasagna") == ("miss", None)
+    assert cache.find("lasagna soup") == ("miss", None)
+    assert cache.find("easy lasagna")[0] == "serve"
+    # The stored title counts against a reworded query, but the same dish still drafts
+    outcome, match = cache.find("beef stew recipe")
+    assert (outcome, match.keywords) == ("draft", "beef stew")
+
+
+def test_drafts_are_revised_with_the_keywords_own_search_results(monkeypatch):
+    import json
+    from types import SimpleNamespace
+
+    import main
+    from models.task_outputs import ContentOutput, Recipe, SearchOutput
+
+    monkeypatch.setattr(main, "create_edit_crew", lambda agent: "edit crew")
+    draft = SimpleNamespace(keywords="pad thai", content_output=ContentOutput(
+        title="Easy Pad Thai", introduction="", ingredients=[], instructions=[], seo_optimized_text=""))
+    own_search = SearchOutput(recipes=[Recipe(title="Pad Thai Noodles", ingredients=["rice noodles"],
+                                              instructions=["Soak"], source="https://b")])
+
+    crew, inputs = main.prepare_crew_run(SimpleNamespace(agents=[None, None]), "pad thai noodles", own_search, draft)
+    assert crew == "edit crew"
+    assert inputs["draft_keywords"] == "pad thai"
+    assert json.loads(inputs["search_results"])["recipes"][0]["title"] == "Pad Thai Noodles"
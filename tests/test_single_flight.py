@@ -0,0 +1,66 @@
+import asyncio
+
+import pytest
+
+from utils.single_flight import SingleFlight
+
+
+def test_concurrent_calls_for_a_key_share_one_execution():
+    async def scenario():
+        flight = SingleFlight()
+        calls = 0
+
+        async def work():
+            nonlocal calls
+            calls += 1
+            await asyncio.sleep(0.01)
+            return "article"
+
+        results = await asyncio.gather(*(flight.do("pasta", work) for _ in range(5)))
+        return flight, calls, results
+
+    flight, calls, results = asyncio.run(scenario())
+    assert results == ["article"] * 5
+    assert calls == 1
+    assert flight.stats() == {"executions": 1, "coalesced": 4, "in_flight": 0}
+
+
+def test_different_keys_and_later_calls_run_fresh():
+    async def scenario():
+        flight = SingleFlight()
+        await asyncio.gather(flight.do("a", lambda: asyncio.sleep(0, "a")),
+                             flight.do("b", lambda: asyncio.sleep(0, "b")))
+        await flight.do("a", lambda: asyncio.sleep(0, "a"))
+        return flight
+
+    assert asyncio.run(scenario()).executions == 3
+
+
+def test_errors_reach_every_caller_and_release_the_key():
+    async def scenario():
+        flight = SingleFlight()
+
+        async def failing():
+            await asyncio.sleep(0.01)
+            raise ValueError("search failed")
+
+        outcomes = await asyncio.gather(flight.do("a", failing), flight.do("a", failing), return_exceptions=True)
+        return flight, outcomes
+
+    flight, outcomes = asyncio.run(scenario())
+    assert all(isinstance(outcome, ValueError) for outcome in outcomes)
+    assert not flight.in_flight("a")
+
+
+def test_a_cancelled_caller_does_not_cancel_the_shared_work():
+    async def scenario():
+        flight = SingleFlight()
+        first = asyncio.ensure_future(flight.do("a", lambda: asyncio.sleep(0.02, "done")))
+        second = asyncio.ensure_future(flight.do("a", lambda: asyncio.sleep(0.02, "done")))
+        await asyncio.sleep(0)
+        first.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await first
+        return await second
+
+    assert asyncio.run(scenario()) == "done"
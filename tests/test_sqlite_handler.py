@@ -0,0 +1,239 @@
+import sqlite3
+from datetime import datetime, timedelta
+
+import pytest
+
+from tools.sqlite_handler import SQLiteHandler
+from tools.storage import WriteBehindError, open_storage
+
+RECIPE = {"title": "Lasagna", "ingredients": ["pasta"], "instructions": ["Bake"], "source": "https://a/lasagna#top"}
+
+
+def generation(keywords, created_at, title=None):
+    return {
+        "keywords": keywords,
+        "created_at": created_at,
+        "model": "model-a",
+        "prompt_version": "1",
+        "content": {"title": title or keywords.title(), "ingredients": ["pasta", "ricotta"]},
+        "token_usage": {"total_tokens": 10},
+    }
+
+
+@pytest.fixture
+def handler(tmp_path):
+    handler = SQLiteHandler(str(tmp_path / "store.db"), flush_interval=60)
+    yield handler
+    handler.close()
+
+
+def test_open_storage_picks_sqlite_for_sqlite_uris(tmp_path):
+    handler = open_storage(f"sqlite:///{tmp_path / 'store.db'}")
+    assert isinstance(handler, SQLiteHandler)
+    handler.close()
+
+
+def test_writes_are_queued_until_flush(handler):
+    generation_id = handler.save_generation(generation("lasagna", datetime(2024, 1, 1)), [RECIPE], {"raw_output": "x"})
+    assert handler.pending_writes == 1
+    assert handler.get_generation(generation_id) is None
+
+    handler.flush()
+    assert handler.pending_writes == 0
+    document = handler.get_generation(generation_id)
+    assert document["keywords"] == "lasagna"
+    assert document["content"]["title"] == "Lasagna"
+    assert document["created_at"] == datetime(2024, 1, 1)
+
+
+def test_transcript_and_recipes_are_read_back_on_request(handler):
+    transcript = {"raw_output": "final", "tasks": [{"raw": "search"}]}
+    generation_id = handler.save_generation(generation("lasagna", datetime(2024, 1, 1)), [RECIPE], transcript)
+    handler.flush()
+
+    document = handler.get_generation(generation_id, include_raw=True, include_recipes=True)
+    assert document["raw_output"] == "final"
+    assert document["tasks_output"] == [{"raw": "search"}]
+    assert [recipe["title"] for recipe in document["recipes"]] == ["Lasagna"]
+
+
+def test_source_recipes_are_stored_once_per_url(handler):
+    same_page = dict(RECIPE, source="https://a/lasagna/")
+    handler.save_generation(generation("lasagna", datetime(2024, 1, 1)), [RECIPE], {})
+    handler.save_generation(generation("easy lasagna", datetime(2024, 1, 2)), [same_page], {})
+    handler.flush()
+    with handler._db_lock:
+        assert handler._conn.execute("SELECT COUNT(*) FROM source_recipes").fetchone()[0] == 1
+
+
+def test_source_recipes_keep_the_latest_body_and_the_first_sighting(handler):
+    handler.save_generation(generation("lasagna", datetime(2024, 1, 1)), [RECIPE], {})
+    handler.flush()
+    with handler._db_lock:
+        first_seen_at = handler._conn.execute("SELECT first_seen_at FROM source_recipes").fetchone()[0]
+
+    handler.save_generation(generation("lasagna", datetime(2024, 1, 2)), [dict(RECIPE, title="Lasagna al forno")], {})
+    handler.flush()
+    with handler._db_lock:
+        assert handler._conn.execute("SELECT title, first_seen_at FROM source_recipes").fetchall() == [
+            ("Lasagna al forno", first_seen_at)
+        ]
+
+
+def test_search_history_filters_and_pages_newest_first(handler):
+    start = datetime(2024, 1, 1)
+    for day in range(5):
+        handler.save_generation(generation("lasagna" if day % 2 == 0 else "beef stew", start + timedelta(days=day)),
+                                [], {})
+    handler.flush()
+
+    page, cursor = handler.search_history(limit=2)
+    assert [document["created_at"].day for document in page] == [5, 4]
+    page, cursor = handler.search_history(limit=2, cursor=cursor)
+    assert [document["created_at"].day for document in page] == [3, 2]
+    page, cursor = handler.search_history(limit=2, cursor=cursor)
+    assert [document["created_at"].day for document in page] == [1]
+    assert cursor is None
+
+    matches, _ = handler.search_history(keywords="  Lasagna ")
+    assert len(matches) == 3
+    matches, _ = handler.search_history(text="stew")
+    assert {document["keywords"] for document in matches} == {"beef stew"}
+
+
+def test_jobs_record_keyword_states_and_skip_duplicates(handler):
+    assert handler.create_job("job-1", ["lasagna", "beef stew", "Lasagna"], source="keywords.txt") == 2
+    # Re-running the same job adds nothing that is already tracked
+    assert handler.create_job("job-1", ["beef stew", "pho"]) == 1
+
+    handler.update_job_keyword("job-1", "lasagna", "running")
+    handler.update_job_keyword("job-1", "lasagna", "done")
+    handler.update_job_keyword("job-1", "beef stew", "running")
+    handler.update_job_keyword("job-1", "beef stew", "failed", error="boom")
+
+    [failed] = handler.job_keywords("job-1", states=["failed"])
+    assert (failed["keywords"], failed["error"], failed["attempts"]) == ("beef stew", "boom", 1)
+    assert [row["keywords"] for row in handler.job_keywords("job-1")] == ["lasagna", "beef stew", "pho"]
+
+    handler.finish_job("job-1", "completed")
+    job = handler.get_job("job-1")
+    assert (job["status"], job["total"], job["source"]) == ("completed", 3, "keywords.txt")
+    assert job["states"] == {"done": 1, "failed": 1, "pending": 1}
+    assert [listed["_id"] for listed in handler.list_jobs()] == ["job-1"]
+    assert handler.get_job("job-2") is None
+
+
+def test_job_keywords_are_claimed_in_order_and_not_twice(handler):
+    assert handler.create_job("job-1", ["lasagna", "beef stew", "Lasagna"]) == 2
+    first = handler.claim_job_keyword("job-1", "worker-1", max_attempts=3, lease_seconds=600)
+    second = handler.claim_job_keyword("job-1", "worker-2", max_attempts=3, lease_seconds=600)
+    assert (first["keywords"], second["keywords"]) == ("lasagna", "beef stew")
+    assert handler.claim_job_keyword("job-1", "worker-3", max_attempts=3, lease_seconds=600) is None
+
+    handler.update_job_keyword("job-1", "lasagna", "done")
+    handler.update_job_keyword("job-1", "beef stew", "failed", error="boom")
+    retried = handler.claim_job_keyword("job-1", "worker-1", max_attempts=3, lease_seconds=600)
+    assert retried["keywords"] == "beef stew"
+    assert retried["attempts"] == 2
+
+    handler.update_job_keyword("job-1", "beef stew", "failed", error="boom")
+    assert handler.claim_job_keyword("job-1", "worker-1", max_attempts=2, lease_seconds=600) is None
+
+
+def test_expired_claims_are_taken_over(handler):
+    handler.create_job("job-1", ["lasagna"])
+    handler.claim_job_keyword("job-1", "worker-1", max_attempts=3, lease_seconds=600)
+
+    assert handler.claim_job_keyword("job-1", "worker-2", max_attempts=3, lease_seconds=600) is None
+    taken = handler.claim_job_keyword("job-1", "worker-2", max_attempts=3, lease_seconds=-1)
+    assert (taken["keywords"], taken["attempts"]) == ("lasagna", 2)
+
+
+def test_late_results_from_an_expired_claim_are_dropped(handler):
+    handler.create_job("job-1", ["lasagna"])
+    first = handler.claim_job_keyword("job-1", "worker-1", max_attempts=3, lease_seconds=600)
+    second = handler.claim_job_keyword("job-1", "worker-2", max_attempts=3, lease_seconds=-1)
+
+    assert not handler.update_job_keyword("job-1", "lasagna", "failed", "timed out",
+                                          worker="worker-1", attempts=first["attempts"])
+    assert handler.job_keywords("job-1")[0]["state"] == "running"
+    assert handler.update_job_keyword("job-1", "lasagna", "done", worker="worker-2", attempts=second["attempts"])
+    assert handler.job_keywords("job-1")[0]["state"] == "done"
+
+
+def test_workers_on_separate_connections_never_share_a_keyword(tmp_path):
+    from concurrent.futures import ThreadPoolExecutor
+
+    path = str(tmp_path / "jobs.db")
+    handlers = [SQLiteHandler(path, flush_interval=60) for _ in range(4)]
+    keywords = [f"dish {i}" for i in range(40)]
+    handlers[0].create_job("job-1", keywords)
+
+    def drain(worker):
+        claimed = []
+        while True:
+            row = handlers[worker].claim_job_keyword("job-1", f"worker-{worker}", max_attempts=3, lease_seconds=600)
+            if row is None:
+                return claimed
+            claimed.append(row["keywords"])
+
+    try:
+        with ThreadPoolExecutor(max_workers=4) as pool:
+            claims = [keyword for claimed in pool.map(drain, range(4)) for keyword in claimed]
+    finally:
+        for handler in handlers:
+            handler.close()
+    assert sorted(claims) == sorted(keywords)
+
+
+def test_failed_batches_are_retried(handler, monkeypatch):
+    real_connection = handler._conn
+    failures = iter([sqlite3.OperationalError("database is locked")])
+
+    class FlakyConnection:
+        def __getattr__(self, name):
+            return getattr(real_connection, name)
+
+        def __enter__(self):
+            return real_connection.__enter__()
+
+        def __exit__(self, *exc_info):
+            return real_connection.__exit__(*exc_info)
+
+        def executemany(self, *args):
+            error = next(failures, None)
+            if error:
+                raise error
+            return real_connection.executemany(*args)
+
+    monkeypatch.setattr(handler, "_conn", FlakyConnection())
+    monkeypatch.setattr(handler, "flush_interval", 0.01)
+    generation_id = handler.save_generation(generation("lasagna", datetime(2024, 1, 1)), [], {})
+    handler.flush()
+    monkeypatch.setattr(handler, "_conn", real_connection)
+    assert handler.get_generation(generation_id) is not None
+
+
+def test_writes_that_keep_failing_are_reported(handler, monkeypatch):
+    real_connection = handler._conn
+
+    class BrokenConnection:
+        def __getattr__(self, name):
+            return getattr(real_connection, name)
+
+        def __enter__(self):
+            return real_connection.__enter__()
+
+        def __exit__(self, *exc_info):
+            return real_connection.__exit__(*exc_info)
+
+        def executemany(self, *args):
+            raise sqlite3.OperationalError("disk I/O error")
+
+    monkeypatch.setattr(handler, "_conn", BrokenConnection())
+    monkeypatch.setattr(handler, "flush_interval", 0.01)
+    handler.save_generation(generation("lasagna", datetime(2024, 1, 1)), [], {})
+    with pytest.raises(WriteBehindError):
+        handler.flush()
+    assert handler.pending_writes == 0
+    monkeypatch.setattr(handler, "_conn", real_connection)
@@ -0,0 +1,22 @@
+# Startup budget of the storage-only commands, measured with benchmarks/bench_startup.py
+
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "benchmarks"))
+
+import bench_startup
+
+# Generous for a cold interpreter on a CI runner; override with STARTUP_BUDGET_SECONDS
+BUDGET_SECONDS = float(os.getenv("STARTUP_BUDGET_SECONDS", "2.0"))
+
+
+@pytest.mark.parametrize("command", sorted(bench_startup.LIGHT_COMMANDS))
+def test_light_command_starts_without_llm_stack(command, tmp_path):
+    env = bench_startup.startup_environment(str(tmp_path))
+    result = bench_startup.bench_command(command, bench_startup.LIGHT_COMMANDS[command], env, runs=1, top=10)
+
+    assert result["modules"], "no -X importtime output was captured"
+    assert bench_startup.check_result(result, BUDGET_SECONDS) == []
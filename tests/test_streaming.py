@@ -0,0 +1,99 @@
+# Streaming mode: only parsed content is cached and saved
+
+import asyncio
+from types import SimpleNamespace
+
+import main
+from agents.content_generator_agent import ContentGeneratorAgent
+from models.task_outputs import ContentOutput, ContentStreamEvent, Recipe, SearchOutput
+from tools.llm_client import CircuitOpen
+
+SEARCH = SearchOutput(recipes=[Recipe(title="Lasagna", ingredients=["pasta"], instructions=["Bake"], source="https://a")])
+
+
+class FakeResultCache:
+    def __init__(self):
+        self.puts = []
+
+    def put(self, *args):
+        self.puts.append(args)
+
+
+class FakeContentAgent:
+    def __init__(self, events=(), error=None):
+        self.events = events
+        self.error = error
+
+    async def stream_content(self, search_results, keywords):
+        for event in self.events:
+            yield event
+        if self.error:
+            raise self.error
+
+
+def content(title="Lasagna"):
+    return ContentOutput(title=title, introduction="", ingredients=[], instructions=[], seo_optimized_text="")
+
+
+def stream(monkeypatch, content_agent):
+    saved = []
+    cache = FakeResultCache()
+    monkeypatch.setattr(main, "save_to_mongodb", lambda db_handler, keywords, result: saved.append(keywords))
+
+    async def search_keyword_async(context, limits, keywords):
+        return SEARCH
+    monkeypatch.setattr(main, "search_keyword_async", search_keyword_async)
+
+    context = main.PipelineContext(recipe_crew=None, db_handler=None, result_cache=cache,
+                                   content_agent=content_agent)
+
+    async def collect():
+        return [event async for event in main.stream_keyword_async(context, main.create_stage_limits(), "lasagna")]
+
+    return asyncio.run(collect()), cache.puts, saved
+
+
+def test_parsed_content_is_cached_and_saved(monkeypatch):
+    done = ContentStreamEvent(kind="done", token="{}", content=content(), model="groq/llama")
+    events, puts, saved = stream(monkeypatch, FakeContentAgent([done]))
+    assert events == [done]
+    assert len(puts) == 1
+    assert saved == ["lasagna"]
+
+
+def test_failed_parse_is_neither_cached_nor_saved(monkeypatch):
+    done = ContentStreamEvent(kind="done", token="not json", content=content("Placeholder"), failed=True)
+    events, puts, saved = stream(monkeypatch, FakeContentAgent([done]))
+    assert events == [done]
+    assert puts == []
+    assert saved == []
+
+
+def test_stream_errors_end_the_stream_without_raising(monkeypatch):
+    token = ContentStreamEvent(kind="token", token="{")
+    for error in (CircuitOpen("content_stream breaker is open"), RuntimeError("connection reset")):
+        events, puts, saved = stream(monkeypatch, FakeContentAgent([token], error=error))
+        assert events == [token]
+        assert puts == [] and saved == []
+
+
+def test_stream_content_marks_unparseable_responses_as_failed():
+    class FakeClient:
+        async def acompletion(self, messages, **kwargs):
+            async def chunks():
+                for text in ("Sorry, ", "I can't help with that."):
+                    yield SimpleNamespace(choices=[SimpleNamespace(delta=SimpleNamespace(content=text))])
+            return chunks(), "groq/llama"
+
+    # Skips __init__, which builds a crewai Agent around a chat model
+    agent = ContentGeneratorAgent.__new__(ContentGeneratorAgent)
+    agent.model_name = "groq/llama"
+    agent.llm_client = FakeClient()
+    agent.build_prompt = lambda search_results, keywords: "prompt"
+
+    async def collect():
+        return [event async for event in agent.stream_content(SEARCH, "lasagna")]
+
+    done = asyncio.run(collect())[-1]
+    assert done.kind == "done"
+    assert done.failed
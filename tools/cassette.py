@@ -0,0 +1,235 @@
+# Record/replay of LLM and search calls, for reruns and load tests without the network
+
+import asyncio
+import gzip
+import hashlib
+import json
+import logging
+import os
+import threading
+import time
+from typing import Any, Dict, List, Optional
+
+from utils.metrics import metrics
+
+logger = logging.getLogger(__name__)
+
+# Request fields that identify a call. Credentials, endpoints and per-call bookkeeping
+# are left out so a cassette recorded with one key or base URL replays with another
+IGNORED_REQUEST_FIELDS = frozenset({
+    "api_key", "api_base", "base_url", "metadata", "callbacks", "litellm_logging_obj",
+    "litellm_call_id", "timeout", "num_retries", "stream_options", "mock_response",
+})
+
+metrics.describe("cassette_calls_total", "Calls through the cassette layer, by kind and outcome (hit, miss, recorded)")
+
+
+class CassetteMiss(Exception):
+    """Raised in replay mode for a request the cassette has no response for."""
+
+
+def _canonical(value: Any) -> Any:
+    # Pydantic classes (response_format) hash by their schema, other objects by type name
+    if hasattr(value, "model_json_schema"):
+        return value.model_json_schema()
+    if hasattr(value, "model_dump"):
+        return value.model_dump()
+    return type(value).__name__
+
+
+def request_key(kind: str, request: Dict[str, Any]) -> str:
+    """Return the content hash identifying a request of `kind`."""
+    material = {name: value for name, value in request.items() if name not in IGNORED_REQUEST_FIELDS}
+    encoded = json.dumps([kind, material], sort_keys=True, default=_canonical, separators=(",", ":"))
+    return hashlib.sha256(encoded.encode("utf-8")).hexdigest()
+
+
+class CassetteStore:
+    """
+    Append-only store of recorded responses keyed by the content hash of their request.
+
+    Each entry is one gzip member appended with a single write, so the file stays a
+    valid gzip stream, entries are never rewritten, and processes recording into the
+    same file do not interleave. A request already in the store is not recorded again;
+    replay serves the first response recorded for it.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self._entries: Dict[str, Dict[str, Any]] = {}
+        self._lock = threading.Lock()
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        if os.path.exists(path):
+            with gzip.open(path, "rt", encoding="utf-8") as f:
+                for line in f:
+                    if line.strip():
+                        entry = json.loads(line)
+                        self._entries.setdefault(entry["key"], entry)
+        logger.info(f"Cassette {path}: {len(self._entries)} recorded calls")
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def get(self, key: str) -> Optional[Dict[str, Any]]:
+        return self._entries.get(key)
+
+    def append(self, key: str, kind: str, response: Any, latency: float) -> None:
+        entry = {"key": key, "kind": kind, "latency": round(latency, 4), "response": response}
+        data = gzip.compress((json.dumps(entry, separators=(",", ":")) + "\n").encode("utf-8"))
+        with self._lock:
+            if key in self._entries:
+                return
+            self._entries[key] = entry
+            fd = os.open(self.path, os.O_WRONLY | os.O_APPEND | os.O_CREAT, 0o644)
+            try:
+                os.write(fd, data)
+            finally:
+                os.close(fd)
+
+
+class Cassette:
+    """
+    Records or replays every LLM completion and recipe search made by the pipeline.
+
+    `install()` wraps litellm.completion/acompletion (which the crew's LLM and the shared
+    LLMClient call, streaming included) and RecipeSearchTool's Serper query and page
+    fetch. In record mode calls go to the network and their responses are appended to
+    the store; in replay mode responses come from the store and nothing touches the
+    network. Replayed calls wait for their recorded latency times `latency_scale`:
+    1.0 for realistic timing, 0 to run at local-disk speed.
+    """
+
+    def __init__(self, store: CassetteStore, mode: str, latency_scale: float = 0.0):
+        if mode not in ("record", "replay"):
+            raise ValueError(f"Unknown cassette mode '{mode}'")
+        self.store = store
+        self.mode = mode
+        self.latency_scale = latency_scale
+
+    def _lookup(self, kind: str, key: str) -> Dict[str, Any]:
+        entry = self.store.get(key)
+        if entry is None:
+            metrics.inc("cassette_calls_total", kind=kind, outcome="miss")
+            raise CassetteMiss(f"No recorded {kind} response for request {key[:12]} in {self.store.path}")
+        metrics.inc("cassette_calls_total", kind=kind, outcome="hit")
+        return entry
+
+    def _recorded(self, kind: str, key: str, response: Any, latency: float) -> None:
+        self.store.append(key, kind, response, latency)
+        metrics.inc("cassette_calls_total", kind=kind, outcome="recorded")
+
+    def wrap_method(self, kind: str, method):
+        """Wrap a method returning JSON-serializable data; its arguments (not self) identify the request."""
+        cassette = self
+
+        def wrapper(instance, *args, **kwargs):
+            key = request_key(kind, {"args": list(args), **kwargs})
+            if cassette.mode == "replay":
+                entry = cassette._lookup(kind, key)
+                time.sleep(entry["latency"] * cassette.latency_scale)
+                return entry["response"]
+            start = time.perf_counter()
+            result = method(instance, *args, **kwargs)
+            cassette._recorded(kind, key, result, time.perf_counter() - start)
+            return result
+        return wrapper
+
+    def wrap_completion(self, completion):
+        import litellm
+        cassette = self
+
+        def wrapper(*args, **kwargs):
+            key = request_key("llm", dict(kwargs, args=list(args)) if args else kwargs)
+            if cassette.mode == "replay":
+                entry = cassette._lookup("llm", key)
+                if kwargs.get("stream"):
+                    return cassette._replay_stream(entry)
+                time.sleep(entry["latency"] * cassette.latency_scale)
+                return litellm.ModelResponse(**entry["response"])
+            start = time.perf_counter()
+            response = completion(*args, **kwargs)
+            if kwargs.get("stream"):
+                return cassette._record_stream(key, response, start)
+            cassette._recorded("llm", key, response.model_dump(), time.perf_counter() - start)
+            return response
+        return wrapper
+
+    def wrap_acompletion(self, acompletion):
+        import litellm
+        cassette = self
+
+        async def wrapper(*args, **kwargs):
+            key = request_key("llm", dict(kwargs, args=list(args)) if args else kwargs)
+            if cassette.mode == "replay":
+                entry = cassette._lookup("llm", key)
+                if kwargs.get("stream"):
+                    return cassette._areplay_stream(entry)
+                await asyncio.sleep(entry["latency"] * cassette.latency_scale)
+                return litellm.ModelResponse(**entry["response"])
+            start = time.perf_counter()
+            response = await acompletion(*args, **kwargs)
+            if kwargs.get("stream"):
+                return cassette._arecord_stream(key, response, start)
+            cassette._recorded("llm", key, response.model_dump(), time.perf_counter() - start)
+            return response
+        return wrapper
+
+    # Streams are recorded as their chunks with each chunk's offset from the request,
+    # so replay reproduces time to first token as well as total time
+
+    def _record_stream(self, key: str, stream, start: float):
+        chunks: List[Dict[str, Any]] = []
+        for chunk in stream:
+            chunks.append({"at": round(time.perf_counter() - start, 4), "chunk": chunk.model_dump()})
+            yield chunk
+        self._recorded("llm", key, {"stream": chunks}, time.perf_counter() - start)
+
+    async def _arecord_stream(self, key: str, stream, start: float):
+        chunks: List[Dict[str, Any]] = []
+        async for chunk in stream:
+            chunks.append({"at": round(time.perf_counter() - start, 4), "chunk": chunk.model_dump()})
+            yield chunk
+        self._recorded("llm", key, {"stream": chunks}, time.perf_counter() - start)
+
+    def _replay_stream(self, entry: Dict[str, Any]):
+        import litellm
+        previous = 0.0
+        for item in entry["response"]["stream"]:
+            time.sleep((item["at"] - previous) * self.latency_scale)
+            previous = item["at"]
+            yield litellm.ModelResponseStream(**item["chunk"])
+
+    async def _areplay_stream(self, entry: Dict[str, Any]):
+        import litellm
+        previous = 0.0
+        for item in entry["response"]["stream"]:
+            await asyncio.sleep((item["at"] - previous) * self.latency_scale)
+            previous = item["at"]
+            yield litellm.ModelResponseStream(**item["chunk"])
+
+    def install(self) -> None:
+        import litellm
+        from tools.recipe_search_tool import RecipeSearchTool
+
+        litellm.completion = self.wrap_completion(litellm.completion)
+        litellm.acompletion = self.wrap_acompletion(litellm.acompletion)
+        RecipeSearchTool.search_links = self.wrap_method("serper", RecipeSearchTool.search_links)
+        RecipeSearchTool.fetch_page = self.wrap_method("page", RecipeSearchTool.fetch_page)
+        logger.info(f"Cassette {self.mode} mode: {self.store.path} ({len(self.store)} recorded calls)")
+
+
+def install_cassette(path: str, mode: str, latency_scale: float = 0.0) -> Cassette:
+    """
+    Open the cassette at `path` and route LLM and search calls through it.
+
+    Args:
+        path (str): Cassette file; created on the first recorded call.
+        mode (str): "record" or "replay".
+        latency_scale (float): Replay waits this multiple of each call's recorded latency.
+
+    Returns:
+        Cassette: The installed cassette.
+    """
+    cassette = Cassette(CassetteStore(path), mode, latency_scale)
+    cassette.install()
+    return cassette
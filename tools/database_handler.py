@@ -1,50 +1,639 @@
 # Database handler implementation
 
-from pymongo import MongoClient
-from rich.console import Console
+import json
+import logging
+import threading
+import time
+from datetime import datetime, timedelta
+import bson
+from bson import ObjectId
+from pymongo.errors import BulkWriteError
+from pymongo import MongoClient, InsertOne, ReplaceOne, UpdateOne, ReturnDocument, ASCENDING, DESCENDING, TEXT
+from config.settings import DB_WRITE_BATCH_SIZE, DB_WRITE_FLUSH_INTERVAL, DB_WRITE_MAX_ATTEMPTS, STORAGE_SCHEMA_VERSION
+from tools.storage import WriteBehindError, encode_cursor, encode_transcript, recipe_key, split_cursor
+from utils.compression import decompress
+from utils.keywords import normalize_keywords
+from utils.logging_setup import console
+from utils.metrics import metrics
 
-console = Console()
+logger = logging.getLogger(__name__)
+
+# History listings never pull raw_output or tasks_output
+HISTORY_PROJECTION = {
+    "keywords": 1,
+    "keywords_normalized": 1,
+    "created_at": 1,
+    "content.title": 1,
+    "content.ingredients": 1,
+    "content.seo_optimized_text": 1,
+    "token_usage": 1,
+}
+
+# Exports and refreshes read the article and its metadata, never the transcript
+EXPORT_PROJECTION = {
+    "keywords": 1,
+    "keywords_normalized": 1,
+    "created_at": 1,
+    "model": 1,
+    "prompt_version": 1,
+    "content": 1,
+    "token_usage": 1,
+    "fingerprints": 1,
+}
+
+# Server error code of an insert whose _id is already stored
+DUPLICATE_KEY = 11000
 
 class DatabaseHandler:
-    def __init__(self, connection_string):
+    def __init__(self, connection_string, batch_size=DB_WRITE_BATCH_SIZE, flush_interval=DB_WRITE_FLUSH_INTERVAL,
+                 max_attempts=DB_WRITE_MAX_ATTEMPTS):
         try:
             self.client = MongoClient(connection_string)
             self.db = self.client["food_recipes"]
             self.recipes_collection = self.db["recipes"]
             self.content_collection = self.db["content"]
+            # Schema v2 side collections: source recipes keyed by URL, compressed transcripts by generation id
+            self.source_recipes_collection = self.db["source_recipes"]
+            self.raw_outputs_collection = self.db["raw_outputs"]
+            # Bulk job manifests and per-keyword state
+            self.jobs_collection = self.db["jobs"]
+            self.job_keywords_collection = self.db["job_keywords"]
             console.print("[bold green]Successfully connected to MongoDB[/bold green]")
         except Exception as e:
             console.print(f"[bold red]Failed to connect to MongoDB: {str(e)}[/bold red]")
             raise e
 
+        # Write-behind queue: operations are buffered per collection and sent with
+        # bulk_write once batch_size operations are pending or flush_interval has passed.
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.max_attempts = max_attempts
+        self.write_round_trips = 0
+        self.documents_written = 0
+        self._pending = {}
+        self._pending_count = 0
+        # Failed batches waiting for another attempt: (collection, operations, attempts so far)
+        self._retries = []
+        self._lost = 0
+        # Re-entrant so the signal handlers can flush even if they interrupt a queue_write
+        self._lock = threading.RLock()
+        self._flush_lock = threading.RLock()
+        self._wakeup = threading.Event()
+        self._closed = False
+        # MongoClient connects in the background; index creation is the first real round-trip,
+        # so it runs on the writer thread instead of delaying startup
+        self._indexes_ready = threading.Event()
+        self._writer = threading.Thread(target=self._write_loop, name="mongo-write-behind", daemon=True)
+        self._writer.start()
+
+    def ensure_indexes(self):
+        # create_index is a no-op when an identical index exists, so this is safe on every start
+        try:
+            self.recipes_collection.create_index(
+                [("keywords_normalized", ASCENDING), ("created_at", DESCENDING), ("_id", DESCENDING)],
+                name="keywords_created_at"
+            )
+            self.recipes_collection.create_index(
+                [("created_at", DESCENDING), ("_id", DESCENDING)],
+                name="created_at"
+            )
+            self.recipes_collection.create_index(
+                [("content.title", TEXT), ("content.ingredients", TEXT)],
+                weights={"content.title": 5, "content.ingredients": 1},
+                name="content_text"
+            )
+            self.job_keywords_collection.create_index(
+                [("job_id", ASCENDING), ("position", ASCENDING)],
+                name="job_position"
+            )
+            self.job_keywords_collection.create_index(
+                [("job_id", ASCENDING), ("state", ASCENDING), ("position", ASCENDING)],
+                name="job_claim"
+            )
+        except Exception as e:
+            console.print(f"[bold red]Error creating indexes: {str(e)}[/bold red]")
+        finally:
+            self._indexes_ready.set()
+
+    @property
+    def pending_writes(self):
+        return self._pending_count + sum(len(operations) for _, operations, _ in self._retries)
+
+    def queue_write(self, collection, operation):
+        with self._lock:
+            if self._closed:
+                raise RuntimeError("DatabaseHandler is closed")
+            self._pending.setdefault(collection.name, (collection, []))[1].append(operation)
+            self._pending_count += 1
+            if self._pending_count >= self.batch_size:
+                self._wakeup.set()
+
+    def queue_recipe(self, document):
+        self.queue_write(self.recipes_collection, InsertOne(document))
+
+    def _write_loop(self):
+        self.ensure_indexes()
+        while not self._closed:
+            self._wakeup.wait(self.flush_interval)
+            self._wakeup.clear()
+            self._flush()
+
+    def _flush(self):
+        # One pass over the queue; failed operations are requeued until they run out of attempts
+        with self._flush_lock:
+            with self._lock:
+                pending, self._pending = self._pending, {}
+                self._pending_count = 0
+                retries, self._retries = self._retries, []
+            batches = retries + [(collection, operations, 0) for collection, operations in pending.values()]
+            for collection, operations, attempts in batches:
+                start = time.perf_counter()
+                try:
+                    collection.bulk_write(operations, ordered=False)
+                    failed, error = [], None
+                except BulkWriteError as e:
+                    # Unordered: everything but the listed operations was applied. A duplicate key
+                    # on an insert means an earlier, partly applied attempt already stored it
+                    failed = [
+                        operations[write_error["index"]] for write_error in e.details.get("writeErrors", [])
+                        if write_error.get("code") != DUPLICATE_KEY
+                    ]
+                    error = e
+                except Exception as e:
+                    failed, error = operations, e
+                written = len(operations) - len(failed)
+                if written:
+                    metrics.observe("db_flush_seconds", time.perf_counter() - start, collection=collection.name)
+                    self.write_round_trips += 1
+                    self.documents_written += written
+                    logger.info(f"Flushed {written} writes to '{collection.name}' in {time.perf_counter() - start:.3f}s")
+                if not failed:
+                    continue
+                if attempts + 1 < self.max_attempts:
+                    logger.warning(f"Error flushing {len(failed)} writes to '{collection.name}'; "
+                                   f"requeued (attempt {attempts + 1} of {self.max_attempts}): {str(error)}")
+                    with self._lock:
+                        self._retries.append((collection, failed, attempts + 1))
+                else:
+                    logger.error(f"Dropping {len(failed)} writes to '{collection.name}' after "
+                                 f"{self.max_attempts} attempts: {str(error)}")
+                    with self._lock:
+                        self._lost += len(failed)
+
+    def flush(self):
+        """
+        Write everything queued, retrying failed batches up to `max_attempts` times.
+
+        Raises:
+            WriteBehindError: If writes were lost, here or in the background writer since
+                the last flush.
+        """
+        self._flush()
+        while self._retries:
+            time.sleep(min(1.0, self.flush_interval))
+            self._flush()
+        with self._lock:
+            lost, self._lost = self._lost, 0
+        if lost:
+            raise WriteBehindError(f"{lost} writes could not be stored in MongoDB after {self.max_attempts} attempts")
+
+    def save_generation(self, document, recipes, transcript):
+        """
+        Queue one generation in the compact (v2) schema.
+
+        Source recipes are upserted by URL so a recipe found for many keywords is stored
+        once, and the transcript (raw output and per-task raw text) is compressed into
+        raw_outputs under the generation's _id. The generation document keeps only the
+        parsed article, references and metadata.
+
+        Args:
+            document (dict): Generation fields (keywords, content, token_usage, ...).
+            recipes (list): Source recipe dicts from the search stage, best first.
+            transcript (dict): {"raw_output": str, "tasks": [{"description", "agent", "raw"}]}.
+
+        A document that already has an _id (a job keyword's reserved generation id)
+        replaces any earlier attempt instead of adding a second generation.
+
+        Returns:
+            ObjectId: The generation id.
+        """
+        document = dict(document)
+        replace = "_id" in document
+        document.setdefault("_id", ObjectId())
+        document["schema_version"] = STORAGE_SCHEMA_VERSION
+        document["recipe_ids"] = []
+        for recipe in recipes:
+            key = recipe_key(recipe)
+            if key in document["recipe_ids"]:
+                continue
+            document["recipe_ids"].append(key)
+            self.queue_write(self.source_recipes_collection, source_recipe_upsert(key, recipe))
+        raw = raw_output_document(document["_id"], transcript)
+        if replace:
+            self.queue_write(self.raw_outputs_collection, ReplaceOne({"_id": document["_id"]}, raw, upsert=True))
+            self.queue_write(self.recipes_collection, ReplaceOne({"_id": document["_id"]}, document, upsert=True))
+        else:
+            self.queue_write(self.raw_outputs_collection, InsertOne(raw))
+            self.queue_write(self.recipes_collection, InsertOne(document))
+        return document["_id"]
+
     def save_recipes(self, recipes):
         try:
-            self.recipes_collection.insert_many(recipes)
-            console.log(f"[bold green]Saved {len(recipes)} recipes to MongoDB.[/bold green]")
+            for recipe in recipes:
+                self.queue_write(self.recipes_collection, InsertOne(recipe))
+            logger.info(f"Queued {len(recipes)} recipes for MongoDB")
         except Exception as e:
             console.print(f"[bold red]Error saving recipes: {str(e)}[/bold red]")
 
     def save_content(self, recipe_id, content):
         try:
-            self.content_collection.insert_one({
+            self.queue_write(self.content_collection, InsertOne({
                 "recipe_id": recipe_id,
                 "text": content,
                 "optimized": False
-            })
-            console.log(f"[bold green]Saved content for recipe ID {recipe_id}.[/bold green]")
+            }))
+            logger.info(f"Queued content for recipe ID {recipe_id}")
         except Exception as e:
             console.print(f"[bold red]Error saving content: {str(e)}[/bold red]")
 
     def update_content(self, content_id, optimized_content):
         try:
-            self.content_collection.update_one(
+            self.queue_write(self.content_collection, UpdateOne(
                 {"_id": content_id},
                 {"$set": {"text": optimized_content, "optimized": True}}
-            )
-            console.log(f"[bold green]Updated and optimized content ID {content_id}.[/bold green]")
+            ))
+            logger.info(f"Queued optimized content update for ID {content_id}")
         except Exception as e:
             console.print(f"[bold red]Error updating content: {str(e)}[/bold red]")
 
+    def search_history(self, keywords=None, text=None, since=None, until=None, limit=20, cursor=None):
+        """
+        Page through stored generations, newest first.
+
+        Filters on normalized keywords (exact), a text search over content title and
+        ingredients, and a created_at range all run off indexes. Pages are keyset-paginated
+        on (created_at, _id): pass the returned cursor to get the next page, so deep pages
+        cost the same as the first.
+
+        Returns:
+            (documents, next_cursor): documents use HISTORY_PROJECTION; next_cursor is None
+            on the last page.
+        """
+        # The text index must exist before a $text query
+        self._indexes_ready.wait(timeout=30)
+        query = {}
+        if keywords:
+            query["keywords_normalized"] = normalize_keywords(keywords)
+        if text:
+            query["$text"] = {"$search": text}
+        if since or until:
+            query["created_at"] = {}
+            if since:
+                query["created_at"]["$gte"] = since
+            if until:
+                query["created_at"]["$lt"] = until
+        if cursor:
+            created_at, last_id = decode_cursor(cursor)
+            query["$or"] = [
+                {"created_at": {"$lt": created_at}},
+                {"created_at": created_at, "_id": {"$lt": last_id}},
+            ]
+
+        documents = list(
+            self.recipes_collection.find(query, HISTORY_PROJECTION)
+            .sort([("created_at", DESCENDING), ("_id", DESCENDING)])
+            .limit(limit + 1)
+        )
+        next_cursor = None
+        if len(documents) > limit:
+            documents = documents[:limit]
+            next_cursor = encode_cursor(documents[-1])
+        return documents, next_cursor
+
+    def iter_generations(self, since=None, after=None, until=None, batch_size=500):
+        """
+        Yield stored generations oldest first, for export and refresh.
+
+        A server-side cursor fetches `batch_size` documents per round trip, so memory
+        stays flat however many documents match. `since` keeps documents created on or
+        after a timestamp and `until` those created before one; `after` is a cursor (as
+        from encode_cursor) of the last document a previous export wrote, and keeps only
+        documents past it.
+        """
+        query = {}
+        if since or until:
+            query["created_at"] = {}
+            if since:
+                query["created_at"]["$gte"] = since
+            if until:
+                query["created_at"]["$lt"] = until
+        if after:
+            created_at, last_id = decode_cursor(after)
+            query["$or"] = [
+                {"created_at": {"$gt": created_at}},
+                {"created_at": created_at, "_id": {"$gt": last_id}},
+            ]
+        cursor = (
+            self.recipes_collection.find(query, EXPORT_PROJECTION)
+            .sort([("created_at", ASCENDING), ("_id", ASCENDING)])
+            .batch_size(batch_size)
+        )
+        try:
+            yield from cursor
+        finally:
+            cursor.close()
+
+    def get_generation(self, generation_id, include_raw=False, include_recipes=False):
+        # v1 documents carry raw_output/tasks_output inline; v2 keeps them in raw_outputs
+        projection = None if include_raw else {"raw_output": 0, "tasks_output": 0}
+        document = self.recipes_collection.find_one({"_id": ObjectId(generation_id)}, projection)
+        if not document or document.get("schema_version", 1) < 2:
+            return document
+        if include_raw:
+            raw = self.raw_outputs_collection.find_one({"_id": document["_id"]})
+            if raw:
+                transcript = json.loads(decompress(raw["codec"], raw["data"]))
+                document["raw_output"] = transcript.get("raw_output", "")
+                document["tasks_output"] = transcript.get("tasks", [])
+        if include_recipes:
+            found = {
+                recipe["_id"]: recipe
+                for recipe in self.source_recipes_collection.find({"_id": {"$in": document.get("recipe_ids", [])}})
+            }
+            document["recipes"] = [found[key] for key in document.get("recipe_ids", []) if key in found]
+        return document
+
+    def backfill_history_fields(self, batch_size=500):
+        # Documents written before the history fields existed: derive them from what was stored
+        updated = 0
+        operations = []
+        missing = {"$or": [{"keywords_normalized": {"$exists": False}}, {"created_at": {"$exists": False}}]}
+        for document in self.recipes_collection.find(missing, {"keywords": 1, "tasks_output": 1}):
+            fields = {
+                "keywords_normalized": normalize_keywords(document.get("keywords", "")),
+                "created_at": document["_id"].generation_time.replace(tzinfo=None),
+            }
+            content = legacy_task_result(document, "seo_optimized_text")
+            if content:
+                fields["content"] = content
+            operations.append(UpdateOne({"_id": document["_id"]}, {"$set": fields}))
+            if len(operations) >= batch_size:
+                updated += self.recipes_collection.bulk_write(operations, ordered=False).modified_count
+                operations = []
+        if operations:
+            updated += self.recipes_collection.bulk_write(operations, ordered=False).modified_count
+        console.print(f"[bold green]Backfilled history fields on {updated} documents.[/bold green]")
+        return updated
+
+    def migrate_schema(self, batch_size=200, dry_run=False):
+        """
+        Convert v1 generation documents to the compact v2 schema in _id order.
+
+        Each batch first upserts source recipes and compressed transcripts, then rewrites
+        the generation documents, so an interrupted migration can simply be run again.
+
+        Returns:
+            dict: Documents migrated and BSON bytes before and after (recipes counted once).
+        """
+        stats = {"documents": 0, "bytes_before": 0, "bytes_after": 0, "recipes": 0}
+        seen_recipes = set()
+        last_id = None
+        legacy = {"schema_version": {"$exists": False}}
+        while True:
+            query = dict(legacy, _id={"$gt": last_id}) if last_id else legacy
+            batch = list(self.recipes_collection.find(query).sort("_id", ASCENDING).limit(batch_size))
+            if not batch:
+                break
+            last_id = batch[-1]["_id"]
+            side_operations = {"source_recipes": [], "raw_outputs": []}
+            generation_operations = []
+            for document in batch:
+                migrated, recipes, transcript = split_legacy_document(document)
+                raw = raw_output_document(document["_id"], transcript)
+                side_operations["raw_outputs"].append(ReplaceOne({"_id": document["_id"]}, raw, upsert=True))
+                stats["bytes_before"] += len(bson.encode(document))
+                stats["bytes_after"] += len(bson.encode(migrated)) + len(bson.encode(raw))
+                for recipe in recipes:
+                    key = recipe_key(recipe)
+                    side_operations["source_recipes"].append(source_recipe_upsert(key, recipe))
+                    if key not in seen_recipes:
+                        seen_recipes.add(key)
+                        stats["bytes_after"] += len(bson.encode(dict(recipe, _id=key)))
+                generation_operations.append(ReplaceOne({"_id": document["_id"]}, migrated))
+            stats["documents"] += len(batch)
+            if dry_run:
+                continue
+            for name, operations in side_operations.items():
+                if operations:
+                    self.db[name].bulk_write(operations, ordered=False)
+            self.recipes_collection.bulk_write(generation_operations, ordered=False)
+            console.log(f"[bold green]Migrated {stats['documents']} documents to schema v2.[/bold green]")
+        stats["recipes"] = len(seen_recipes)
+        return stats
+
+    def create_job(self, job_id, keywords, source=None, model=None, prompt_version=None):
+        """
+        Create a job manifest and a pending entry per keyword.
+
+        Keywords are keyed by (job_id, normalized keywords) and only inserted when missing,
+        so creating the same job again keeps the state of keywords already processed. Each
+        keyword reserves its generation id up front; the pipeline saves under that id, so
+        rerunning a keyword overwrites its earlier generation instead of duplicating it.
+
+        Returns:
+            int: Keywords newly added to the job.
+        """
+        now = datetime.utcnow()
+        operations = []
+        for position, kw in enumerate(keywords):
+            normalized = normalize_keywords(kw)
+            operations.append(UpdateOne(
+                {"_id": f"{job_id}:{normalized}"},
+                {"$setOnInsert": {
+                    "job_id": job_id,
+                    "keywords": kw,
+                    "keywords_normalized": normalized,
+                    "position": position,
+                    "state": "pending",
+                    "attempts": 0,
+                    "generation_id": ObjectId(),
+                    "error": None,
+                    "updated_at": now,
+                }},
+                upsert=True
+            ))
+        added = 0
+        for start in range(0, len(operations), 1000):
+            added += self.job_keywords_collection.bulk_write(operations[start:start + 1000], ordered=False).upserted_count
+        self.jobs_collection.update_one(
+            {"_id": job_id},
+            {
+                "$setOnInsert": {"created_at": now, "source": source, "model": model, "prompt_version": prompt_version},
+                "$set": {"status": "running", "updated_at": now},
+                "$inc": {"total": added},
+            },
+            upsert=True
+        )
+        return added
+
+    def job_keywords(self, job_id, states=None):
+        query = {"job_id": job_id}
+        if states:
+            query["state"] = {"$in": list(states)}
+        return list(self.job_keywords_collection.find(query).sort("position", ASCENDING))
+
+    def update_job_keyword(self, job_id, keywords, state, error=None, worker=None, attempts=None):
+        """
+        Record a job keyword's state.
+
+        With `worker` and `attempts` from a claim, the update only applies while that claim
+        still holds; once the lease expires and another worker takes the keyword over, the
+        late result of the first worker is dropped.
+
+        Returns:
+            bool: Whether the keyword was updated.
+        """
+        # Synchronous on purpose: job state has to survive the crash it exists to recover from
+        now = datetime.utcnow()
+        update = {"$set": {"state": state, "error": error, "updated_at": now}}
+        if state == "running":
+            update["$set"]["claimed_at"] = now
+            update["$inc"] = {"attempts": 1}
+        query = {"_id": f"{job_id}:{normalize_keywords(keywords)}"}
+        if worker is not None:
+            query.update(worker=worker, attempts=attempts)
+        return self.job_keywords_collection.update_one(query, update).matched_count > 0
+
+    def claim_job_keyword(self, job_id, worker, max_attempts, lease_seconds):
+        """
+        Atomically take the next keyword of a job that needs a run and mark it running.
+
+        Pending keywords come first in position order, along with failed ones under
+        `max_attempts` and running ones whose claim is older than `lease_seconds` (their
+        worker died). find_one_and_update makes each claim atomic, so any number of
+        worker processes, on any number of machines, can share one job.
+
+        Returns:
+            Optional[dict]: The claimed job keyword, or None when nothing is left to claim.
+        """
+        now = datetime.utcnow()
+        return self.job_keywords_collection.find_one_and_update(
+            {
+                "job_id": job_id,
+                "$or": [
+                    {"state": "pending"},
+                    {"state": "failed", "attempts": {"$lt": max_attempts}},
+                    {"state": "running", "claimed_at": {"$lt": now - timedelta(seconds=lease_seconds)}},
+                ],
+            },
+            {
+                "$set": {"state": "running", "worker": worker, "claimed_at": now, "error": None, "updated_at": now},
+                "$inc": {"attempts": 1},
+            },
+            sort=[("position", ASCENDING)],
+            return_document=ReturnDocument.AFTER
+        )
+
+    def existing_generations(self, generation_ids):
+        found = self.recipes_collection.find({"_id": {"$in": list(generation_ids)}}, {"_id": 1})
+        return {document["_id"] for document in found}
+
+    def finish_job(self, job_id, status):
+        self.jobs_collection.update_one({"_id": job_id}, {"$set": {"status": status, "updated_at": datetime.utcnow()}})
+
+    def get_job(self, job_id):
+        job = self.jobs_collection.find_one({"_id": job_id})
+        if job:
+            counts = self.job_keywords_collection.aggregate([
+                {"$match": {"job_id": job_id}},
+                {"$group": {"_id": "$state", "count": {"$sum": 1}}},
+            ])
+            job["states"] = {row["_id"]: row["count"] for row in counts}
+        return job
+
+    def list_jobs(self, limit=20):
+        return list(self.jobs_collection.find().sort("created_at", DESCENDING).limit(limit))
+
     def close(self):
-        self.client.close()
-        console.print("[bold blue]MongoDB connection closed[/bold blue]")
\ No newline at end of file
+        with self._lock:
+            if self._closed:
+                return
+            self._closed = True
+        self._wakeup.set()
+        if self._writer is not threading.current_thread():
+            self._writer.join(timeout=self.flush_interval + 5)
+        try:
+            self.flush()
+        finally:
+            console.print(
+                f"[bold blue]Wrote {self.documents_written} documents in {self.write_round_trips} round-trips[/bold blue]"
+            )
+            self.client.close()
+            console.print("[bold blue]MongoDB connection closed[/bold blue]")
+
+
+def decode_cursor(cursor):
+    created_at, last_id = split_cursor(cursor)
+    return created_at, ObjectId(last_id)
+
+
+def source_recipe_upsert(key, recipe):
+    # Keep the page's latest version of the recipe, but when it was first seen
+    return UpdateOne(
+        {"_id": key},
+        {"$set": dict(recipe), "$setOnInsert": {"first_seen_at": datetime.utcnow()}},
+        upsert=True
+    )
+
+
+def raw_output_document(generation_id, transcript):
+    codec, size, compressed = encode_transcript(transcript)
+    return {"_id": generation_id, "codec": codec, "size": size, "data": compressed}
+
+
+def legacy_task_result(document, marker):
+    """Return the last structured task result in a v1 document that has the `marker` key."""
+    return next(
+        (task.get("result") for task in reversed(document.get("tasks_output") or [])
+         if isinstance(task.get("result"), dict) and marker in task["result"]),
+        None
+    )
+
+
+def split_legacy_document(document):
+    """
+    Split a v1 generation document into its v2 parts.
+
+    Returns:
+        (generation, recipes, transcript): the compact generation document, the source
+        recipe dicts and the transcript to compress. Structured task results are dropped
+        from the transcript because they live on in `content` and source_recipes.
+    """
+    generation = {
+        key: value for key, value in document.items()
+        if key not in ("raw_output", "tasks_output")
+    }
+    generation["schema_version"] = STORAGE_SCHEMA_VERSION
+    generation.setdefault("keywords_normalized", normalize_keywords(document.get("keywords", "")))
+    generation.setdefault("created_at", document["_id"].generation_time.replace(tzinfo=None))
+    if not generation.get("content"):
+        generation["content"] = legacy_task_result(document, "seo_optimized_text")
+
+    search = legacy_task_result(document, "recipes") or {}
+    recipes = list({
+        recipe_key(recipe): recipe for recipe in search.get("recipes", []) if isinstance(recipe, dict)
+    }.values())
+    generation["recipe_ids"] = [recipe_key(recipe) for recipe in recipes]
+
+    transcript = {
+        "raw_output": document.get("raw_output", ""),
+        "tasks": [
+            {
+                "description": task.get("description", ""),
+                "agent": task.get("agent", ""),
+                "raw": task.get("result") if isinstance(task.get("result"), str) else "",
+            }
+            for task in document.get("tasks_output") or []
+        ],
+    }
+    return generation, recipes, transcript
@@ -0,0 +1,384 @@
+# Resilient LLM access: rate limiting, retries, circuit breaking and model fallback
+
+import asyncio
+import logging
+import random
+import re
+import threading
+import time
+from typing import Any, Awaitable, Callable, Dict, List, Mapping, Optional, TypeVar
+
+from config.settings import (
+    GROQ_API_KEY, GROQ_API_BASE, GROQ_MODEL_NAME, GROQ_FALLBACK_MODELS, LLM_MAX_ATTEMPTS,
+    LLM_BACKOFF_BASE, LLM_BACKOFF_MAX, LLM_BREAKER_THRESHOLD, LLM_BREAKER_COOLDOWN,
+    LLM_REQUESTS_PER_MINUTE, LLM_TOKENS_PER_MINUTE, LLM_TOKENS_PER_CALL
+)
+from utils.metrics import current_recorder, metrics
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
+
+# HTTP statuses worth retrying: timeouts, conflicts, rate limits and server errors
+RETRYABLE_STATUS = {408, 409, 429, 500, 502, 503, 504}
+RETRYABLE_NAMES = ("RateLimit", "Timeout", "APIConnection", "ServiceUnavailable", "InternalServer")
+
+metrics.describe("llm_calls_total", "LLM calls through the resilient client, by model, outcome and retry scope")
+metrics.describe("llm_limiter_wait_seconds", "Time spent waiting for rate-limit budget")
+
+
+class CircuitOpen(Exception):
+    """Raised when every model's circuit breaker is open."""
+
+
+def parse_duration(value: str) -> Optional[float]:
+    """Parse provider reset durations such as '7.66s', '2m59.56s', '120ms' or '1h2m'."""
+    if value is None:
+        return None
+    value = str(value).strip()
+    try:
+        return float(value)
+    except ValueError:
+        pass
+    total = 0.0
+    matched = False
+    for amount, unit in re.findall(r"([\d.]+)(ms|h|m|s)", value):
+        matched = True
+        total += float(amount) * {"ms": 0.001, "s": 1, "m": 60, "h": 3600}[unit]
+    return total if matched else None
+
+
+def response_headers(obj: Any) -> Dict[str, str]:
+    """Collect HTTP headers from a litellm response or exception, lower-cased and unprefixed."""
+    hidden = getattr(obj, "_hidden_params", None) or {}
+    response = getattr(obj, "response", None)
+    candidates = (
+        hidden.get("additional_headers"),
+        getattr(obj, "litellm_response_headers", None),
+        getattr(obj, "headers", None),
+        getattr(response, "headers", None),
+    )
+    headers: Mapping = next((c for c in candidates if c), {})
+    return {str(name).lower().replace("llm_provider-", ""): value for name, value in dict(headers).items()}
+
+
+def is_retryable(error: BaseException) -> bool:
+    while error is not None:
+        status = getattr(error, "status_code", None)
+        if status in RETRYABLE_STATUS:
+            return True
+        if any(name in type(error).__name__ for name in RETRYABLE_NAMES):
+            return True
+        error = error.__cause__ or error.__context__
+    return False
+
+
+def is_rate_limited(error: BaseException) -> bool:
+    return getattr(error, "status_code", None) == 429 or "RateLimit" in type(error).__name__
+
+
+class TokenBucket:
+    """
+    Token bucket refilled continuously at `rate` per second up to `capacity`.
+
+    `reserve` always succeeds and returns how long the caller must wait before using
+    what it reserved, so callers queue up fairly instead of polling. `sync` replaces
+    the local estimate with what the provider reports in its rate-limit headers.
+    """
+
+    def __init__(self, capacity: float, rate: float):
+        self.capacity = capacity
+        self.rate = rate
+        self._tokens = capacity
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def _refill(self, now: float) -> None:
+        self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+        self._updated = now
+
+    def reserve(self, amount: float) -> float:
+        with self._lock:
+            now = time.monotonic()
+            self._refill(now)
+            self._tokens -= min(amount, self.capacity)
+            return 0.0 if self._tokens >= 0 else -self._tokens / self.rate
+
+    def sync(self, limit: Optional[float], remaining: Optional[float], reset: Optional[float]) -> None:
+        with self._lock:
+            self._refill(time.monotonic())
+            if limit:
+                self.capacity = limit
+            if remaining is not None:
+                # Never trust the local estimate over the provider; refill raises it again
+                self._tokens = min(self._tokens, remaining)
+                if reset and limit and remaining < limit:
+                    # The provider restores (limit - remaining) within `reset` seconds
+                    self.rate = (limit - remaining) / reset
+
+    def drain_until(self, seconds: float) -> None:
+        """Treat the bucket as empty for `seconds`, e.g. after a 429 with Retry-After."""
+        with self._lock:
+            self._refill(time.monotonic())
+            self._tokens = min(self._tokens, -seconds * self.rate)
+
+
+class CircuitBreaker:
+    """
+    Closed -> open after `threshold` consecutive failures; after `cooldown` seconds one
+    trial call is let through (half-open) and its outcome closes or re-opens the circuit.
+    A trial that ends without a verdict (`release`), or never reports back within another
+    `cooldown`, makes way for a new trial.
+    """
+
+    def __init__(self, threshold: int, cooldown: float):
+        self.threshold = threshold
+        self.cooldown = cooldown
+        self.failures = 0
+        self.state = "closed"
+        self._opened_at = 0.0
+        self._lock = threading.Lock()
+
+    def allow(self) -> bool:
+        with self._lock:
+            if self.state == "closed":
+                return True
+            now = time.monotonic()
+            if self.state in ("open", "half_open") and now - self._opened_at >= self.cooldown:
+                # A half-open trial that never reported back (e.g. a cancelled task) is given up on
+                self.state = "half_open"
+                self._opened_at = now
+                return True
+            return False
+
+    def release(self) -> None:
+        """End a half-open trial whose outcome says nothing about the model's health."""
+        with self._lock:
+            if self.state == "half_open":
+                self.state = "open"
+                self._opened_at -= self.cooldown
+
+    def record_success(self) -> None:
+        with self._lock:
+            self.failures = 0
+            self.state = "closed"
+
+    def record_failure(self) -> None:
+        with self._lock:
+            self.failures += 1
+            if self.state == "half_open" or self.failures >= self.threshold:
+                self.state = "open"
+                self._opened_at = time.monotonic()
+
+
+class LLMClient:
+    """
+    Shared entry point for LLM work: a request and token bucket driven by the provider's
+    x-ratelimit-* headers, retries with full-jitter exponential backoff, a circuit breaker
+    per model and an ordered list of fallback models.
+
+    Direct completions go through `completion`/`acompletion`. Other work that calls the
+    model, such as a crew kickoff, goes through `call`/`acall` with a function of the model
+    name to use. Point GROQ_API_BASE at a local server to exercise all of it offline.
+    """
+
+    def __init__(self, models: Optional[List[str]] = None, api_key: Optional[str] = GROQ_API_KEY,
+                 api_base: Optional[str] = GROQ_API_BASE, max_attempts: int = LLM_MAX_ATTEMPTS,
+                 backoff_base: float = LLM_BACKOFF_BASE, backoff_max: float = LLM_BACKOFF_MAX,
+                 breaker_threshold: int = LLM_BREAKER_THRESHOLD, breaker_cooldown: float = LLM_BREAKER_COOLDOWN,
+                 requests_per_minute: float = LLM_REQUESTS_PER_MINUTE,
+                 tokens_per_minute: float = LLM_TOKENS_PER_MINUTE):
+        self.models = models or [GROQ_MODEL_NAME] + [m for m in GROQ_FALLBACK_MODELS if m != GROQ_MODEL_NAME]
+        self.api_key = api_key
+        self.api_base = api_base
+        self.max_attempts = max_attempts
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self.requests = TokenBucket(requests_per_minute, requests_per_minute / 60)
+        self.tokens = TokenBucket(tokens_per_minute, tokens_per_minute / 60)
+        self.breaker_threshold = breaker_threshold
+        self.breaker_cooldown = breaker_cooldown
+        self.breakers = {model: CircuitBreaker(breaker_threshold, breaker_cooldown) for model in self.models}
+        # Every litellm call in the process, including the crew's, reports its headers here.
+        # litellm is imported here rather than at module level: it takes seconds to import
+        import litellm
+        if self._on_success not in litellm.success_callback:
+            litellm.success_callback.append(self._on_success)
+
+    def close(self) -> None:
+        import litellm
+        if self._on_success in litellm.success_callback:
+            litellm.success_callback.remove(self._on_success)
+
+    def _on_success(self, kwargs, response, start_time, end_time) -> None:
+        self.update_limits(response_headers(response))
+
+    def update_limits(self, headers: Mapping[str, str]) -> None:
+        def number(name):
+            try:
+                return float(headers[name]) if name in headers else None
+            except ValueError:
+                return None
+
+        for kind, bucket in (("requests", self.requests), ("tokens", self.tokens)):
+            bucket.sync(
+                number(f"x-ratelimit-limit-{kind}"),
+                number(f"x-ratelimit-remaining-{kind}"),
+                parse_duration(headers.get(f"x-ratelimit-reset-{kind}"))
+            )
+
+    def _reserve(self, calls: int, tokens: int) -> float:
+        return max(self.requests.reserve(calls), self.tokens.reserve(tokens))
+
+    def _backoff(self, attempt: int, error: BaseException) -> float:
+        retry_after = parse_duration(response_headers(error).get("retry-after"))
+        if retry_after is not None:
+            # Nobody gets budget back before the provider says so
+            self.requests.drain_until(retry_after)
+            return retry_after + random.uniform(0, self.backoff_base)
+        return random.uniform(0, min(self.backoff_max, self.backoff_base * 2 ** attempt))
+
+    def _models(self, models: Optional[List[str]]) -> List[str]:
+        models = models or self.models
+        for model in models:
+            if model not in self.breakers:
+                self.breakers[model] = CircuitBreaker(self.breaker_threshold, self.breaker_cooldown)
+        return models
+
+    def _failed(self, model: str, attempt: int, error: Exception, stage: str, scope: str) -> Optional[float]:
+        """
+        Record a failed attempt. Returns the delay before retrying `model`, or None to move
+        on to the next model. Errors that are not worth retrying are re-raised.
+        """
+        breaker = self.breakers[model]
+        if not is_retryable(error):
+            # The error is about the request, not the model; let the next call be the trial
+            breaker.release()
+            raise error
+        headers = response_headers(error)
+        self.update_limits(headers)
+        # A 429 means we are over quota, not that the model is down
+        if not is_rate_limited(error):
+            breaker.record_failure()
+        if breaker.state == "open" or attempt == self.max_attempts - 1:
+            # A trial that ran out of attempts on 429s has not shown the model is down either
+            breaker.release()
+            metrics.inc("llm_calls_total", model=model, outcome="failed", scope=scope)
+            logger.warning(f"Giving up on {model} ({type(error).__name__}); trying the next fallback model")
+            return None
+        metrics.inc("llm_calls_total", model=model, outcome="retry", scope=scope)
+        recorder = current_recorder.get()
+        if recorder:
+            recorder.add_retry(stage, scope)
+        delay = self._backoff(attempt, error)
+        logger.warning(f"{model} call failed ({type(error).__name__}); retrying in {delay:.2f}s")
+        return delay
+
+    def _succeeded(self, model: str, scope: str) -> None:
+        self.breakers[model].record_success()
+        metrics.inc("llm_calls_total", model=model, outcome="ok", scope=scope)
+
+    def call(self, fn: Callable[[str], T], stage: str = "llm", models: Optional[List[str]] = None,
+             calls: int = 1, tokens: int = LLM_TOKENS_PER_CALL, with_model: bool = False,
+             scope: str = "request") -> T:
+        """
+        Run `fn(model)` with rate limiting, retries and fallback.
+
+        A retry runs all of `fn` again. For a crew kickoff or agent run that is every
+        request it makes, so callers pass scope="crew" and those retries are counted apart
+        from single-request ones.
+
+        Args:
+            fn (Callable[[str], T]): The work, given the model name to use.
+            stage (str): Stage name retries are recorded under.
+            models (Optional[List[str]]): Models to try in order; defaults to all configured.
+            calls (int): LLM requests `fn` makes, reserved from the request bucket.
+            tokens (int): Tokens each of those requests is expected to use.
+            with_model (bool): Return (result, model) so callers can record which model
+                actually served the request, which differs from the first one after a fallback.
+            scope (str): "request" when `fn` makes one LLM request, "crew" when it runs a
+                whole crew or agent; recorded with every retry.
+
+        Returns:
+            T: The result of the first successful call, or (result, model) with `with_model`.
+
+        Raises:
+            CircuitOpen: If every model's breaker is open.
+            Exception: The last error once every model has been tried.
+        """
+        last_error: Optional[BaseException] = None
+        for model in self._models(models):
+            if not self.breakers[model].allow():
+                continue
+            for attempt in range(self.max_attempts):
+                wait = self._reserve(calls, tokens * calls)
+                if wait:
+                    metrics.observe("llm_limiter_wait_seconds", wait)
+                    time.sleep(wait)
+                try:
+                    result = fn(model)
+                except Exception as e:
+                    last_error = e
+                    delay = self._failed(model, attempt, e, stage, scope)
+                    if delay is None:
+                        break
+                    time.sleep(delay)
+                    continue
+                self._succeeded(model, scope)
+                return (result, model) if with_model else result
+        raise last_error or CircuitOpen(f"Circuit open for every model: {', '.join(self._models(models))}")
+
+    async def acall(self, fn: Callable[[str], Awaitable[T]], stage: str = "llm", models: Optional[List[str]] = None,
+                    calls: int = 1, tokens: int = LLM_TOKENS_PER_CALL, with_model: bool = False,
+                    scope: str = "request") -> T:
+        """Asynchronous version of `call`; waits with asyncio.sleep so the loop keeps running."""
+        last_error: Optional[BaseException] = None
+        for model in self._models(models):
+            if not self.breakers[model].allow():
+                continue
+            for attempt in range(self.max_attempts):
+                wait = self._reserve(calls, tokens * calls)
+                if wait:
+                    metrics.observe("llm_limiter_wait_seconds", wait)
+                    await asyncio.sleep(wait)
+                try:
+                    result = await fn(model)
+                except Exception as e:
+                    last_error = e
+                    delay = self._failed(model, attempt, e, stage, scope)
+                    if delay is None:
+                        break
+                    await asyncio.sleep(delay)
+                    continue
+                self._succeeded(model, scope)
+                return (result, model) if with_model else result
+        raise last_error or CircuitOpen(f"Circuit open for every model: {', '.join(self._models(models))}")
+
+    def completion(self, messages: List[Dict[str, Any]], stage: str = "llm", with_model: bool = False,
+                   **kwargs) -> Any:
+        import litellm
+        return self.call(
+            lambda model: litellm.completion(model=model, messages=messages, api_key=self.api_key,
+                                             api_base=self.api_base, **kwargs),
+            stage=stage, with_model=with_model
+        )
+
+    async def acompletion(self, messages: List[Dict[str, Any]], stage: str = "llm", with_model: bool = False,
+                          **kwargs) -> Any:
+        """
+        Resilient `litellm.acompletion`. With stream=True, retries cover opening the stream.
+        """
+        import litellm
+        return await self.acall(
+            lambda model: litellm.acompletion(model=model, messages=messages, api_key=self.api_key,
+                                              api_base=self.api_base, **kwargs),
+            stage=stage, with_model=with_model
+        )
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "models": self.models,
+            "breakers": {model: breaker.state for model, breaker in self.breakers.items()},
+            "requests_per_second": round(self.requests.rate, 4),
+            "tokens_per_second": round(self.tokens.rate, 2),
+        }
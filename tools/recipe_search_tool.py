@@ -0,0 +1,250 @@
+# Recipe search tool: one Serper query, parallel page fetches, schema.org extraction
+
+import html
+import json
+import logging
+import re
+import time
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
+from typing import Any, Dict, Iterator, List, Optional, Type
+
+import requests
+from crewai.tools import BaseTool
+from pydantic import BaseModel, Field
+from requests.adapters import HTTPAdapter
+from config.settings import RECIPE_FETCH_CONCURRENCY, RECIPE_FETCH_TIMEOUT, SEARCH_MAX_RESULTS
+from models.task_outputs import Recipe, SearchOutput
+from utils.json_repair import extract_json
+from utils.metrics import metrics
+
+logger = logging.getLogger(__name__)
+
+SERPER_SEARCH_URL = "https://google.serper.dev/search"
+USER_AGENT = "Mozilla/5.0 (compatible; food-agent/1.0)"
+
+_LD_JSON_RE = re.compile(
+    r'<script[^>]+type\s*=\s*["\']application/ld\+json["\'][^>]*>(.*?)</script>',
+    re.IGNORECASE | re.DOTALL
+)
+_TAG_RE = re.compile(r"<[^>]+>")
+
+metrics.describe("recipe_fetch_seconds", "Wall time of recipe page fetches, by outcome")
+
+# One pooled session and fetch pool per process: keep-alive connections are reused
+# across keywords, and fetches for every keyword share the same bounded set of threads
+_session = requests.Session()
+_session.headers["User-Agent"] = USER_AGENT
+_adapter = HTTPAdapter(pool_connections=RECIPE_FETCH_CONCURRENCY, pool_maxsize=RECIPE_FETCH_CONCURRENCY)
+_session.mount("https://", _adapter)
+_session.mount("http://", _adapter)
+_fetch_pool = ThreadPoolExecutor(max_workers=RECIPE_FETCH_CONCURRENCY, thread_name_prefix="recipe-fetch")
+
+
+def _clean(text: Any) -> str:
+    return " ".join(html.unescape(_TAG_RE.sub(" ", str(text))).split())
+
+
+def _is_recipe(node: dict) -> bool:
+    node_type = node.get("@type")
+    if isinstance(node_type, list):
+        return "Recipe" in node_type
+    return node_type == "Recipe"
+
+
+def _recipe_nodes(data: Any) -> Iterator[dict]:
+    if isinstance(data, list):
+        for item in data:
+            yield from _recipe_nodes(item)
+    elif isinstance(data, dict):
+        if _is_recipe(data):
+            yield data
+            return
+        for key in ("@graph", "mainEntity", "mainEntityOfPage", "itemListElement"):
+            if key in data:
+                yield from _recipe_nodes(data[key])
+
+
+def _instructions(value: Any) -> List[str]:
+    if isinstance(value, str):
+        return [step for step in (_clean(line) for line in re.split(r"\n+|<br\s*/?>", value)) if step]
+    if isinstance(value, list):
+        return [step for item in value for step in _instructions(item)]
+    if isinstance(value, dict):
+        # HowToSection nests its HowToSteps under itemListElement
+        if "itemListElement" in value:
+            return _instructions(value["itemListElement"])
+        return _instructions(value.get("text") or value.get("name") or "")
+    return []
+
+
+def extract_recipes(page: str, url: str) -> List[Recipe]:
+    """
+    Extract schema.org Recipe objects from the JSON-LD blocks of an HTML page.
+
+    Args:
+        page (str): The page HTML.
+        url (str): The page URL, used as the recipe source.
+
+    Returns:
+        List[Recipe]: Recipes with both ingredients and instructions; empty if the page
+        has no usable structured data.
+    """
+    recipes = []
+    for block in _LD_JSON_RE.findall(page):
+        try:
+            data = json.loads(block)
+        except ValueError:
+            data = extract_json(block)
+        for node in _recipe_nodes(data):
+            ingredients = node.get("recipeIngredient") or node.get("ingredients") or []
+            if isinstance(ingredients, str):
+                ingredients = [ingredients]
+            recipe = Recipe(
+                title=_clean(node.get("name") or ""),
+                ingredients=[_clean(item) for item in ingredients if _clean(item)],
+                instructions=_instructions(node.get("recipeInstructions")),
+                source=url
+            )
+            if recipe.title and recipe.ingredients and recipe.instructions:
+                recipes.append(recipe)
+    return recipes
+
+
+class RecipeSearchInput(BaseModel):
+    search_query: str = Field(..., description="Keywords describing the recipes to find")
+
+
+class RecipeSearchTool(BaseTool):
+    """
+    Search the web for recipes with a single Serper query, then fetch the top result
+    pages in parallel and read their schema.org Recipe data.
+
+    No LLM call is involved in extraction; the tool returns SearchOutput JSON.
+    """
+
+    name: str = "Recipe Search"
+    description: str = (
+        "Search the internet for recipes matching a search_query. Returns JSON with a "
+        "'recipes' list, each with title, ingredients, instructions and source URL."
+    )
+    args_schema: Type[BaseModel] = RecipeSearchInput
+    api_key: Optional[str] = None
+    max_results: int = SEARCH_MAX_RESULTS
+    fetch_timeout: float = RECIPE_FETCH_TIMEOUT
+    search_url: str = SERPER_SEARCH_URL
+
+    def _run(self, search_query: str, **kwargs: Any) -> str:
+        return self.search(search_query).json()
+
+    def search(self, keywords: str) -> SearchOutput:
+        """
+        Find up to `max_results` recipes for the keywords.
+
+        Args:
+            keywords (str): The keywords to search for.
+
+        Returns:
+            SearchOutput: Recipes in search-rank order; empty if nothing could be extracted.
+        """
+        links = self.search_links(f"{keywords} recipe")
+        if not links:
+            return SearchOutput(recipes=[])
+
+        # Pages without structured data are common, so over-fetch and keep the best-ranked hits
+        started: Dict[int, float] = {}
+
+        def fetch(index: int) -> List[Recipe]:
+            started[index] = time.monotonic()
+            return self.fetch_recipes(links[index])
+
+        futures = [_fetch_pool.submit(fetch, index) for index in range(len(links))]
+        try:
+            self._wait_for_fetches(futures, started)
+        finally:
+            # Fetches still queued behind other keywords' are no longer needed
+            for future in futures:
+                future.cancel()
+
+        recipes = []
+        for future in futures:
+            if not future.done() or future.cancelled() or future.exception() is not None:
+                continue
+            for recipe in future.result():
+                if len(recipes) < self.max_results:
+                    recipes.append(recipe)
+        logger.info(f"Extracted {len(recipes)} recipes from {len(links)} pages for '{keywords}'")
+        return SearchOutput(recipes=recipes)
+
+    def _wait_for_fetches(self, futures: List[Future], started: Dict[int, float]) -> None:
+        """
+        Wait until the best-ranked pages have given `max_results` recipes, or every fetch
+        has finished or run out of time.
+
+        Each fetch gets `fetch_timeout` from when a pool thread picks it up, so time spent
+        queued behind other keywords' fetches in the shared pool does not count against it.
+        """
+        pending = set(range(len(futures)))
+        while pending and not self._have_best_results(futures):
+            now = time.monotonic()
+            pending = {index for index in pending
+                       if index not in started or now - started[index] < self.fetch_timeout}
+            if not pending:
+                return
+            deadlines = [started[index] + self.fetch_timeout for index in pending if index in started]
+            timeout = min(deadlines) - now if deadlines else self.fetch_timeout
+            wait([futures[index] for index in pending], timeout=timeout, return_when=FIRST_COMPLETED)
+            pending = {index for index in pending if not futures[index].done()}
+
+    def _have_best_results(self, futures: List[Future]) -> bool:
+        # True once the pages ranked above every unfinished fetch hold `max_results` recipes
+        found = 0
+        for future in futures:
+            if not future.done():
+                return False
+            if future.exception() is None:
+                found += len(future.result())
+            if found >= self.max_results:
+                return True
+        return False
+
+    def search_links(self, query: str) -> List[str]:
+        """Return the organic result links for `query`, best first."""
+        response = _session.post(
+            self.search_url,
+            headers={"X-API-KEY": self.api_key or "", "Content-Type": "application/json"},
+            json={"q": query, "num": self.max_results * 2},
+            timeout=self.fetch_timeout
+        )
+        response.raise_for_status()
+        links = []
+        for result in response.json().get("organic", []):
+            link = result.get("link")
+            if link and link not in links:
+                links.append(link)
+        return links[:self.max_results * 2]
+
+    def fetch_recipes(self, url: str) -> List[Recipe]:
+        """Fetch one page and extract its recipes; any failure yields no recipes."""
+        start = time.perf_counter()
+        try:
+            recipes = extract_recipes(self.fetch_page(url), url)
+        except Exception as e:
+            logger.warning(f"Failed to fetch recipe page {url}: {str(e)}")
+            metrics.observe("recipe_fetch_seconds", time.perf_counter() - start, outcome="error")
+            return []
+        outcome = "recipe" if recipes else "no_recipe"
+        metrics.observe("recipe_fetch_seconds", time.perf_counter() - start, outcome=outcome)
+        return recipes
+
+    def fetch_page(self, url: str) -> str:
+        # requests' timeout bounds each socket read, not the download, so a page that
+        # trickles in is cut off at `fetch_timeout` here
+        deadline = time.monotonic() + self.fetch_timeout
+        with _session.get(url, timeout=self.fetch_timeout, stream=True) as response:
+            response.raise_for_status()
+            chunks = []
+            for chunk in response.iter_content(chunk_size=65536):
+                if time.monotonic() > deadline:
+                    raise requests.Timeout(f"Fetching {url} took longer than {self.fetch_timeout}s")
+                chunks.append(chunk)
+            return b"".join(chunks).decode(response.encoding or "utf-8", errors="replace")
@@ -0,0 +1,224 @@
+# Result cache in front of Crew.kickoff
+
+import hashlib
+import json
+import logging
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional, Tuple
+
+from models.task_outputs import SearchOutput, ContentOutput
+from utils.keywords import normalize_keywords
+
+logger = logging.getLogger(__name__)
+
+# Each cache hit skips the search task and the content task
+LLM_CALLS_PER_RUN = 2
+
+# Hits whose last_access/hit_count updates are held before they are written in one transaction
+TOUCH_BATCH_SIZE = 100
+
+
+class CachedResult:
+    def __init__(self, keywords, search_output, content_output, raw, created_at):
+        self.keywords = keywords
+        self.search_output = search_output
+        self.content_output = content_output
+        self.raw = raw
+        self.created_at = created_at
+
+
+class ResultCache:
+    """
+    Two-tier cache of crew results keyed on normalized keywords, model name and prompt version.
+
+    An in-memory LRU sits in front of a SQLite table. Entries expire after `ttl` seconds and
+    the least recently used rows are evicted once the table holds more than `max_entries`.
+    Hits update `last_access` and `hit_count` in memory; the updates are written in one
+    transaction before an eviction, when `TOUCH_BATCH_SIZE` have built up, and on close.
+    """
+
+    def __init__(self, db_path, ttl, max_entries, memory_entries=256):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.memory_entries = memory_entries
+        self.hits = 0
+        self.memory_hits = 0
+        self.misses = 0
+        self._memory = OrderedDict()
+        # key -> (last access, hits not yet written)
+        self._touched: Dict[str, Tuple[float, int]] = {}
+        self._lock = threading.Lock()
+        # Worker processes share the cache file, so wait out another process's write transaction
+        self._conn = sqlite3.connect(db_path, check_same_thread=False, timeout=30)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("""
+            CREATE TABLE IF NOT EXISTS crew_results (
+                key TEXT PRIMARY KEY,
+                keywords TEXT,
+                model TEXT,
+                prompt_version TEXT,
+                search_output TEXT,
+                content_output TEXT,
+                raw TEXT,
+                created_at REAL,
+                last_access REAL,
+                hit_count INTEGER DEFAULT 0
+            )
+        """)
+        self._conn.execute("CREATE INDEX IF NOT EXISTS idx_crew_results_last_access ON crew_results (last_access)")
+        self._conn.commit()
+
+    @staticmethod
+    def make_key(keywords: str, model: str, prompt_version: str) -> str:
+        material = json.dumps([normalize_keywords(keywords), model, prompt_version])
+        return hashlib.sha256(material.encode("utf-8")).hexdigest()
+
+    def get(self, keywords: str, model: str, prompt_version: str) -> Optional[CachedResult]:
+        key = self.make_key(keywords, model, prompt_version)
+        now = time.time()
+        with self._lock:
+            entry = self._memory.get(key)
+            if entry is not None and now - entry.created_at < self.ttl:
+                self._memory.move_to_end(key)
+                self.hits += 1
+                self.memory_hits += 1
+                self._touch(key, now)
+                return entry
+            self._memory.pop(key, None)
+
+            row = self._conn.execute(
+                "SELECT keywords, search_output, content_output, raw, created_at FROM crew_results WHERE key = ?",
+                (key,)
+            ).fetchone()
+            if row is None or now - row[4] >= self.ttl:
+                if row is not None:
+                    self._conn.execute("DELETE FROM crew_results WHERE key = ?", (key,))
+                    self._conn.commit()
+                self.misses += 1
+                return None
+
+            try:
+                entry = CachedResult(
+                    row[0],
+                    SearchOutput(**json.loads(row[1])),
+                    ContentOutput(**json.loads(row[2])),
+                    row[3],
+                    row[4]
+                )
+            except Exception as e:
+                logger.warning(f"Discarding unreadable cache entry: {str(e)}")
+                self._conn.execute("DELETE FROM crew_results WHERE key = ?", (key,))
+                self._conn.commit()
+                self.misses += 1
+                return None
+
+            self._touch(key, now)
+            self._remember(key, entry)
+            self.hits += 1
+            return entry
+
+    def put(self, keywords: str, model: str, prompt_version: str,
+            search_output: SearchOutput, content_output: ContentOutput, raw: str) -> None:
+        key = self.make_key(keywords, model, prompt_version)
+        now = time.time()
+        with self._lock:
+            # Replacing the row resets its hit count, and eviction needs current access times
+            self._touched.pop(key, None)
+            self._write_touches()
+            self._conn.execute(
+                """
+                INSERT OR REPLACE INTO crew_results
+                    (key, keywords, model, prompt_version, search_output, content_output, raw,
+                     created_at, last_access, hit_count)
+                VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, 0)
+                """,
+                (key, keywords, model, prompt_version, json.dumps(search_output.dict()),
+                 json.dumps(content_output.dict()), raw, now, now)
+            )
+            self._evict(now)
+            self._conn.commit()
+            self._remember(key, CachedResult(keywords, search_output, content_output, raw, now))
+
+    def entries(self, model: str, prompt_version: str) -> List[Tuple[str, str]]:
+        """
+        Return (keywords, content title) for every unexpired entry of a model and prompt version.
+        """
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT keywords, content_output FROM crew_results "
+                "WHERE model = ? AND prompt_version = ? AND created_at > ?",
+                (model, prompt_version, time.time() - self.ttl)
+            ).fetchall()
+        entries = []
+        for keywords, content_output in rows:
+            try:
+                entries.append((keywords, json.loads(content_output).get("title", "")))
+            except ValueError:
+                continue
+        return entries
+
+    def _touch(self, key, now):
+        _, hits = self._touched.get(key, (now, 0))
+        self._touched[key] = (now, hits + 1)
+        if len(self._touched) >= TOUCH_BATCH_SIZE:
+            self._write_touches()
+            self._conn.commit()
+
+    def _write_touches(self):
+        # Runs inside the caller's transaction
+        if not self._touched:
+            return
+        self._conn.executemany(
+            "UPDATE crew_results SET last_access = ?, hit_count = hit_count + ? WHERE key = ?",
+            [(last_access, hits, key) for key, (last_access, hits) in self._touched.items()]
+        )
+        self._touched.clear()
+
+    def _remember(self, key, entry):
+        self._memory[key] = entry
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.memory_entries:
+            self._memory.popitem(last=False)
+
+    def _evict(self, now):
+        self._conn.execute("DELETE FROM crew_results WHERE created_at <= ?", (now - self.ttl,))
+        self._conn.execute(
+            """
+            DELETE FROM crew_results WHERE key IN (
+                SELECT key FROM crew_results ORDER BY last_access DESC LIMIT -1 OFFSET ?
+            )
+            """,
+            (self.max_entries,)
+        )
+
+    def stats(self) -> Dict[str, Any]:
+        """
+        Return session hit/miss counters plus lifetime figures from the persistent tier.
+        """
+        with self._lock:
+            self._write_touches()
+            self._conn.commit()
+            entries, lifetime_hits = self._conn.execute(
+                "SELECT COUNT(*), COALESCE(SUM(hit_count), 0) FROM crew_results"
+            ).fetchone()
+            lookups = self.hits + self.misses
+            return {
+                "hits": self.hits,
+                "memory_hits": self.memory_hits,
+                "misses": self.misses,
+                "hit_rate": self.hits / lookups if lookups else 0.0,
+                "llm_calls_saved": self.hits * LLM_CALLS_PER_RUN,
+                "entries": entries,
+                "memory_entries": len(self._memory),
+                "lifetime_hits": lifetime_hits,
+                "lifetime_llm_calls_saved": lifetime_hits * LLM_CALLS_PER_RUN,
+            }
+
+    def close(self):
+        with self._lock:
+            self._write_touches()
+            self._conn.commit()
+            self._conn.close()
@@ -0,0 +1,112 @@
+# Search-result cache keyed on canonical keywords
+
+import json
+import logging
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Optional
+
+from models.task_outputs import SearchOutput
+from utils.keywords import canonical_keywords
+
+logger = logging.getLogger(__name__)
+
+
+class SearchCache:
+    """
+    Cache of parsed search results shared by near-duplicate keywords.
+
+    Keys are `canonical_keywords(keywords)`, so word order, case, stopwords and plurals
+    do not cause a new search. Parsed `SearchOutput` recipes are kept in a small
+    in-memory LRU backed by a SQLite table and expire after `ttl` seconds.
+    """
+
+    def __init__(self, db_path, ttl, memory_entries=512):
+        self.ttl = ttl
+        self.memory_entries = memory_entries
+        self.hits = 0
+        self.misses = 0
+        self._memory = OrderedDict()
+        self._lock = threading.Lock()
+        # Worker processes share the cache file, so wait out another process's write transaction
+        self._conn = sqlite3.connect(db_path, check_same_thread=False, timeout=30)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("""
+            CREATE TABLE IF NOT EXISTS search_results (
+                key TEXT PRIMARY KEY,
+                keywords TEXT,
+                recipes TEXT,
+                created_at REAL
+            )
+        """)
+        self._conn.commit()
+
+    def get(self, keywords: str) -> Optional[SearchOutput]:
+        key = canonical_keywords(keywords)
+        now = time.time()
+        with self._lock:
+            entry = self._memory.get(key)
+            if entry is not None and now - entry[1] < self.ttl:
+                self._memory.move_to_end(key)
+                self.hits += 1
+                return entry[0]
+            self._memory.pop(key, None)
+
+            row = self._conn.execute(
+                "SELECT recipes, created_at FROM search_results WHERE key = ?", (key,)
+            ).fetchone()
+            if row is None or now - row[1] >= self.ttl:
+                self.misses += 1
+                return None
+
+            try:
+                search_output = SearchOutput(recipes=json.loads(row[0]))
+            except Exception as e:
+                logger.warning(f"Discarding unreadable search cache entry: {str(e)}")
+                self._conn.execute("DELETE FROM search_results WHERE key = ?", (key,))
+                self._conn.commit()
+                self.misses += 1
+                return None
+
+            self._remember(key, search_output, row[1])
+            self.hits += 1
+            return search_output
+
+    def put(self, keywords: str, search_output: SearchOutput) -> None:
+        # An empty result usually means the search or parse failed; let the next request retry
+        if not search_output.recipes:
+            return
+        key = canonical_keywords(keywords)
+        now = time.time()
+        recipes = json.dumps([recipe.dict() for recipe in search_output.recipes])
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO search_results (key, keywords, recipes, created_at) VALUES (?, ?, ?, ?)",
+                (key, keywords, recipes, now)
+            )
+            self._conn.execute("DELETE FROM search_results WHERE created_at <= ?", (now - self.ttl,))
+            self._conn.commit()
+            self._remember(key, search_output, now)
+
+    def _remember(self, key, search_output, created_at):
+        self._memory[key] = (search_output, created_at)
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.memory_entries:
+            self._memory.popitem(last=False)
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            entries = self._conn.execute("SELECT COUNT(*) FROM search_results").fetchone()[0]
+            lookups = self.hits + self.misses
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": self.hits / lookups if lookups else 0.0,
+                "entries": entries,
+            }
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
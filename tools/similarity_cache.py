@@ -0,0 +1,227 @@
+# Similarity lookup over previously generated articles, for keywords that miss the exact-match caches
+
+import math
+import threading
+import zlib
+from collections import Counter
+from dataclasses import dataclass
+from typing import Dict, Iterable, List, Optional, Tuple
+
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+from utils.keywords import STOPWORDS, keyword_terms, normalize_keywords
+from utils.metrics import metrics
+
+# Praise and effort words that rarely change which article a reader wants
+FILLER_WORDS = frozenset({
+    "easy", "simple", "quick", "best", "classic", "perfect", "ultimate", "delicious",
+    "favorite", "favourite", "great", "tasty", "amazing", "good", "really", "super", "style",
+})
+SIMILARITY_STOPWORDS = STOPWORDS | FILLER_WORDS
+
+# Weight of a whole term and of each of its character trigrams; trigrams let
+# "chickpea" partly match "chickpeas" or a misspelling
+TERM_WEIGHT = 1.0
+TRIGRAM_WEIGHT = 0.3
+
+metrics.describe("similarity_lookups_total", "Similarity cache lookups, by outcome (serve, draft, miss)")
+
+
+def text_features(text: str) -> Dict[str, float]:
+    """Return the weighted term and character-trigram features of a short text."""
+    features: Dict[str, float] = Counter()
+    for term in keyword_terms(text, SIMILARITY_STOPWORDS):
+        features["w:" + term] += TERM_WEIGHT
+        padded = f"^{term}$"
+        for i in range(len(padded) - 2):
+            features["c:" + padded[i:i + 3]] += TRIGRAM_WEIGHT
+    return features
+
+
+def _bucket(feature: str, dimensions: int) -> Tuple[int, float]:
+    # crc32 is stable across processes, unlike hash(); the sign bit keeps collisions unbiased
+    digest = zlib.crc32(feature.encode("utf-8"))
+    return digest % dimensions, 1.0 if digest & 0x80000000 else -1.0
+
+
+@dataclass
+class SimilarMatch:
+    keywords: str
+    score: float
+
+
+class SimilarityIndex:
+    """
+    Nearest-neighbour index of short texts using hashed TF-IDF vectors.
+
+    Each entry is a key (normalized keywords) and the text describing it (keywords plus
+    article title). Features are hashed into `dimensions` buckets, weighted by inverse
+    document frequency and L2-normalized, so a dot product is the cosine similarity.
+    With NumPy the vectors live in one matrix and a lookup is a single matrix-vector
+    product; without it, sparse vectors are compared in pure Python.
+
+    IDF weights are fixed when vectors are built and refreshed whenever the index has
+    doubled in size since the last rebuild.
+    """
+
+    def __init__(self, dimensions: int = 1024):
+        self.dimensions = dimensions
+        self._lock = threading.Lock()
+        self._keys: List[str] = []
+        self._positions: Dict[str, int] = {}
+        self._features: List[Dict[str, float]] = []
+        self._document_frequency: Counter = Counter()
+        self._vectors: List[Dict[int, float]] = []
+        self._matrix = None
+        self._built_size = 0
+
+    def __len__(self) -> int:
+        return len(self._keys)
+
+    def _idf(self, feature: str) -> float:
+        return math.log((1 + len(self._keys)) / (1 + self._document_frequency[feature])) + 1.0
+
+    def _vectorize(self, features: Dict[str, float]) -> Dict[int, float]:
+        vector: Dict[int, float] = {}
+        for feature, weight in features.items():
+            bucket, sign = _bucket(feature, self.dimensions)
+            vector[bucket] = vector.get(bucket, 0.0) + sign * weight * self._idf(feature)
+        norm = math.sqrt(sum(value * value for value in vector.values()))
+        return {bucket: value / norm for bucket, value in vector.items()} if norm else {}
+
+    def _dense(self, vector: Dict[int, float]):
+        row = numpy.zeros(self.dimensions, dtype=numpy.float32)
+        if vector:
+            row[list(vector)] = list(vector.values())
+        return row
+
+    def _rebuild(self) -> None:
+        self._vectors = [self._vectorize(features) for features in self._features]
+        if numpy is not None:
+            self._matrix = numpy.zeros((max(16, len(self._vectors) * 2), self.dimensions), dtype=numpy.float32)
+            for position, vector in enumerate(self._vectors):
+                self._matrix[position] = self._dense(vector)
+        self._built_size = len(self._keys)
+
+    def add(self, key: str, text: str) -> None:
+        features = text_features(text)
+        with self._lock:
+            if key in self._positions:
+                position = self._positions[key]
+                self._document_frequency.subtract(self._features[position].keys())
+                self._features[position] = features
+            else:
+                position = len(self._keys)
+                self._positions[key] = position
+                self._keys.append(key)
+                self._features.append(features)
+                self._vectors.append({})
+            self._document_frequency.update(features.keys())
+
+            if len(self._keys) >= 2 * max(1, self._built_size):
+                self._rebuild()
+                return
+            self._vectors[position] = self._vectorize(features)
+            if numpy is not None:
+                if self._matrix is None or position >= len(self._matrix):
+                    grown = numpy.zeros((max(16, len(self._keys) * 2), self.dimensions), dtype=numpy.float32)
+                    if self._matrix is not None:
+                        grown[:len(self._matrix)] = self._matrix
+                    self._matrix = grown
+                self._matrix[position] = self._dense(self._vectors[position])
+
+    def add_many(self, entries: Iterable[Tuple[str, str]]) -> None:
+        with self._lock:
+            for key, text in entries:
+                features = text_features(text)
+                if key in self._positions:
+                    continue
+                self._positions[key] = len(self._keys)
+                self._keys.append(key)
+                self._features.append(features)
+                self._document_frequency.update(features.keys())
+            self._rebuild()
+
+    def query(self, text: str, k: int = 1, exclude: Optional[str] = None) -> List[Tuple[float, str]]:
+        """Return up to `k` (cosine similarity, key) pairs, most similar first."""
+        with self._lock:
+            if not self._keys:
+                return []
+            vector = self._vectorize(text_features(text))
+            if not vector:
+                return []
+            if numpy is not None:
+                scores = self._matrix[:len(self._keys)] @ self._dense(vector)
+                count = min(len(scores), k + 1)
+                top = numpy.argpartition(-scores, count - 1)[:count]
+                ranked = sorted(((float(scores[i]), self._keys[i]) for i in top), reverse=True)
+            else:
+                ranked = sorted(
+                    ((sum(value * other.get(bucket, 0.0) for bucket, value in vector.items()), key)
+                     for key, other in zip(self._keys, self._vectors)),
+                    reverse=True
+                )
+        return [(score, key) for score, key in ranked if key != exclude][:k]
+
+
+class SimilarityCache:
+    """
+    Finds a previously generated article for keywords that are worded differently.
+
+    Entries are the keywords and article titles held by the result cache for the current
+    model and prompt version. A match at or above `serve_threshold` is close enough to
+    serve the stored article as is; one at or above `draft_threshold` is handed to the
+    content stage as a draft to revise against the new keywords' own search results.
+    """
+
+    def __init__(self, serve_threshold: float, draft_threshold: float, dimensions: int = 1024):
+        self.serve_threshold = serve_threshold
+        self.draft_threshold = draft_threshold
+        self.index = SimilarityIndex(dimensions)
+        self.served = 0
+        self.drafted = 0
+        self.misses = 0
+
+    def load(self, entries: Iterable[Tuple[str, str]]) -> None:
+        """Index (keywords, title) pairs, typically from ResultCache.entries()."""
+        self.index.add_many((normalize_keywords(keywords), f"{keywords} {title}") for keywords, title in entries)
+
+    def add(self, keywords: str, title: str) -> None:
+        self.index.add(normalize_keywords(keywords), f"{keywords} {title}")
+
+    def find(self, keywords: str) -> Tuple[str, Optional[SimilarMatch]]:
+        """
+        Look up the closest stored article for `keywords`, other than an exact match.
+
+        Returns:
+            (outcome, match): outcome is "serve", "draft" or "miss"; match is None on a miss.
+        """
+        matches = self.index.query(keywords, k=1, exclude=normalize_keywords(keywords))
+        outcome, match = "miss", None
+        if matches and matches[0][0] >= self.draft_threshold:
+            match = SimilarMatch(keywords=matches[0][1], score=matches[0][0])
+            outcome = "serve" if match.score >= self.serve_threshold else "draft"
+        if outcome == "serve":
+            self.served += 1
+        elif outcome == "draft":
+            self.drafted += 1
+        else:
+            self.misses += 1
+        metrics.inc("similarity_lookups_total", outcome=outcome)
+        return outcome, match
+
+    def stats(self):
+        lookups = self.served + self.drafted + self.misses
+        return {
+            "entries": len(self.index),
+            "served": self.served,
+            "drafted": self.drafted,
+            "misses": self.misses,
+            "hit_rate": (self.served + self.drafted) / lookups if lookups else 0.0,
+            "serve_threshold": self.serve_threshold,
+            "draft_threshold": self.draft_threshold,
+            "vectorized": numpy is not None,
+        }
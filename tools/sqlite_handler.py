@@ -0,0 +1,541 @@
+# SQLite storage backend: a local drop-in for the MongoDB DatabaseHandler
+
+import json
+import logging
+import sqlite3
+import threading
+import time
+import uuid
+from datetime import datetime, timedelta
+from config.settings import DB_WRITE_BATCH_SIZE, DB_WRITE_FLUSH_INTERVAL, DB_WRITE_MAX_ATTEMPTS, STORAGE_SCHEMA_VERSION
+from tools.storage import WriteBehindError, encode_cursor, encode_transcript, recipe_key, split_cursor
+from utils.compression import decompress
+from utils.keywords import normalize_keywords
+from utils.logging_setup import console
+from utils.metrics import metrics
+
+logger = logging.getLogger(__name__)
+
+# Fixed-width timestamps so text comparison matches time order
+TIMESTAMP_FORMAT = "%Y-%m-%dT%H:%M:%S.%f"
+
+# Table names are distinct from the legacy `recipes` table already in food_recipes.db
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS generations (
+    id TEXT PRIMARY KEY,
+    keywords TEXT,
+    keywords_normalized TEXT,
+    created_at TEXT,
+    model TEXT,
+    prompt_version TEXT,
+    schema_version INTEGER,
+    content TEXT,
+    recipe_ids TEXT,
+    token_usage TEXT,
+    metrics TEXT,
+    fingerprints TEXT
+);
+CREATE INDEX IF NOT EXISTS idx_generations_keywords_created_at
+    ON generations (keywords_normalized, created_at DESC, id DESC);
+CREATE INDEX IF NOT EXISTS idx_generations_created_at ON generations (created_at DESC, id DESC);
+CREATE TABLE IF NOT EXISTS source_recipes (
+    id TEXT PRIMARY KEY,
+    title TEXT,
+    ingredients TEXT,
+    instructions TEXT,
+    source TEXT,
+    first_seen_at TEXT
+);
+CREATE TABLE IF NOT EXISTS raw_outputs (
+    id TEXT PRIMARY KEY,
+    codec TEXT,
+    size INTEGER,
+    data BLOB
+);
+CREATE VIRTUAL TABLE IF NOT EXISTS generations_fts USING fts5(title, ingredients);
+CREATE TABLE IF NOT EXISTS jobs (
+    id TEXT PRIMARY KEY,
+    created_at TEXT,
+    updated_at TEXT,
+    source TEXT,
+    model TEXT,
+    prompt_version TEXT,
+    status TEXT,
+    total INTEGER DEFAULT 0
+);
+CREATE TABLE IF NOT EXISTS job_keywords (
+    job_id TEXT,
+    keywords_normalized TEXT,
+    keywords TEXT,
+    position INTEGER,
+    state TEXT,
+    attempts INTEGER DEFAULT 0,
+    generation_id TEXT,
+    error TEXT,
+    updated_at TEXT,
+    worker TEXT,
+    claimed_at TEXT,
+    PRIMARY KEY (job_id, keywords_normalized)
+);
+CREATE INDEX IF NOT EXISTS idx_job_keywords_position ON job_keywords (job_id, position);
+"""
+
+# Columns added to tables after their first release, added in place to older databases
+ADDED_COLUMNS = {
+    "job_keywords": (("worker", "TEXT"), ("claimed_at", "TEXT")),
+    "generations": (("fingerprints", "TEXT"),),
+}
+
+JOB_KEYWORD_COLUMNS = ("keywords", "keywords_normalized", "position", "state", "attempts", "generation_id", "error")
+
+GENERATION_COLUMNS = (
+    "id, keywords, keywords_normalized, created_at, model, prompt_version, schema_version, "
+    "content, recipe_ids, token_usage, metrics, fingerprints"
+)
+
+
+def _timestamp(value):
+    return value.strftime(TIMESTAMP_FORMAT)
+
+
+def _fts_query(text):
+    # Quote every word so user input cannot use FTS syntax; any word may match, like Mongo's $text
+    return " OR ".join('"' + word.replace('"', '""') + '"' for word in text.split())
+
+
+class SQLiteHandler:
+    """
+    Local storage with the same interface as DatabaseHandler.
+
+    Runs in WAL mode so history reads never wait on the writer. Generations are queued
+    and written by a background thread, one transaction per batch, and titles and
+    ingredients are indexed with FTS5 for `search_history(text=...)`.
+    """
+
+    def __init__(self, path, batch_size=DB_WRITE_BATCH_SIZE, flush_interval=DB_WRITE_FLUSH_INTERVAL,
+                 max_attempts=DB_WRITE_MAX_ATTEMPTS):
+        try:
+            self.path = path
+            # Worker processes share the file, so wait out another process's write transaction
+            self._conn = sqlite3.connect(path, check_same_thread=False, timeout=30)
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            # With WAL, NORMAL only risks the last transactions on power loss, never corruption
+            self._conn.execute("PRAGMA synchronous=NORMAL")
+            self._conn.executescript(SCHEMA)
+            for table, columns in ADDED_COLUMNS.items():
+                existing = {row[1] for row in self._conn.execute(f"PRAGMA table_info({table})")}
+                for name, column_type in columns:
+                    if name not in existing:
+                        self._conn.execute(f"ALTER TABLE {table} ADD COLUMN {name} {column_type}")
+            self._conn.commit()
+            console.print(f"[bold green]Opened SQLite database {path}[/bold green]")
+        except Exception as e:
+            console.print(f"[bold red]Failed to open SQLite database {path}: {str(e)}[/bold red]")
+            raise e
+
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.max_attempts = max_attempts
+        self.write_round_trips = 0
+        self.documents_written = 0
+        self._pending = []
+        # Generations from failed transactions waiting for another attempt: (entry, attempts so far)
+        self._retries = []
+        self._lost = 0
+        self._lock = threading.RLock()
+        self._db_lock = threading.RLock()
+        self._flush_lock = threading.RLock()
+        self._wakeup = threading.Event()
+        self._closed = False
+        self._writer = threading.Thread(target=self._write_loop, name="sqlite-write-behind", daemon=True)
+        self._writer.start()
+
+    @property
+    def pending_writes(self):
+        return len(self._pending) + len(self._retries)
+
+    def save_generation(self, document, recipes, transcript):
+        document = dict(document)
+        document.setdefault("_id", uuid.uuid4().hex[:24])
+        with self._lock:
+            if self._closed:
+                raise RuntimeError("SQLiteHandler is closed")
+            self._pending.append((document, recipes, transcript))
+            if len(self._pending) >= self.batch_size:
+                self._wakeup.set()
+        return document["_id"]
+
+    def _write_loop(self):
+        while not self._closed:
+            self._wakeup.wait(self.flush_interval)
+            self._wakeup.clear()
+            self._flush()
+
+    def _flush(self):
+        # One transaction over the queue; if it fails every generation in it is requeued
+        # until it runs out of attempts
+        with self._flush_lock:
+            with self._lock:
+                batch = self._retries + [(entry, 0) for entry in self._pending]
+                self._pending, self._retries = [], []
+            if not batch:
+                return
+            generations, recipes, raw_outputs, fts = [], {}, [], []
+            now = _timestamp(datetime.utcnow())
+            for (document, source_recipes, transcript), _ in batch:
+                recipe_ids = []
+                for recipe in source_recipes:
+                    key = recipe_key(recipe)
+                    if key not in recipe_ids:
+                        recipe_ids.append(key)
+                        recipes[key] = (
+                            key, recipe.get("title", ""), json.dumps(recipe.get("ingredients", [])),
+                            json.dumps(recipe.get("instructions", [])), recipe.get("source", ""), now
+                        )
+                content = document.get("content")
+                generations.append((
+                    document["_id"],
+                    document.get("keywords", ""),
+                    document.get("keywords_normalized") or normalize_keywords(document.get("keywords", "")),
+                    _timestamp(document.get("created_at") or datetime.utcnow()),
+                    document.get("model"),
+                    document.get("prompt_version"),
+                    STORAGE_SCHEMA_VERSION,
+                    json.dumps(content) if content else None,
+                    json.dumps(recipe_ids),
+                    json.dumps(document.get("token_usage") or {}),
+                    json.dumps(document["metrics"]) if document.get("metrics") else None,
+                    json.dumps(document["fingerprints"]) if document.get("fingerprints") else None,
+                ))
+                raw_outputs.append((document["_id"], *encode_transcript(transcript)))
+                if content:
+                    fts.append((content.get("title", ""), " ".join(content.get("ingredients") or []), document["_id"]))
+
+            start = time.perf_counter()
+            try:
+                with self._db_lock, self._conn:
+                    self._conn.executemany(
+                        "INSERT INTO source_recipes VALUES (?, ?, ?, ?, ?, ?) ON CONFLICT (id) DO UPDATE SET "
+                        "title = excluded.title, ingredients = excluded.ingredients, "
+                        "instructions = excluded.instructions, source = excluded.source",
+                        recipes.values()
+                    )
+                    self._conn.executemany("INSERT OR REPLACE INTO raw_outputs VALUES (?, ?, ?, ?)", raw_outputs)
+                    # A rerun job keyword replaces its earlier generation; drop that row's text index entry first
+                    self._conn.executemany(
+                        "DELETE FROM generations_fts WHERE rowid IN (SELECT rowid FROM generations WHERE id = ?)",
+                        [(row[0],) for row in generations]
+                    )
+                    self._conn.executemany(
+                        f"INSERT OR REPLACE INTO generations ({GENERATION_COLUMNS}) "
+                        "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)", generations
+                    )
+                    self._conn.executemany(
+                        "INSERT INTO generations_fts (rowid, title, ingredients) "
+                        "SELECT rowid, ?, ? FROM generations WHERE id = ?", fts
+                    )
+                metrics.observe("db_flush_seconds", time.perf_counter() - start, collection="generations")
+                self.write_round_trips += 1
+                self.documents_written += len(generations)
+                logger.info(f"Wrote {len(generations)} generations to SQLite in {time.perf_counter() - start:.3f}s")
+            except Exception as e:
+                retries = [(entry, attempts + 1) for entry, attempts in batch if attempts + 1 < self.max_attempts]
+                lost = len(batch) - len(retries)
+                with self._lock:
+                    self._retries.extend(retries)
+                    self._lost += lost
+                if retries:
+                    logger.warning(f"Error writing {len(retries)} generations to SQLite; requeued: {str(e)}")
+                if lost:
+                    logger.error(f"Dropping {lost} generations after {self.max_attempts} failed writes to SQLite: {str(e)}")
+
+    def flush(self):
+        """
+        Write everything queued, retrying failed transactions up to `max_attempts` times.
+
+        Raises:
+            WriteBehindError: If generations were lost, here or in the background writer
+                since the last flush.
+        """
+        self._flush()
+        while self._retries:
+            time.sleep(min(1.0, self.flush_interval))
+            self._flush()
+        with self._lock:
+            lost, self._lost = self._lost, 0
+        if lost:
+            raise WriteBehindError(f"{lost} generations could not be stored in SQLite after {self.max_attempts} attempts")
+
+    def _row_to_document(self, row):
+        (generation_id, keywords, keywords_normalized, created_at, model, prompt_version,
+         schema_version, content, recipe_ids, token_usage, row_metrics, fingerprints) = row
+        document = {
+            "_id": generation_id,
+            "keywords": keywords,
+            "keywords_normalized": keywords_normalized,
+            "created_at": datetime.strptime(created_at, TIMESTAMP_FORMAT),
+            "model": model,
+            "prompt_version": prompt_version,
+            "schema_version": schema_version,
+            "content": json.loads(content) if content else None,
+            "recipe_ids": json.loads(recipe_ids or "[]"),
+            "token_usage": json.loads(token_usage or "{}"),
+        }
+        if row_metrics:
+            document["metrics"] = json.loads(row_metrics)
+        if fingerprints:
+            document["fingerprints"] = json.loads(fingerprints)
+        return document
+
+    def search_history(self, keywords=None, text=None, since=None, until=None, limit=20, cursor=None):
+        """
+        Page through stored generations, newest first, with the same filters and
+        cursor format as DatabaseHandler.search_history.
+        """
+        columns = ", ".join(f"g.{column.strip()}" for column in GENERATION_COLUMNS.split(","))
+        sql = f"SELECT {columns} FROM generations g"
+        conditions, params = [], []
+        if text and _fts_query(text):
+            sql += " JOIN generations_fts f ON f.rowid = g.rowid"
+            conditions.append("generations_fts MATCH ?")
+            params.append(_fts_query(text))
+        if keywords:
+            conditions.append("g.keywords_normalized = ?")
+            params.append(normalize_keywords(keywords))
+        if since:
+            conditions.append("g.created_at >= ?")
+            params.append(_timestamp(since))
+        if until:
+            conditions.append("g.created_at < ?")
+            params.append(_timestamp(until))
+        if cursor:
+            created_at, last_id = split_cursor(cursor)
+            conditions.append("(g.created_at < ? OR (g.created_at = ? AND g.id < ?))")
+            params.extend([_timestamp(created_at), _timestamp(created_at), last_id])
+        if conditions:
+            sql += " WHERE " + " AND ".join(conditions)
+        sql += " ORDER BY g.created_at DESC, g.id DESC LIMIT ?"
+        params.append(limit + 1)
+
+        with self._db_lock:
+            rows = self._conn.execute(sql, params).fetchall()
+        documents = [self._row_to_document(row) for row in rows]
+        next_cursor = None
+        if len(documents) > limit:
+            documents = documents[:limit]
+            next_cursor = encode_cursor(documents[-1])
+        return documents, next_cursor
+
+    def iter_generations(self, since=None, after=None, until=None, batch_size=500):
+        """
+        Yield stored generations oldest first; see DatabaseHandler.iter_generations.
+
+        Rows are read in keyset-paginated batches, so no read transaction stays open
+        across the export and the writer thread is never held up for long.
+        """
+        base, params = [], []
+        if since:
+            base.append("created_at >= ?")
+            params.append(_timestamp(since))
+        if until:
+            base.append("created_at < ?")
+            params.append(_timestamp(until))
+        position = None
+        if after:
+            created_at, last_id = split_cursor(after)
+            position = (_timestamp(created_at), last_id)
+        while True:
+            conditions, page_params = list(base), list(params)
+            if position:
+                conditions.append("(created_at > ? OR (created_at = ? AND id > ?))")
+                page_params.extend([position[0], position[0], position[1]])
+            sql = f"SELECT {GENERATION_COLUMNS} FROM generations"
+            if conditions:
+                sql += " WHERE " + " AND ".join(conditions)
+            with self._db_lock:
+                rows = self._conn.execute(
+                    sql + " ORDER BY created_at, id LIMIT ?", page_params + [batch_size]
+                ).fetchall()
+            for row in rows:
+                yield self._row_to_document(row)
+            if len(rows) < batch_size:
+                return
+            position = (rows[-1][3], rows[-1][0])
+
+    def get_generation(self, generation_id, include_raw=False, include_recipes=False):
+        with self._db_lock:
+            row = self._conn.execute(
+                f"SELECT {GENERATION_COLUMNS} FROM generations WHERE id = ?", (str(generation_id),)
+            ).fetchone()
+            if row is None:
+                return None
+            document = self._row_to_document(row)
+            if include_raw:
+                raw = self._conn.execute(
+                    "SELECT codec, data FROM raw_outputs WHERE id = ?", (document["_id"],)
+                ).fetchone()
+                if raw:
+                    transcript = json.loads(decompress(raw[0], raw[1]))
+                    document["raw_output"] = transcript.get("raw_output", "")
+                    document["tasks_output"] = transcript.get("tasks", [])
+            if include_recipes and document["recipe_ids"]:
+                placeholders = ", ".join("?" * len(document["recipe_ids"]))
+                found = {
+                    row[0]: {
+                        "_id": row[0], "title": row[1], "ingredients": json.loads(row[2]),
+                        "instructions": json.loads(row[3]), "source": row[4]
+                    }
+                    for row in self._conn.execute(
+                        f"SELECT id, title, ingredients, instructions, source FROM source_recipes "
+                        f"WHERE id IN ({placeholders})", document["recipe_ids"]
+                    )
+                }
+                document["recipes"] = [found[key] for key in document["recipe_ids"] if key in found]
+        return document
+
+    def backfill_history_fields(self, batch_size=500):
+        # Every SQLite row is written with the history fields; nothing to derive
+        console.print("[bold green]Backfilled history fields on 0 documents.[/bold green]")
+        return 0
+
+    def migrate_schema(self, batch_size=200, dry_run=False):
+        # The SQLite backend has only ever stored the current schema
+        return {"documents": 0, "bytes_before": 0, "bytes_after": 0, "recipes": 0}
+
+    def create_job(self, job_id, keywords, source=None, model=None, prompt_version=None):
+        """Create a job manifest and pending keywords; see DatabaseHandler.create_job."""
+        now = _timestamp(datetime.utcnow())
+        rows = [
+            (job_id, normalize_keywords(kw), kw, position, "pending", uuid.uuid4().hex[:24], now)
+            for position, kw in enumerate(keywords)
+        ]
+        with self._db_lock, self._conn:
+            before = self._conn.total_changes
+            self._conn.executemany(
+                "INSERT OR IGNORE INTO job_keywords "
+                "(job_id, keywords_normalized, keywords, position, state, generation_id, updated_at) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?)", rows
+            )
+            added = self._conn.total_changes - before
+            self._conn.execute(
+                "INSERT INTO jobs (id, created_at, updated_at, source, model, prompt_version, status, total) "
+                "VALUES (?, ?, ?, ?, ?, ?, 'running', ?) "
+                "ON CONFLICT (id) DO UPDATE SET status = 'running', updated_at = excluded.updated_at, "
+                "total = total + excluded.total",
+                (job_id, now, now, source, model, prompt_version, added)
+            )
+        return added
+
+    def job_keywords(self, job_id, states=None):
+        sql = f"SELECT {', '.join(JOB_KEYWORD_COLUMNS)} FROM job_keywords WHERE job_id = ?"
+        params = [job_id]
+        if states:
+            sql += f" AND state IN ({', '.join('?' * len(states))})"
+            params.extend(states)
+        with self._db_lock:
+            rows = self._conn.execute(sql + " ORDER BY position", params).fetchall()
+        return [dict(zip(JOB_KEYWORD_COLUMNS, row), job_id=job_id) for row in rows]
+
+    def update_job_keyword(self, job_id, keywords, state, error=None, worker=None, attempts=None):
+        """Record a job keyword's state; see DatabaseHandler.update_job_keyword."""
+        running = state == "running"
+        now = _timestamp(datetime.utcnow())
+        sql = ("UPDATE job_keywords SET state = ?, error = ?, attempts = attempts + ?, updated_at = ?, "
+               "claimed_at = CASE WHEN ? THEN ? ELSE claimed_at END "
+               "WHERE job_id = ? AND keywords_normalized = ?")
+        params = [state, error, int(running), now, running, now, job_id, normalize_keywords(keywords)]
+        if worker is not None:
+            sql += " AND worker = ? AND attempts = ?"
+            params.extend([worker, attempts])
+        with self._db_lock, self._conn:
+            return self._conn.execute(sql, params).rowcount > 0
+
+    def claim_job_keyword(self, job_id, worker, max_attempts, lease_seconds):
+        """Atomically claim the next keyword to run; see DatabaseHandler.claim_job_keyword."""
+        now = datetime.utcnow()
+        with self._db_lock, self._conn:
+            # A single UPDATE ... RETURNING is atomic across processes sharing the file
+            row = self._conn.execute(
+                "UPDATE job_keywords SET state = 'running', worker = ?, claimed_at = ?, error = NULL, "
+                "updated_at = ?, attempts = attempts + 1 "
+                "WHERE rowid = ("
+                "  SELECT rowid FROM job_keywords WHERE job_id = ? AND ("
+                "    state = 'pending' OR (state = 'failed' AND attempts < ?) "
+                "    OR (state = 'running' AND claimed_at < ?)"
+                "  ) ORDER BY position LIMIT 1"
+                f") RETURNING {', '.join(JOB_KEYWORD_COLUMNS)}",
+                (worker, _timestamp(now), _timestamp(now), job_id, max_attempts,
+                 _timestamp(now - timedelta(seconds=lease_seconds)))
+            ).fetchone()
+        return dict(zip(JOB_KEYWORD_COLUMNS, row), job_id=job_id) if row else None
+
+    def existing_generations(self, generation_ids):
+        generation_ids = list(generation_ids)
+        found = set()
+        with self._db_lock:
+            for start in range(0, len(generation_ids), 500):
+                chunk = generation_ids[start:start + 500]
+                found.update(row[0] for row in self._conn.execute(
+                    f"SELECT id FROM generations WHERE id IN ({', '.join('?' * len(chunk))})", chunk
+                ))
+        return found
+
+    def finish_job(self, job_id, status):
+        with self._db_lock, self._conn:
+            self._conn.execute(
+                "UPDATE jobs SET status = ?, updated_at = ? WHERE id = ?",
+                (status, _timestamp(datetime.utcnow()), job_id)
+            )
+
+    def _job_document(self, row):
+        job_id, created_at, updated_at, source, model, prompt_version, status, total = row
+        return {
+            "_id": job_id,
+            "created_at": datetime.strptime(created_at, TIMESTAMP_FORMAT),
+            "updated_at": datetime.strptime(updated_at, TIMESTAMP_FORMAT),
+            "source": source,
+            "model": model,
+            "prompt_version": prompt_version,
+            "status": status,
+            "total": total,
+        }
+
+    def get_job(self, job_id):
+        with self._db_lock:
+            row = self._conn.execute(
+                "SELECT id, created_at, updated_at, source, model, prompt_version, status, total "
+                "FROM jobs WHERE id = ?", (job_id,)
+            ).fetchone()
+            if row is None:
+                return None
+            job = self._job_document(row)
+            job["states"] = dict(self._conn.execute(
+                "SELECT state, COUNT(*) FROM job_keywords WHERE job_id = ? GROUP BY state", (job_id,)
+            ).fetchall())
+        return job
+
+    def list_jobs(self, limit=20):
+        with self._db_lock:
+            rows = self._conn.execute(
+                "SELECT id, created_at, updated_at, source, model, prompt_version, status, total "
+                "FROM jobs ORDER BY created_at DESC LIMIT ?", (limit,)
+            ).fetchall()
+        return [self._job_document(row) for row in rows]
+
+    def close(self):
+        with self._lock:
+            if self._closed:
+                return
+            self._closed = True
+        self._wakeup.set()
+        if self._writer is not threading.current_thread():
+            self._writer.join(timeout=self.flush_interval + 5)
+        try:
+            self.flush()
+        finally:
+            console.print(
+                f"[bold blue]Wrote {self.documents_written} documents in {self.write_round_trips} transactions[/bold blue]"
+            )
+            with self._db_lock:
+                self._conn.close()
+            console.print("[bold blue]SQLite database closed[/bold blue]")
@@ -0,0 +1,113 @@
+# Storage backends for generated articles, chosen by URI scheme
+
+import hashlib
+import json
+from datetime import datetime
+from typing import Any, Dict, Iterator, List, Optional, Protocol, Tuple
+
+from utils.compression import compress
+
+MONGODB_SCHEMES = ("mongodb://", "mongodb+srv://")
+SQLITE_SCHEME = "sqlite:///"
+
+
+class WriteBehindError(RuntimeError):
+    """Queued writes that could not be stored after DB_WRITE_MAX_ATTEMPTS attempts."""
+
+
+class StorageBackend(Protocol):
+    """
+    What the pipeline needs from a storage backend.
+
+    Writes are queued and flushed in batches, so `save_generation` returns without a
+    round-trip; `flush` and `close` push anything still pending, retrying failed batches,
+    and raise WriteBehindError for writes that could not be stored. History documents are
+    dicts shaped like the MongoDB schema (`_id`, `keywords`, `created_at`, `content`, ...)
+    whichever backend produced them.
+    """
+
+    write_round_trips: int
+    documents_written: int
+
+    @property
+    def pending_writes(self) -> int: ...
+
+    def save_generation(self, document: Dict[str, Any], recipes: List[Dict[str, Any]],
+                        transcript: Dict[str, Any]) -> Any: ...
+
+    def flush(self) -> None: ...
+
+    def search_history(self, keywords: Optional[str] = None, text: Optional[str] = None,
+                       since: Optional[datetime] = None, until: Optional[datetime] = None,
+                       limit: int = 20, cursor: Optional[str] = None) -> Tuple[List[Dict[str, Any]], Optional[str]]: ...
+
+    def get_generation(self, generation_id: Any, include_raw: bool = False,
+                       include_recipes: bool = False) -> Optional[Dict[str, Any]]: ...
+
+    def iter_generations(self, since: Optional[datetime] = None, after: Optional[str] = None,
+                         until: Optional[datetime] = None, batch_size: int = 500) -> Iterator[Dict[str, Any]]: ...
+
+    def backfill_history_fields(self, batch_size: int = 500) -> int: ...
+
+    def migrate_schema(self, batch_size: int = 200, dry_run: bool = False) -> Dict[str, int]: ...
+
+    def create_job(self, job_id: str, keywords: List[str], source: Optional[str] = None,
+                   model: Optional[str] = None, prompt_version: Optional[str] = None) -> int: ...
+
+    def job_keywords(self, job_id: str, states: Optional[List[str]] = None) -> List[Dict[str, Any]]: ...
+
+    def update_job_keyword(self, job_id: str, keywords: str, state: str, error: Optional[str] = None,
+                           worker: Optional[str] = None, attempts: Optional[int] = None) -> bool: ...
+
+    def claim_job_keyword(self, job_id: str, worker: str, max_attempts: int,
+                          lease_seconds: float) -> Optional[Dict[str, Any]]: ...
+
+    def existing_generations(self, generation_ids: List[Any]) -> set: ...
+
+    def finish_job(self, job_id: str, status: str) -> None: ...
+
+    def get_job(self, job_id: str) -> Optional[Dict[str, Any]]: ...
+
+    def list_jobs(self, limit: int = 20) -> List[Dict[str, Any]]: ...
+
+    def close(self) -> None: ...
+
+
+def open_storage(uri: str) -> StorageBackend:
+    """
+    Open the storage backend for `uri`.
+
+    mongodb:// and mongodb+srv:// URIs open a MongoDB DatabaseHandler; sqlite:///path
+    opens a local SQLite file (sqlite:///:memory: for a throwaway database). Each backend
+    is imported only when selected, so SQLite deployments do not need pymongo.
+    """
+    if uri.startswith(MONGODB_SCHEMES):
+        from tools.database_handler import DatabaseHandler
+        return DatabaseHandler(uri)
+    if uri.startswith(SQLITE_SCHEME):
+        from tools.sqlite_handler import SQLiteHandler
+        return SQLiteHandler(uri[len(SQLITE_SCHEME):])
+    raise ValueError(f"Unsupported storage URI '{uri}': expected mongodb://, mongodb+srv:// or sqlite:///")
+
+
+def recipe_key(recipe):
+    # Deduplication key: the source URL without its fragment, or the title when there is none
+    source = (recipe.get("source") or "").strip().split("#", 1)[0].rstrip("/")
+    identity = source or "title:" + " ".join((recipe.get("title") or "").lower().split())
+    return hashlib.sha1(identity.encode("utf-8")).hexdigest()
+
+
+def encode_transcript(transcript):
+    """Compress a transcript; returns (codec, uncompressed size, compressed bytes)."""
+    data = json.dumps(transcript, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+    codec, compressed = compress(data)
+    return codec, len(data), compressed
+
+
+def encode_cursor(document):
+    return f"{document['created_at'].isoformat(timespec='microseconds')}_{document['_id']}"
+
+
+def split_cursor(cursor):
+    created_at, _, last_id = cursor.rpartition("_")
+    return datetime.fromisoformat(created_at), last_id
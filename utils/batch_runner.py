@@ -0,0 +1,121 @@
+import asyncio
+import contextvars
+import time
+from dataclasses import dataclass
+from typing import Any, Awaitable, Callable, Dict, Iterable, Iterator, List, Optional, TextIO
+
+# The job keyword (as stored by the storage backend) that the current pipeline run belongs to;
+# save_to_mongodb stores the generation under the id the keyword reserved
+current_job_item: contextvars.ContextVar[Optional[Dict[str, Any]]] = contextvars.ContextVar(
+    "current_job_item", default=None
+)
+
+
+@dataclass
+class KeywordResult:
+    """
+    Outcome of running the pipeline for a single keyword.
+    """
+    index: int
+    keywords: str
+    latency: float
+    result: Any = None
+    error: Optional[str] = None
+
+    @property
+    def succeeded(self) -> bool:
+        return self.error is None and self.result is not None
+
+
+@dataclass
+class BatchReport:
+    """
+    Ordered per-keyword results plus overall timing for a batch run.
+    """
+    results: List[KeywordResult]
+    wall_time: float
+    concurrency: int
+
+    @property
+    def succeeded(self) -> int:
+        return sum(1 for item in self.results if item.succeeded)
+
+    @property
+    def failed(self) -> int:
+        return len(self.results) - self.succeeded
+
+    @property
+    def throughput(self) -> float:
+        """Keywords processed per second of wall-clock time."""
+        return len(self.results) / self.wall_time if self.wall_time > 0 else 0.0
+
+
+def read_keywords(source: TextIO) -> Iterator[str]:
+    """
+    Read keywords from a file-like object, one per line.
+
+    Blank lines and lines starting with '#' are skipped.
+
+    Args:
+        source (TextIO): File or stdin to read from.
+
+    Yields:
+        str: Stripped keywords.
+    """
+    for line in source:
+        keywords = line.strip()
+        if keywords and not keywords.startswith("#"):
+            yield keywords
+
+
+async def run_batch(
+    keywords: Iterable[str],
+    process: Callable[[str], Awaitable[Any]],
+    concurrency: int,
+    on_result: Optional[Callable[[KeywordResult, int], None]] = None
+) -> BatchReport:
+    """
+    Run the coroutine function `process` over keywords with a bounded pool of worker tasks.
+
+    Results are returned (and reported through `on_result`) in input order,
+    while up to `concurrency` keywords are in flight at any time.
+
+    Args:
+        keywords (Iterable[str]): Keywords to process.
+        process (Callable[[str], Awaitable[Any]]): Pipeline coroutine for one keyword.
+            A None return value is treated as a failure.
+        concurrency (int): Maximum number of keywords processed at once.
+        on_result (Optional[Callable[[KeywordResult, int], None]]): Called with each
+            result and the total keyword count as soon as it is next in order.
+
+    Returns:
+        BatchReport: Ordered results with latency and throughput figures.
+    """
+    keywords = list(keywords)
+    concurrency = max(1, min(concurrency, len(keywords) or 1))
+    pending = iter(enumerate(keywords))
+    finished = {}
+    results = []
+
+    def emit_ready():
+        # Report results strictly in input order as soon as the next one is available
+        while len(results) in finished:
+            keyword_result = finished.pop(len(results))
+            results.append(keyword_result)
+            if on_result:
+                on_result(keyword_result, len(keywords))
+
+    async def worker():
+        for index, kw in pending:
+            item_start = time.perf_counter()
+            try:
+                result = await process(kw)
+                error = None if result is not None else "No output produced"
+            except Exception as e:
+                result, error = None, str(e)
+            finished[index] = KeywordResult(index, kw, time.perf_counter() - item_start, result, error)
+            emit_ready()
+
+    start = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    return BatchReport(results, time.perf_counter() - start, concurrency)
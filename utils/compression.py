@@ -0,0 +1,36 @@
+import zlib
+from typing import Tuple
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+from config.settings import RAW_OUTPUT_COMPRESSION_LEVEL
+
+# zstd compresses LLM transcripts slightly smaller and several times faster than zlib;
+# zlib is always available, so it is the fallback and documents record which one was used
+DEFAULT_CODEC = "zstd" if zstandard is not None else "zlib"
+
+
+def compress(data: bytes, codec: str = DEFAULT_CODEC, level: int = RAW_OUTPUT_COMPRESSION_LEVEL) -> Tuple[str, bytes]:
+    """
+    Compress `data` and return (codec, compressed bytes).
+
+    `level` is passed to either codec; both accept 1-9 (zstd goes up to 22).
+    """
+    if codec == "zstd" and zstandard is not None:
+        return "zstd", zstandard.ZstdCompressor(level=level).compress(data)
+    return "zlib", zlib.compress(data, min(level, 9))
+
+
+def decompress(codec: str, data: bytes) -> bytes:
+    if codec == "zstd":
+        if zstandard is None:
+            raise RuntimeError("Stored data is zstd-compressed; install the zstandard package to read it")
+        return zstandard.ZstdDecompressor().decompress(data)
+    if codec == "zlib":
+        return zlib.decompress(data)
+    if codec == "none":
+        return data
+    raise ValueError(f"Unknown compression codec: {codec}")
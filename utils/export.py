@@ -0,0 +1,194 @@
+# Streaming export of stored generations to JSONL, Parquet, HTML or Markdown
+
+import json
+import os
+import re
+import sys
+from datetime import datetime
+from typing import Any, Dict, List, Optional
+
+try:
+    import pyarrow
+    import pyarrow.parquet as parquet
+except ImportError:
+    pyarrow = None
+
+from models.task_outputs import ContentOutput
+from utils.terminal_ui import content_html, content_markdown
+
+CONTENT_FIELDS = list(ContentOutput.model_fields)
+LIST_FIELDS = {name for name in CONTENT_FIELDS if name in ("ingredients", "instructions")}
+
+
+def export_record(document: Dict[str, Any]) -> Dict[str, Any]:
+    """Flatten a stored generation into one export row: metadata plus every ContentOutput field."""
+    content = document.get("content") or {}
+    record = {
+        "id": str(document["_id"]),
+        "keywords": document.get("keywords"),
+        "created_at": document.get("created_at"),
+        "model": document.get("model"),
+        "prompt_version": document.get("prompt_version"),
+    }
+    for name in CONTENT_FIELDS:
+        value = content.get(name)
+        if name in LIST_FIELDS:
+            value = [str(item) for item in value] if isinstance(value, list) else ([str(value)] if value else [])
+        record[name] = value
+    return record
+
+
+def _part_path(path: str) -> str:
+    # The first free name.part-NNNN.ext beside `path`
+    root, extension = os.path.splitext(path)
+    number = 1
+    while os.path.exists(f"{root}.part-{number:04d}{extension}"):
+        number += 1
+    return f"{root}.part-{number:04d}{extension}"
+
+
+def _slug(text: str, limit: int = 60) -> str:
+    return re.sub(r"[^a-z0-9]+", "-", (text or "").lower()).strip("-")[:limit] or "article"
+
+
+class JsonlExporter:
+    """One JSON object per line. With `append`, an incremental export extends the same file."""
+
+    def __init__(self, path: str, append: bool = False):
+        self._file = sys.stdout if path == "-" else open(path, "a" if append else "w", encoding="utf-8")
+        # Where this run's lines start, so a failed run can be cut back off
+        self._start = None if self._file is sys.stdout else self._file.tell()
+
+    def write(self, document: Dict[str, Any]) -> None:
+        record = export_record(document)
+        if record["created_at"]:
+            record["created_at"] = record["created_at"].isoformat()
+        self._file.write(json.dumps(record, ensure_ascii=False) + "\n")
+
+    def close(self, discard: bool = False) -> None:
+        """Finish the file; with `discard`, drop the lines this run wrote (not possible on stdout)."""
+        if self._file is sys.stdout:
+            self._file.flush()
+            return
+        if discard:
+            self._file.truncate(self._start)
+        self._file.close()
+
+
+class ParquetExporter:
+    """
+    Columnar file with one column per ContentOutput field.
+
+    Rows are buffered and written as a row group every `row_group_size` documents, so
+    only one row group is ever held in memory. The file is written under a temporary
+    name and only moved into place by a successful `close`. A Parquet file cannot be
+    appended to, so with `append` each run writes a new part file next to `path`
+    (`name.part-0001.parquet`, ...), and a run with no rows writes none.
+    """
+
+    def __init__(self, path: str, row_group_size: int = 10000, append: bool = False):
+        if pyarrow is None:
+            raise RuntimeError("Parquet export needs pyarrow: pip install pyarrow")
+        fields = [
+            ("id", pyarrow.string()),
+            ("keywords", pyarrow.string()),
+            ("created_at", pyarrow.timestamp("us")),
+            ("model", pyarrow.string()),
+            ("prompt_version", pyarrow.string()),
+        ]
+        fields += [
+            (name, pyarrow.list_(pyarrow.string()) if name in LIST_FIELDS else pyarrow.string())
+            for name in CONTENT_FIELDS
+        ]
+        self.schema = pyarrow.schema(fields)
+        self.row_group_size = row_group_size
+        self.append = append
+        self.path = _part_path(path) if append and os.path.exists(path) else path
+        self._rows: List[Dict[str, Any]] = []
+        self._writer = None
+
+    def write(self, document: Dict[str, Any]) -> None:
+        self._rows.append(export_record(document))
+        if len(self._rows) >= self.row_group_size:
+            self._flush()
+
+    def _open(self) -> None:
+        if self._writer is None:
+            self._writer = parquet.ParquetWriter(f"{self.path}.tmp", self.schema, compression="zstd")
+
+    def _flush(self) -> None:
+        if self._rows:
+            self._open()
+            self._writer.write_table(pyarrow.Table.from_pylist(self._rows, schema=self.schema))
+            self._rows = []
+
+    def close(self, discard: bool = False) -> None:
+        """Move the finished file into place; with `discard`, delete it instead."""
+        if discard:
+            if self._writer is not None:
+                self._writer.close()
+                os.remove(f"{self.path}.tmp")
+            return
+        self._flush()
+        if self._writer is None and self.append:
+            return
+        self._open()
+        self._writer.close()
+        os.replace(f"{self.path}.tmp", self.path)
+
+
+class PageExporter:
+    """One static page per article, laid out like TerminalUI.display_result."""
+
+    def __init__(self, directory: str, page_format: str):
+        os.makedirs(directory, exist_ok=True)
+        self.directory = directory
+        self.page_format = page_format
+
+    def write(self, document: Dict[str, Any]) -> None:
+        record = export_record(document)
+        fields = {name: record[name] for name in CONTENT_FIELDS if record[name] is not None}
+        created_at = record["created_at"] or datetime.utcnow()
+        name = f"{created_at:%Y%m%d}-{_slug(record['title'] or record['keywords'])}-{record['id']}"
+        if self.page_format == "html":
+            path, page = os.path.join(self.directory, name + ".html"), content_html(fields)
+        else:
+            path, page = os.path.join(self.directory, name + ".md"), content_markdown(fields)
+        with open(path, "w", encoding="utf-8") as f:
+            f.write(page)
+
+    def close(self, discard: bool = False) -> None:
+        # Pages are named by article, so pages of a failed run are rewritten by the next one
+        pass
+
+
+def open_exporter(export_format: str, output: str, append: bool = False, row_group_size: int = 10000):
+    """
+    Open the exporter for `export_format` writing to `output`.
+
+    jsonl writes a file ('-' for stdout), appending to it when `append` is set; parquet
+    writes a file, or with `append` a new part file beside it; html and markdown write
+    one page per article into a directory.
+    """
+    if export_format == "jsonl":
+        return JsonlExporter(output, append)
+    if export_format == "parquet":
+        return ParquetExporter(output, row_group_size, append)
+    if export_format in ("html", "markdown"):
+        return PageExporter(output, export_format)
+    raise ValueError(f"Unknown export format '{export_format}'")
+
+
+def read_watermark(path: Optional[str]) -> Optional[str]:
+    if not path or not os.path.exists(path):
+        return None
+    with open(path, encoding="utf-8") as f:
+        return f.read().strip() or None
+
+
+def write_watermark(path: str, cursor: str) -> None:
+    # Replace atomically so an interrupted export leaves the previous watermark intact
+    temporary = f"{path}.tmp"
+    with open(temporary, "w", encoding="utf-8") as f:
+        f.write(cursor + "\n")
+    os.replace(temporary, path)
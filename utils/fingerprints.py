@@ -0,0 +1,61 @@
+# Input fingerprints of stored generations, for regenerating only the stages whose inputs changed
+
+import hashlib
+import json
+from typing import Any, Dict, List
+
+from utils.keywords import normalize_keywords
+
+RECIPE_FIELDS = ("title", "ingredients", "instructions", "source")
+
+# Inputs of the content stage, in the order changes are reported
+CONTENT_INPUTS = ("keywords", "search", "prompt_version", "model")
+
+
+def search_fingerprint(recipes: List[Dict[str, Any]]) -> str:
+    """
+    Return a content hash of search results.
+
+    Only the Recipe fields are hashed, in order, so recipes read back from storage
+    (which carry their own ids) hash the same as the SearchOutput they came from.
+    """
+    material = [[recipe.get(field) for field in RECIPE_FIELDS] for recipe in recipes]
+    encoded = json.dumps(material, ensure_ascii=False, separators=(",", ":"))
+    return hashlib.sha256(encoded.encode("utf-8")).hexdigest()[:16]
+
+
+def generation_fingerprints(keywords: str, recipes: List[Dict[str, Any]], model: str,
+                            prompt_version: str) -> Dict[str, str]:
+    """Return the fingerprints of everything a generated article was derived from."""
+    return {
+        "keywords": normalize_keywords(keywords),
+        "search": search_fingerprint(recipes),
+        "prompt_version": prompt_version,
+        "model": model,
+    }
+
+
+def stored_fingerprints(document: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Return a stored generation's fingerprints.
+
+    Generations saved before fingerprints were recorded fall back to their keyword,
+    model and prompt version fields; their search fingerprint is unknown.
+    """
+    if document.get("fingerprints"):
+        return document["fingerprints"]
+    return {
+        "keywords": document.get("keywords_normalized") or normalize_keywords(document.get("keywords", "")),
+        "prompt_version": document.get("prompt_version"),
+        "model": document.get("model"),
+    }
+
+
+def changed_inputs(stored: Dict[str, Any], current: Dict[str, Any]) -> List[str]:
+    """
+    Return the content-stage inputs whose current fingerprint differs from the stored one.
+
+    Inputs missing from `current` are not compared, so a caller that has not re-run the
+    search only checks the keywords, prompt version and model.
+    """
+    return [name for name in CONTENT_INPUTS if name in current and stored.get(name) != current[name]]
@@ -0,0 +1,201 @@
+import asyncio
+import json
+import logging
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Awaitable, Callable, Dict, Optional
+from urllib.parse import parse_qs, urlparse
+
+from pydantic import BaseModel
+from utils.keywords import normalize_keywords
+from utils.metrics import metrics
+from utils.single_flight import SingleFlight
+
+logger = logging.getLogger(__name__)
+
+
+class Overloaded(Exception):
+    """Raised when the admission queue is full."""
+
+
+class AdmissionController:
+    """
+    Bound the number of pipeline executions running and waiting to run.
+
+    Up to `max_in_flight` executions run at once and up to `max_queue` more wait for a
+    slot. Anything beyond that is rejected immediately so callers see backpressure
+    instead of unbounded latency.
+    """
+
+    def __init__(self, max_in_flight: int, max_queue: int):
+        self.max_in_flight = max_in_flight
+        self.max_queue = max_queue
+        self.admitted = 0
+        self.rejected = 0
+        self._reserved = 0
+        self._slots = asyncio.Semaphore(max_in_flight)
+
+    def try_reserve(self) -> bool:
+        if self._reserved >= self.max_in_flight + self.max_queue:
+            self.rejected += 1
+            return False
+        self._reserved += 1
+        self.admitted += 1
+        return True
+
+    async def run(self, coro: Awaitable[Any]) -> Any:
+        """Run a coroutine admitted by `try_reserve` once a slot is free."""
+        try:
+            async with self._slots:
+                return await coro
+        finally:
+            self._reserved -= 1
+
+    def stats(self) -> Dict[str, int]:
+        return {
+            "admitted": self.admitted,
+            "rejected": self.rejected,
+            "reserved": self._reserved,
+            "max_in_flight": self.max_in_flight,
+            "max_queue": self.max_queue,
+        }
+
+
+class RecipeService:
+    """
+    Request coalescing and admission control in front of the generation pipeline.
+
+    Concurrent requests for the same normalized keywords share one execution; new
+    executions are admitted through an `AdmissionController`.
+    """
+
+    def __init__(self, generate: Callable[[str], Awaitable[Optional[BaseModel]]],
+                 search: Callable[[str], Awaitable[Optional[BaseModel]]],
+                 max_in_flight: int, max_queue: int):
+        self._generate = generate
+        self._search = search
+        self.single_flight = SingleFlight()
+        self.admission = AdmissionController(max_in_flight, max_queue)
+
+    async def _coalesced(self, stage: str, keywords: str, fn) -> Optional[BaseModel]:
+        key = f"{stage}:{normalize_keywords(keywords)}"
+        # Joining an execution already in flight costs nothing, so only new work is admitted
+        if self.single_flight.in_flight(key):
+            return await self.single_flight.do(key, lambda: fn(keywords))
+        if not self.admission.try_reserve():
+            raise Overloaded()
+        return await self.single_flight.do(key, lambda: self.admission.run(fn(keywords)))
+
+    async def generate(self, keywords: str) -> Optional[BaseModel]:
+        return await self._coalesced("generate", keywords, self._generate)
+
+    async def search(self, keywords: str) -> Optional[BaseModel]:
+        return await self._coalesced("search", keywords, self._search)
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "single_flight": self.single_flight.stats(),
+            "admission": self.admission.stats(),
+        }
+
+
+def create_http_server(service: RecipeService, loop: asyncio.AbstractEventLoop,
+                       host: str, port: int) -> ThreadingHTTPServer:
+    """
+    Build an HTTP server exposing the recipe service.
+
+    Endpoints:
+        GET/POST /generate  keywords as ?keywords=... or JSON {"keywords": ...}; returns ContentOutput JSON
+        GET/POST /search    same input; returns SearchOutput JSON
+        GET /stats          coalescing and admission counters
+        GET /metrics        stage latency histograms and counters in Prometheus text format
+        GET /health         liveness check
+
+    Request threads hand the work to `loop`, where all coalescing state lives.
+
+    Args:
+        service (RecipeService): The service handling requests.
+        loop (asyncio.AbstractEventLoop): Event loop running the pipeline.
+        host (str): Interface to bind.
+        port (int): Port to bind.
+
+    Returns:
+        ThreadingHTTPServer: The server; call serve_forever() to start it.
+    """
+
+    class RecipeRequestHandler(BaseHTTPRequestHandler):
+        def log_message(self, format, *args):
+            logger.info(f"{self.address_string()} - {format % args}")
+
+        def _send_json(self, status: int, payload: Any, headers: Optional[Dict[str, str]] = None) -> None:
+            body = json.dumps(payload).encode("utf-8")
+            self.send_response(status)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(body)))
+            for name, value in (headers or {}).items():
+                self.send_header(name, value)
+            self.end_headers()
+            self.wfile.write(body)
+
+        def _send_text(self, status: int, text: str, content_type: str) -> None:
+            body = text.encode("utf-8")
+            self.send_response(status)
+            self.send_header("Content-Type", content_type)
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def _read_keywords(self, parsed) -> Optional[str]:
+            keywords = parse_qs(parsed.query).get("keywords", [None])[0]
+            if keywords is None and self.command == "POST":
+                length = int(self.headers.get("Content-Length") or 0)
+                try:
+                    keywords = json.loads(self.rfile.read(length) or b"{}").get("keywords")
+                except (json.JSONDecodeError, AttributeError):
+                    return None
+            return keywords.strip() if isinstance(keywords, str) and keywords.strip() else None
+
+        def _handle(self) -> None:
+            parsed = urlparse(self.path)
+            if parsed.path == "/health":
+                self._send_json(200, {"status": "ok"})
+                return
+            if parsed.path == "/stats":
+                self._send_json(200, service.stats())
+                return
+            if parsed.path == "/metrics":
+                self._send_text(200, metrics.render_prometheus(), "text/plain; version=0.0.4")
+                return
+            if parsed.path not in ("/generate", "/search"):
+                self._send_json(404, {"error": "Not found"})
+                return
+
+            keywords = self._read_keywords(parsed)
+            if not keywords:
+                self._send_json(400, {"error": "Missing 'keywords'"})
+                return
+
+            handler = service.generate if parsed.path == "/generate" else service.search
+            try:
+                output = asyncio.run_coroutine_threadsafe(handler(keywords), loop).result()
+            except Overloaded:
+                self._send_json(429, {"error": "Too many requests in flight"}, {"Retry-After": "1"})
+                return
+            except Exception as e:
+                logger.error(f"Request for '{keywords}' failed: {str(e)}", exc_info=True)
+                self._send_json(500, {"error": "Internal error"})
+                return
+
+            if isinstance(output, BaseModel):
+                self._send_json(200, output.dict())
+            else:
+                self._send_json(502, {"error": f"No output produced for '{keywords}'"})
+
+        def do_GET(self):
+            self._handle()
+
+        def do_POST(self):
+            self._handle()
+
+    server = ThreadingHTTPServer((host, port), RecipeRequestHandler)
+    server.daemon_threads = True
+    return server
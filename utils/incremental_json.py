@@ -0,0 +1,102 @@
+import json
+from typing import Any, List, Tuple
+
+
+class IncrementalJSONFieldParser:
+    """
+    Surface the top-level fields of a streamed JSON object as soon as each one is complete.
+
+    Text before the opening brace (such as a ```json fence) is ignored. Feed chunks as
+    they arrive; each call returns the (field, value) pairs completed by that chunk.
+
+        parser = IncrementalJSONFieldParser()
+        parser.feed('{"title": "Pasta", "ingr')   # [("title", "Pasta")]
+        parser.feed('edients": ["a", "b"]}')      # [("ingredients", ["a", "b"])]
+    """
+
+    def __init__(self):
+        self.fields = {}
+        self.done = False
+        self._text = ""
+        self._pos = 0
+        self._depth = 0
+        self._in_string = False
+        self._escaped = False
+        self._key = None
+        self._key_start = None
+        self._value_start = None
+        self._expect = "open"  # open -> key -> colon -> value -> comma
+
+    def feed(self, chunk: str) -> List[Tuple[str, Any]]:
+        completed = []
+        if self.done:
+            return completed
+        self._text += chunk
+        text = self._text
+
+        while self._pos < len(text) and not self.done:
+            char = text[self._pos]
+
+            if self._in_string:
+                if self._escaped:
+                    self._escaped = False
+                elif char == "\\":
+                    self._escaped = True
+                elif char == '"':
+                    self._in_string = False
+                    if self._depth == 1 and self._expect == "key":
+                        self._key = json.loads(text[self._key_start:self._pos + 1])
+                        self._expect = "colon"
+                    elif self._depth == 1 and self._expect == "value":
+                        # A top-level string value ends with its closing quote
+                        self._complete(text, self._pos + 1, completed)
+                self._pos += 1
+                continue
+
+            if self._expect == "open":
+                if char == "{":
+                    self._depth = 1
+                    self._expect = "key"
+            elif char == '"':
+                self._in_string = True
+                if self._depth == 1 and self._expect == "key":
+                    self._key_start = self._pos
+                elif self._depth == 1 and self._expect == "value" and self._value_start is None:
+                    self._value_start = self._pos
+            elif self._depth == 1 and self._expect == "colon" and char == ":":
+                self._expect = "value"
+            elif char in "{[":
+                if self._depth == 1 and self._value_start is None:
+                    self._value_start = self._pos
+                self._depth += 1
+            elif char in "}]":
+                self._depth -= 1
+                if self._depth == 1 and self._expect == "value":
+                    self._complete(text, self._pos + 1, completed)
+                elif self._depth == 0:
+                    # Closing brace of the object; flush a trailing number/literal value
+                    if self._expect == "value" and self._value_start is not None:
+                        self._complete(text, self._pos, completed)
+                    self.done = True
+            elif self._depth == 1 and char == ",":
+                if self._expect == "value" and self._value_start is not None:
+                    self._complete(text, self._pos, completed)
+                self._expect = "key"
+            elif self._depth == 1 and self._expect == "value" and self._value_start is None and not char.isspace():
+                # Start of a number, true, false or null
+                self._value_start = self._pos
+            self._pos += 1
+
+        return completed
+
+    def _complete(self, text: str, end: int, completed: List[Tuple[str, Any]]) -> None:
+        try:
+            value = json.loads(text[self._value_start:end].strip())
+        except json.JSONDecodeError:
+            value = None
+        if value is not None:
+            self.fields[self._key] = value
+            completed.append((self._key, value))
+        self._key = None
+        self._value_start = None
+        self._expect = "comma"
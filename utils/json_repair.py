@@ -0,0 +1,229 @@
+import json
+import logging
+import re
+from itertools import accumulate
+from typing import Any, Iterator, List, Optional, Tuple, Type, TypeVar
+
+from pydantic import BaseModel
+from utils.metrics import metrics
+
+try:
+    import orjson
+
+    def _loads(text: str) -> Any:
+        return orjson.loads(text)
+
+    _DECODE_ERRORS = (orjson.JSONDecodeError, ValueError)
+except ImportError:
+    orjson = None
+
+    def _loads(text: str) -> Any:
+        return json.loads(text)
+
+    _DECODE_ERRORS = (ValueError,)
+
+logger = logging.getLogger(__name__)
+
+ModelT = TypeVar("ModelT", bound=BaseModel)
+
+# Curly quotes models sometimes use as string delimiters
+_OPEN_QUOTES = "“„"
+_CLOSE_QUOTES = "”"
+_ESCAPED_CONTROL = {"\n": "\\n", "\r": "\\r", "\t": "\\t"}
+_CLOSERS = {"{": "}", "[": "]"}
+# Everything else is copied through in slices between matches of this pattern
+_SPECIAL = re.compile(r'["\\{}\[\],“”„\n\r\t]')
+
+metrics.describe("llm_parse_total", "LLM responses parsed, by outcome (clean, repaired, failed)")
+
+
+def _scan_object(text: str, start: int) -> Tuple[str, int, bool, List[Tuple[str, int, Optional[int]]]]:
+    """
+    Copy the JSON object opening at `text[start]`, repairing defects on the way.
+
+    Smart-quote delimiters become plain quotes, raw control characters inside strings are
+    escaped and commas directly before a closing bracket are dropped.
+
+    Returns:
+        Tuple: the repaired text, the index just past the object in `text`, whether the
+        object was balanced, and the open-container stack as (bracket, offset of the
+        bracket, offset of its last comma or None) if it was not.
+    """
+    out: List[str] = []
+    stack: List[Tuple[str, int, Optional[int]]] = []
+    in_string = False
+    smart_string = False
+    pos = start
+
+    while True:
+        match = _SPECIAL.search(text, pos)
+        if match is None:
+            if pos < len(text):
+                out.append(text[pos:])
+            pos = len(text)
+            break
+        index = match.start()
+        if index > pos:
+            out.append(text[pos:index])
+        char = text[index]
+        pos = index + 1
+
+        if in_string:
+            if char == "\\":
+                # Copy the escape and the escaped character verbatim
+                out.append(text[index:index + 2])
+                pos = index + 2
+            elif (char == '"' and not smart_string) or (smart_string and char in _CLOSE_QUOTES):
+                in_string = False
+                out.append('"')
+            elif char == '"':
+                out.append('\\"')
+            elif char in _ESCAPED_CONTROL:
+                out.append(_ESCAPED_CONTROL[char])
+            else:
+                out.append(char)
+            continue
+
+        if char == '"' or char in _OPEN_QUOTES or char in _CLOSE_QUOTES:
+            in_string = True
+            smart_string = char != '"'
+            out.append('"')
+        elif char in _CLOSERS:
+            stack.append((char, len(out), None))
+            out.append(char)
+        elif char in "}]":
+            # Drop a trailing comma: `[1, 2,]` / `{"a": 1,}`
+            while out and out[-1].isspace():
+                out.pop()
+            if out and out[-1] == ",":
+                out.pop()
+            out.append(char)
+            if stack:
+                stack.pop()
+            if not stack:
+                return "".join(out), pos, True, stack
+        elif char == ",":
+            stack[-1] = stack[-1][:2] + (len(out),)
+            out.append(char)
+        else:
+            out.append(char)
+
+    if in_string:
+        if out[-1] == "\\":
+            # Truncated inside an escape sequence
+            out.pop()
+        out.append('"')
+    # Stack offsets index `out`; convert them to offsets in the joined text
+    offsets = [0, *accumulate(map(len, out))]
+    stack = [(bracket, offsets[opened], None if comma is None else offsets[comma]) for bracket, opened, comma in stack]
+    return "".join(out), pos, False, stack
+
+
+def _close_truncated(body: str, stack: List[Tuple[str, int, Optional[int]]]) -> Iterator[Any]:
+    """
+    Close a truncated object, yielding each decodable candidate as incomplete trailing
+    elements are dropped one at a time, so callers can take the first one that validates.
+    """
+    stack = list(stack)
+    previous = None
+    while stack:
+        closers = "".join(_CLOSERS[bracket] for bracket, _, _ in reversed(stack))
+        candidate = body.rstrip().rstrip(",:") + closers
+        if candidate != previous:
+            previous = candidate
+            try:
+                yield _loads(candidate)
+            except _DECODE_ERRORS:
+                pass
+        bracket, opened, last_comma = stack[-1]
+        if last_comma is not None:
+            # Drop the innermost container's incomplete last element
+            body = body[:last_comma]
+            stack[-1] = (bracket, opened, None)
+        elif len(body) > opened + 1:
+            body = body[:opened + 1]
+        else:
+            # Nothing complete inside; drop the container from its parent as well
+            body = body[:opened]
+            stack.pop()
+
+
+def iter_json_objects(text: str) -> Iterator[Tuple[Any, bool]]:
+    """
+    Yield every top-level JSON object found in `text`, in order, as (value, repaired).
+
+    Text around the objects (prose, Thought/Action lines, ```json fences) is skipped in
+    the same pass. A truncated final object is closed and yielded as repaired, once per
+    candidate from the least to the most trimmed.
+    """
+    pos = text.find("{")
+    while pos != -1:
+        body, end, balanced, stack = _scan_object(text, pos)
+        original = text[pos:end]
+        if balanced:
+            try:
+                yield _loads(body), body != original
+            except _DECODE_ERRORS:
+                pass
+        else:
+            for value in _close_truncated(body, stack):
+                yield value, True
+            return
+        pos = text.find("{", end)
+
+
+def extract_json(text: str) -> Optional[Any]:
+    """
+    Return the first JSON object in an LLM response, or None if there is none.
+
+    Args:
+        text (str): The raw LLM response.
+
+    Returns:
+        Optional[Any]: The decoded object.
+    """
+    for value, _repaired in iter_json_objects(text):
+        if isinstance(value, dict):
+            return value
+    return None
+
+
+def parse_model(text: str, model: Type[ModelT]) -> Optional[ModelT]:
+    """
+    Parse an LLM response straight into `model`.
+
+    Tries the whole response as JSON first, then each object in it in order, returning
+    the first one that validates. Outcomes are counted in `llm_parse_total`.
+
+    Args:
+        text (str): The raw LLM response.
+        model (Type[BaseModel]): The output model, e.g. SearchOutput or ContentOutput.
+
+    Returns:
+        Optional[BaseModel]: The validated model, or None if no object validates.
+    """
+    if not text:
+        metrics.inc("llm_parse_total", outcome="failed", model=model.__name__)
+        return None
+    try:
+        value = _loads(text)
+        if isinstance(value, dict):
+            result = model(**value)
+            metrics.inc("llm_parse_total", outcome="clean", model=model.__name__)
+            return result
+    except Exception:
+        pass
+
+    for value, repaired in iter_json_objects(text):
+        if not isinstance(value, dict):
+            continue
+        try:
+            result = model(**value)
+        except Exception:
+            continue
+        metrics.inc("llm_parse_total", outcome="repaired" if repaired else "clean", model=model.__name__)
+        return result
+
+    logger.warning(f"No JSON object in the response validates as {model.__name__}")
+    metrics.inc("llm_parse_total", outcome="failed", model=model.__name__)
+    return None
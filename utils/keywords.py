@@ -0,0 +1,72 @@
+import re
+
+_WHITESPACE = re.compile(r"\s+")
+_EDGE_PUNCTUATION = re.compile(r"^[^\w]+|[^\w]+$")
+
+
+def normalize_keywords(keywords: str) -> str:
+    """
+    Normalize keywords for use as a lookup key.
+
+    Lowercases, collapses runs of whitespace and strips leading/trailing punctuation,
+    so "  Vegan   Lasagna! " and "vegan lasagna" map to the same key.
+
+    Args:
+        keywords (str): Raw user keywords.
+
+    Returns:
+        str: Normalized keywords.
+    """
+    keywords = _WHITESPACE.sub(" ", keywords.strip().lower())
+    return _EDGE_PUNCTUATION.sub("", keywords)
+
+# Words that do not change which recipes a search returns
+STOPWORDS = frozenset({
+    "a", "an", "and", "the", "of", "for", "with", "to", "in", "on", "or", "my", "your",
+    "how", "make", "making", "recipe", "recipes", "homemade"
+})
+
+
+def _stem(word: str) -> str:
+    """Strip common English plural endings ("tomatoes" -> "tomato", "berries" -> "berry")."""
+    if len(word) <= 3 or word.endswith("ss"):
+        return word
+    if word.endswith("ies"):
+        return word[:-3] + "y"
+    if word.endswith(("oes", "ches", "shes", "xes", "sses")):
+        return word[:-2]
+    if word.endswith("s"):
+        return word[:-1]
+    return word
+
+
+def canonical_keywords(keywords: str) -> str:
+    """
+    Fold near-duplicate keywords onto one canonical form.
+
+    Applies `normalize_keywords`, drops stopwords, stems plurals and sorts the remaining
+    words, so "Vegan Lasagna recipe", "lasagna vegan" and "vegan lasagnas" share a key.
+
+    Args:
+        keywords (str): Raw user keywords.
+
+    Returns:
+        str: Canonical keywords, or the normalized keywords if every word was a stopword.
+    """
+    words = keyword_terms(keywords)
+    return " ".join(words) if words else normalize_keywords(keywords)
+
+
+def keyword_terms(keywords: str, stopwords: frozenset = STOPWORDS) -> list:
+    """
+    Return the sorted, deduplicated stemmed words of `keywords` that are not stopwords.
+
+    Args:
+        keywords (str): Raw user keywords (or any short text, such as an article title).
+        stopwords (frozenset): Words to drop.
+
+    Returns:
+        list: Stemmed terms.
+    """
+    normalized = normalize_keywords(keywords)
+    return sorted({_stem(word) for word in re.findall(r"[a-z0-9]+", normalized) if word not in stopwords})
@@ -0,0 +1,141 @@
+# Logging through a background writer thread, and the console shared by every module
+
+import atexit
+import logging
+import queue
+from logging.handlers import QueueHandler, QueueListener, RotatingFileHandler
+from typing import Optional
+
+from rich.console import Console
+from rich.logging import RichHandler
+
+from config.settings import LOG_BACKUP_COUNT, LOG_FILE, LOG_MAX_BYTES, LOG_MAX_MESSAGE_CHARS, LOG_QUEUE_SIZE
+from utils.metrics import metrics
+
+# The one rich console. A Console serializes its writes, so log lines, status messages
+# and results never interleave mid-line however many threads produce them
+console = Console()
+
+FILE_FORMAT = "%(asctime)s - %(levelname)s - %(message)s"
+
+# Console level, file level and agent/crew verbosity of each profile
+PROFILES = {
+    "default": (logging.INFO, logging.INFO, True),
+    "quiet": (logging.WARNING, logging.INFO, False),
+    "debug": (logging.DEBUG, logging.DEBUG, True),
+}
+
+# Libraries that log every HTTP request at INFO
+CHATTY_LOGGERS = ("httpx", "LiteLLM", "urllib3")
+
+metrics.describe("log_records_dropped_total", "Log records dropped because the log writer fell behind")
+
+_listener: Optional[QueueListener] = None
+_verbose = True
+
+
+def crew_verbose() -> bool:
+    """Whether agents and crews print their reasoning, under the configured profile."""
+    return _verbose
+
+
+def truncate(text: str, limit: int = LOG_MAX_MESSAGE_CHARS) -> str:
+    """Cut `text` to `limit` characters, noting how much was left out."""
+    if len(text) <= limit:
+        return text
+    return f"{text[:limit]}... [{len(text) - limit} more characters]"
+
+
+class BoundedQueueHandler(QueueHandler):
+    """
+    Hands records to the writer thread without blocking the caller.
+
+    The message is rendered and truncated to `max_chars` before it is queued, so a
+    queued record holds neither a large payload nor the objects it was built from.
+    When the queue is full, debug and info records are dropped and counted rather than
+    waited on; warnings and errors wait for room so they are never lost.
+    """
+
+    def __init__(self, record_queue: queue.Queue, max_chars: int):
+        super().__init__(record_queue)
+        self.max_chars = max_chars
+        self.dropped = 0
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        message = record.getMessage()
+        if len(message) > self.max_chars:
+            record.msg, record.args = truncate(message, self.max_chars), None
+        return super().prepare(record)
+
+    def enqueue(self, record: logging.LogRecord) -> None:
+        if record.levelno >= logging.WARNING:
+            self.queue.put(record)
+            return
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+            metrics.inc("log_records_dropped_total")
+
+
+class _Listener(QueueListener):
+    def enqueue_sentinel(self) -> None:
+        # The queue is bounded; wait for room rather than lose the stop signal
+        self.queue.put(self._sentinel)
+
+
+def configure_logging(profile: str = "default", path: str = LOG_FILE, max_bytes: int = LOG_MAX_BYTES,
+                      backup_count: int = LOG_BACKUP_COUNT, max_chars: int = LOG_MAX_MESSAGE_CHARS,
+                      queue_size: int = LOG_QUEUE_SIZE) -> None:
+    """
+    Route all logging through one background writer thread.
+
+    The root logger gets a single non-blocking queue handler; a listener thread writes
+    the records to a size-capped rotating file and to the shared console. Calling this
+    again replaces the previous configuration.
+
+    Args:
+        profile (str): "default", "quiet" (warnings only on the console, agents and
+            crews not verbose) or "debug".
+        path (str): Log file; rotated at `max_bytes`, keeping `backup_count` old files.
+        max_bytes (int): Size at which the log file is rotated.
+        backup_count (int): Rotated files kept.
+        max_chars (int): Longer messages are truncated before they are queued.
+        queue_size (int): Records waiting for the writer; beyond this, info and debug
+            records are dropped.
+    """
+    global _listener, _verbose
+    console_level, file_level, _verbose = PROFILES[profile]
+    stop_logging()
+
+    file_handler = RotatingFileHandler(path, maxBytes=max_bytes, backupCount=backup_count, encoding="utf-8")
+    file_handler.setLevel(file_level)
+    file_handler.setFormatter(logging.Formatter(FILE_FORMAT))
+    console_handler = RichHandler(console=console, show_path=False)
+    console_handler.setLevel(console_level)
+
+    record_queue = queue.Queue(maxsize=queue_size)
+    root = logging.getLogger()
+    for handler in list(root.handlers):
+        root.removeHandler(handler)
+    root.addHandler(BoundedQueueHandler(record_queue, max_chars))
+    root.setLevel(min(console_level, file_level))
+    for name in CHATTY_LOGGERS:
+        logging.getLogger(name).setLevel(logging.WARNING if profile != "debug" else logging.NOTSET)
+
+    _listener = _Listener(record_queue, file_handler, console_handler, respect_handler_level=True)
+    _listener.start()
+
+
+def stop_logging() -> None:
+    """Write out every queued record and stop the writer thread."""
+    global _listener
+    if _listener is None:
+        return
+    _listener.stop()
+    for handler in _listener.handlers:
+        handler.close()
+    _listener = None
+
+
+atexit.register(stop_logging)
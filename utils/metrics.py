@@ -0,0 +1,245 @@
+import contextvars
+import json
+import os
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+from typing import Any, Dict, Iterator, Optional, Tuple
+
+# Bucket upper bounds in seconds, from sub-millisecond parsing up to long LLM calls
+DEFAULT_BUCKETS = (0.001, 0.005, 0.01, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 20, 30, 60, 120)
+
+
+class Histogram:
+    """
+    Cumulative-bucket histogram with a bounded sample window for percentiles.
+    """
+
+    def __init__(self, buckets=DEFAULT_BUCKETS, window=2048):
+        self.buckets = tuple(buckets)
+        self.bucket_counts = [0] * len(self.buckets)
+        self.count = 0
+        self.sum = 0.0
+        self._samples = deque(maxlen=window)
+
+    def observe(self, value: float) -> None:
+        self.count += 1
+        self.sum += value
+        self._samples.append(value)
+        for i, bound in enumerate(self.buckets):
+            if value <= bound:
+                self.bucket_counts[i] += 1
+                break
+
+    def percentile(self, q: float) -> float:
+        if not self._samples:
+            return 0.0
+        ordered = sorted(self._samples)
+        return ordered[min(len(ordered) - 1, int(q * len(ordered)))]
+
+    def summary(self) -> Dict[str, float]:
+        return {
+            "count": self.count,
+            "sum": round(self.sum, 6),
+            "mean": round(self.sum / self.count, 6) if self.count else 0.0,
+            "p50": round(self.percentile(0.50), 6),
+            "p95": round(self.percentile(0.95), 6),
+            "p99": round(self.percentile(0.99), 6),
+        }
+
+
+def _label_key(labels: Dict[str, str]) -> Tuple[Tuple[str, str], ...]:
+    return tuple(sorted((name, str(value)) for name, value in labels.items()))
+
+
+def _format_labels(label_key, extra: Optional[Tuple[str, str]] = None) -> str:
+    pairs = list(label_key) + ([extra] if extra else [])
+    if not pairs:
+        return ""
+    return "{" + ",".join(f'{name}="{value}"' for name, value in pairs) + "}"
+
+
+class MetricsRegistry:
+    """
+    Thread-safe store of labelled histograms and counters.
+
+    Rendered as Prometheus text exposition format by `render_prometheus`, or as a plain
+    dict with percentiles by `snapshot`.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._histograms: Dict[str, Dict[Any, Histogram]] = {}
+        self._counters: Dict[str, Dict[Any, float]] = {}
+        self._help: Dict[str, str] = {}
+
+    def describe(self, name: str, help_text: str) -> None:
+        self._help[name] = help_text
+
+    def observe(self, name: str, value: float, **labels) -> None:
+        with self._lock:
+            series = self._histograms.setdefault(name, {})
+            key = _label_key(labels)
+            if key not in series:
+                series[key] = Histogram()
+            series[key].observe(value)
+
+    def inc(self, name: str, amount: float = 1, **labels) -> None:
+        with self._lock:
+            series = self._counters.setdefault(name, {})
+            key = _label_key(labels)
+            series[key] = series.get(key, 0) + amount
+
+    def render_prometheus(self) -> str:
+        lines = []
+        with self._lock:
+            for name, series in sorted(self._histograms.items()):
+                if name in self._help:
+                    lines.append(f"# HELP {name} {self._help[name]}")
+                lines.append(f"# TYPE {name} histogram")
+                for key, histogram in sorted(series.items()):
+                    cumulative = 0
+                    for bound, bucket_count in zip(histogram.buckets, histogram.bucket_counts):
+                        cumulative += bucket_count
+                        lines.append(f"{name}_bucket{_format_labels(key, ('le', repr(float(bound))))} {cumulative}")
+                    lines.append(f"{name}_bucket{_format_labels(key, ('le', '+Inf'))} {histogram.count}")
+                    lines.append(f"{name}_sum{_format_labels(key)} {histogram.sum}")
+                    lines.append(f"{name}_count{_format_labels(key)} {histogram.count}")
+            for name, series in sorted(self._counters.items()):
+                if name in self._help:
+                    lines.append(f"# HELP {name} {self._help[name]}")
+                lines.append(f"# TYPE {name} counter")
+                for key, value in sorted(series.items()):
+                    lines.append(f"{name}{_format_labels(key)} {value}")
+        return "\n".join(lines) + "\n"
+
+    def snapshot(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "timestamp": time.time(),
+                "histograms": {
+                    name: [{"labels": dict(key), **histogram.summary()} for key, histogram in sorted(series.items())]
+                    for name, series in self._histograms.items()
+                },
+                "counters": {
+                    name: [{"labels": dict(key), "value": value} for key, value in sorted(series.items())]
+                    for name, series in self._counters.items()
+                },
+            }
+
+    def dump_json(self, path: str) -> None:
+        """Write a snapshot to `path`, replacing it atomically."""
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(self.snapshot(), f, indent=2)
+        os.replace(tmp_path, path)
+
+
+metrics = MetricsRegistry()
+metrics.describe("pipeline_stage_seconds", "Wall time per pipeline stage")
+metrics.describe("pipeline_tokens_total", "LLM tokens used, by kind")
+metrics.describe("pipeline_retries_total", "Retried LLM requests (scope=request) or whole crew runs (scope=crew)")
+metrics.describe("db_flush_seconds", "Wall time of write-behind bulk flushes")
+
+
+class StageRecorder:
+    """
+    Per-keyword record of stage timings, token usage and retries.
+
+    Every stage is also observed in the shared `metrics` registry, and `to_dict` is
+    stored alongside the generated document.
+    """
+
+    def __init__(self, registry: MetricsRegistry = metrics):
+        self.registry = registry
+        self.stages: Dict[str, float] = {}
+        self.tokens = {"prompt": 0, "completion": 0, "total": 0, "prompt_saved": 0}
+        self.retries = 0
+        # A crew retry runs every LLM request of the crew again, so it is counted apart
+        self.crew_retries = 0
+        self._mark = time.perf_counter()
+
+    def record(self, stage: str, seconds: float) -> None:
+        self.stages[stage] = round(self.stages.get(stage, 0.0) + seconds, 6)
+        self.registry.observe("pipeline_stage_seconds", seconds, stage=stage)
+
+    @contextmanager
+    def stage(self, name: str) -> Iterator[None]:
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.record(name, time.perf_counter() - start)
+            self._mark = time.perf_counter()
+
+    def mark(self) -> None:
+        """Start timing from now; the next `lap` measures from this point."""
+        self._mark = time.perf_counter()
+
+    def lap(self, stage: str) -> None:
+        """Record the time since the previous mark or lap as `stage`."""
+        now = time.perf_counter()
+        self.record(stage, now - self._mark)
+        self._mark = now
+
+    def add_tokens(self, prompt: int = 0, completion: int = 0, total: int = 0) -> None:
+        total = total or prompt + completion
+        self.tokens["prompt"] += prompt
+        self.tokens["completion"] += completion
+        self.tokens["total"] += total
+        self.registry.inc("pipeline_tokens_total", prompt, kind="prompt")
+        self.registry.inc("pipeline_tokens_total", completion, kind="completion")
+
+    def add_tokens_saved(self, saved: int) -> None:
+        self.tokens["prompt_saved"] += saved
+
+    def add_retry(self, stage: str, scope: str = "request") -> None:
+        if scope == "crew":
+            self.crew_retries += 1
+        else:
+            self.retries += 1
+        self.registry.inc("pipeline_retries_total", stage=stage, scope=scope)
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "stages": dict(self.stages),
+            "tokens": dict(self.tokens),
+            "retries": self.retries,
+            "crew_retries": self.crew_retries,
+        }
+
+
+current_recorder: contextvars.ContextVar[Optional[StageRecorder]] = contextvars.ContextVar(
+    "current_recorder", default=None
+)
+
+
+@contextmanager
+def timed_stage(name: str) -> Iterator[None]:
+    """
+    Time a block as stage `name` on the current keyword's recorder, or straight into the
+    shared registry when no recorder is active.
+    """
+    recorder = current_recorder.get()
+    if recorder:
+        with recorder.stage(name):
+            yield
+        return
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        metrics.observe("pipeline_stage_seconds", time.perf_counter() - start, stage=name)
+
+
+def record_task_completion(stage: str):
+    """
+    Build a crew Task callback that records the time since the previous task finished
+    (or since kickoff) as `stage`.
+    """
+    def callback(_task_output):
+        recorder = current_recorder.get()
+        if recorder:
+            recorder.lap(stage)
+    return callback
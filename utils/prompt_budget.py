@@ -0,0 +1,156 @@
+import json
+import logging
+import math
+import threading
+from dataclasses import dataclass
+from typing import Any, Dict, List, Optional
+
+from models.task_outputs import SearchOutput
+from utils.metrics import current_recorder, metrics
+
+logger = logging.getLogger(__name__)
+
+# Characters per token for the fallback estimate; close to what BPE tokenizers give for English
+CHARS_PER_TOKEN = 4
+
+metrics.describe("prompt_tokens_saved_total", "Prompt tokens removed by search-result compaction")
+
+_encoding = None
+_encoding_failed = False
+_encoding_lock = threading.Lock()
+
+
+def _get_encoding():
+    global _encoding, _encoding_failed
+    if _encoding is not None or _encoding_failed:
+        return _encoding
+    with _encoding_lock:
+        if _encoding is None and not _encoding_failed:
+            try:
+                import tiktoken
+                _encoding = tiktoken.get_encoding("cl100k_base")
+            except Exception as e:
+                # Not installed, or the encoding file cannot be downloaded; estimate instead
+                logger.info(f"tiktoken unavailable ({type(e).__name__}); estimating tokens from length")
+                _encoding_failed = True
+    return _encoding
+
+
+def count_tokens(text: str) -> int:
+    """
+    Count prompt tokens locally.
+
+    Uses tiktoken's cl100k_base encoding when it is available. That is not the Llama
+    tokenizer, but it is within a few percent for English prose and JSON. Otherwise the
+    count is estimated as one token per four characters.
+    """
+    encoding = _get_encoding()
+    if encoding is not None:
+        return len(encoding.encode(text, disallowed_special=()))
+    return math.ceil(len(text) / CHARS_PER_TOKEN)
+
+
+@dataclass
+class CompactedSearchResults:
+    text: str
+    tokens: int
+    original_tokens: int
+    recipes_kept: int
+    recipes_total: int
+
+    @property
+    def tokens_saved(self) -> int:
+        return max(0, self.original_tokens - self.tokens)
+
+
+def _truncate(step: str, max_chars: int) -> str:
+    return step if len(step) <= max_chars else step[:max_chars - 1].rstrip() + "…"
+
+
+def _compact_payload(search_results: SearchOutput, recipes: int, max_steps: int,
+                     max_step_chars: int, max_ingredients: Optional[int]) -> Dict[str, Any]:
+    # Recipes are merged into one article, so a single deduplicated ingredient list is enough
+    seen = set()
+    ingredients: List[str] = []
+    for recipe in search_results.recipes[:recipes]:
+        for ingredient in recipe.ingredients:
+            key = " ".join(ingredient.lower().split())
+            if key and key not in seen:
+                seen.add(key)
+                ingredients.append(ingredient.strip())
+    if max_ingredients is not None:
+        ingredients = ingredients[:max_ingredients]
+
+    return {
+        "ingredients": ingredients,
+        "recipes": [
+            {
+                "title": recipe.title,
+                "source": recipe.source,
+                "steps": [_truncate(step, max_step_chars) for step in recipe.instructions[:max_steps]],
+            }
+            for recipe in search_results.recipes[:recipes]
+        ],
+    }
+
+
+def compact_search_results(search_results: SearchOutput, budget: int, max_steps: int = 12,
+                           max_step_chars: int = 300) -> CompactedSearchResults:
+    """
+    Render search results for a prompt within a token budget.
+
+    Ingredients are deduplicated across recipes, JSON is written without whitespace,
+    and long instruction lists and steps are truncated. If the result is still over
+    `budget`, steps are cut further, then lower-ranked recipes are dropped, then the
+    ingredient list is shortened.
+
+    Args:
+        search_results (SearchOutput): The search results containing recipes.
+        budget (int): Maximum tokens for the rendered search results.
+        max_steps (int): Instruction steps kept per recipe before budgeting.
+        max_step_chars (int): Characters kept per instruction step.
+
+    Returns:
+        CompactedSearchResults: The compact JSON text with token counts before and after.
+    """
+    original_tokens = count_tokens(json.dumps(search_results.dict(), indent=2))
+    recipes = len(search_results.recipes)
+    max_ingredients: Optional[int] = None
+
+    while True:
+        payload = _compact_payload(search_results, recipes, max_steps, max_step_chars, max_ingredients)
+        text = json.dumps(payload, ensure_ascii=False, separators=(",", ":"))
+        tokens = count_tokens(text)
+        if tokens <= budget:
+            break
+        if max_steps > 3:
+            max_steps = max(3, max_steps // 2)
+        elif recipes > 1:
+            recipes -= 1
+        elif max_step_chars > 120:
+            max_step_chars = 120
+        elif max_ingredients is None or max_ingredients > 5:
+            max_ingredients = max(5, (max_ingredients or len(payload["ingredients"])) // 2)
+        else:
+            # Nothing left worth cutting; send the smallest rendering we have
+            break
+
+    return CompactedSearchResults(
+        text=text,
+        tokens=tokens,
+        original_tokens=original_tokens,
+        recipes_kept=recipes,
+        recipes_total=len(search_results.recipes),
+    )
+
+
+def record_compaction(keywords: str, compacted: CompactedSearchResults) -> None:
+    """Log the savings for one request and add them to the metrics and current recorder."""
+    logger.info(
+        f"Prompt for '{keywords}': search results {compacted.original_tokens} -> {compacted.tokens} tokens "
+        f"(saved {compacted.tokens_saved}, {compacted.recipes_kept}/{compacted.recipes_total} recipes)"
+    )
+    metrics.inc("prompt_tokens_saved_total", compacted.tokens_saved)
+    recorder = current_recorder.get()
+    if recorder:
+        recorder.add_tokens_saved(compacted.tokens_saved)
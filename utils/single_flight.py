@@ -0,0 +1,50 @@
+import asyncio
+from typing import Any, Awaitable, Callable, Dict
+
+
+class SingleFlight:
+    """
+    Coalesce concurrent calls for the same key onto a single execution.
+
+    The first caller for a key starts the work; callers arriving while it is still
+    running await the same task instead of starting their own. Once the task finishes
+    the key is released, so later calls run fresh (or hit whatever cache sits below).
+    Must be used from a single event loop.
+    """
+
+    def __init__(self):
+        self.executions = 0
+        self.coalesced = 0
+        self._in_flight: Dict[str, asyncio.Task] = {}
+
+    def in_flight(self, key: str) -> bool:
+        return key in self._in_flight
+
+    async def do(self, key: str, fn: Callable[[], Awaitable[Any]]) -> Any:
+        """
+        Run `fn()` for `key`, or join the execution already in flight.
+
+        Args:
+            key (str): Coalescing key, e.g. normalized keywords.
+            fn (Callable[[], Awaitable[Any]]): Coroutine factory for the work.
+
+        Returns:
+            Any: The shared result. Exceptions are re-raised to every caller.
+        """
+        task = self._in_flight.get(key)
+        if task is None:
+            self.executions += 1
+            task = asyncio.ensure_future(fn())
+            self._in_flight[key] = task
+            task.add_done_callback(lambda _: self._in_flight.pop(key, None))
+        else:
+            self.coalesced += 1
+        # Shield so one caller disconnecting does not cancel the work for the others
+        return await asyncio.shield(task)
+
+    def stats(self) -> Dict[str, int]:
+        return {
+            "executions": self.executions,
+            "coalesced": self.coalesced,
+            "in_flight": len(self._in_flight),
+        }
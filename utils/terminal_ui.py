@@ -1,17 +1,40 @@
+import io
 import rich
 from rich.console import Console
 from rich.panel import Panel
 from rich.text import Text
-from crewai.crews import CrewOutput
 from rich.progress import Progress, SpinnerColumn, TextColumn
 from rich.table import Table
 import time
 from models.task_outputs import ContentOutput
 from rich.markdown import Markdown
+from rich.live import Live
+from rich.console import Group
+from utils.logging_setup import console as shared_console
+
+def content_markdown(fields):
+    """Markdown layout for ContentOutput fields; sections whose field is missing are left out."""
+    sections = [f"# {fields['title']}\n" if "title" in fields else ""]
+    for heading, name in (("Introduction", "introduction"), ("Ingredients", "ingredients"),
+                          ("Instructions", "instructions"), ("SEO Optimization", "seo_optimized_text")):
+        if name in fields:
+            value = fields[name]
+            if isinstance(value, list):
+                # Ingredients as a bullet list, instructions as numbered steps
+                marker = "1." if name == "instructions" else "-"
+                value = "\n".join(f"{marker} {item}" for item in value)
+            sections.append(f"## {heading}\n{value}\n")
+    return "\n".join(sections)
+
+def content_html(fields, width=100):
+    """Standalone HTML page of ContentOutput fields, rendered exactly as display_result shows them."""
+    console = Console(record=True, file=io.StringIO(), width=width)
+    console.print(Markdown(content_markdown(fields)))
+    return console.export_html(inline_styles=True)
 
 class TerminalUI:
     def __init__(self):
-        self.console = Console()
+        self.console = shared_console
     
     def display_welcome_message(self):
         message = "Welcome to the AI-powered Recipe Content Generator!"
@@ -25,20 +48,7 @@ class TerminalUI:
 
     def display_result(self, content):
         if isinstance(content, ContentOutput):
-            markdown_content = f"""# {content.title}
-
-## Introduction
-{content.introduction}
-
-## Ingredients
-{content.ingredients}
-
-## Instructions
-{content.instructions}
-
-## SEO Optimization
-{content.seo_optimized_text}
-"""
+            markdown_content = content_markdown(content.dict())
         else:
             # Fallback for TaskOutput or other types
             markdown_content = f"""# Recipe Result
@@ -47,6 +57,35 @@ class TerminalUI:
 """
         self.console.print(Markdown(markdown_content))
 
+    async def display_streaming_result(self, events):
+        """Render a content stream live, filling in sections as their fields complete."""
+        fields = {}
+        tail = ""
+        content = None
+        failed = False
+        with Live(Markdown(""), console=self.console, refresh_per_second=8) as live:
+            async for event in events:
+                if event.kind == "token":
+                    # Show the text still being written below the completed sections
+                    tail = (tail + event.token)[-300:]
+                elif event.kind == "field":
+                    fields[event.field] = event.value
+                    tail = ""
+                elif event.kind == "done":
+                    if event.failed:
+                        # Keep what was streamed rather than showing the placeholder article
+                        failed = True
+                        tail = "The response could not be parsed; nothing was saved."
+                    else:
+                        content = event.content
+                        fields = content.dict()
+                        tail = ""
+                live.update(Group(
+                    Markdown(content_markdown(fields)),
+                    Text(tail, style="bold red" if failed else "dim")
+                ))
+        return content
+
     def display_agent_status(self, agent_name, status):
         status_text = Text()
         status_text.append(f"{agent_name}: ", style="bold cyan")
@@ -75,6 +114,115 @@ class TerminalUI:
 
         self.console.print(table)
 
+    def display_batch_result(self, keyword_result, total):
+        status = "[bold green]done[/bold green]" if keyword_result.succeeded else f"[bold red]failed[/bold red] ({keyword_result.error})"
+        self.console.print(
+            f"[{keyword_result.index + 1}/{total}] [cyan]{keyword_result.keywords}[/cyan] "
+            f"{status} in {keyword_result.latency:.2f}s"
+        )
+
+    def display_batch_summary(self, report):
+        latencies = sorted(item.latency for item in report.results)
+        table = Table(title="Batch Summary")
+        table.add_column("Metric", style="cyan")
+        table.add_column("Value", style="green")
+
+        table.add_row("Keywords", str(len(report.results)))
+        table.add_row("Succeeded", str(report.succeeded))
+        table.add_row("Failed", str(report.failed))
+        table.add_row("Concurrency", str(report.concurrency))
+        table.add_row("Wall time", f"{report.wall_time:.2f}s")
+        table.add_row("Throughput", f"{report.throughput:.2f} keywords/s")
+        if latencies:
+            table.add_row("Mean latency", f"{sum(latencies) / len(latencies):.2f}s")
+            table.add_row("Max latency", f"{latencies[-1]:.2f}s")
+
+        self.console.print(table)
+
+    def display_stage_metrics(self, snapshot):
+        table = Table(title="Stage Latency")
+        table.add_column("Stage", style="cyan")
+        table.add_column("Count", justify="right")
+        table.add_column("Mean", justify="right")
+        table.add_column("p50", justify="right")
+        table.add_column("p95", justify="right")
+        table.add_column("p99", justify="right", style="bold red")
+
+        for series in snapshot["histograms"].get("pipeline_stage_seconds", []):
+            table.add_row(
+                series["labels"].get("stage", ""),
+                str(series["count"]),
+                *(f"{series[key]:.3f}s" for key in ("mean", "p50", "p95", "p99"))
+            )
+
+        self.console.print(table)
+
+    def display_cache_stats(self, title, stats):
+        table = Table(title=title)
+        table.add_column("Metric", style="cyan")
+        table.add_column("Value", style="green")
+
+        for name, value in stats.items():
+            if isinstance(value, float):
+                value = f"{value:.1%}" if name.endswith("rate") else f"{value:.2f}"
+            table.add_row(name.replace("_", " ").capitalize(), str(value))
+
+        self.console.print(table)
+
+    def display_history(self, documents, next_cursor):
+        table = Table(title="Generated Articles")
+        table.add_column("Created", style="cyan")
+        table.add_column("Keywords", style="magenta")
+        table.add_column("Title", style="green")
+        table.add_column("Ingredients", justify="right")
+        table.add_column("ID", style="dim")
+
+        for document in documents:
+            content = document.get("content") or {}
+            created_at = document.get("created_at")
+            table.add_row(
+                created_at.strftime("%Y-%m-%d %H:%M") if created_at else "-",
+                document.get("keywords", ""),
+                content.get("title", "-"),
+                str(len(content.get("ingredients") or [])),
+                str(document["_id"])
+            )
+
+        self.console.print(table)
+        if next_cursor:
+            self.console.print(f"[bold blue]More results: --cursor {next_cursor}[/bold blue]")
+
+    def display_jobs(self, jobs):
+        table = Table(title="Batch Jobs")
+        table.add_column("Job", style="cyan")
+        table.add_column("Created", style="magenta")
+        table.add_column("Status", style="green")
+        table.add_column("Keywords", justify="right")
+        table.add_column("Done", justify="right")
+        table.add_column("Failed", justify="right")
+        table.add_column("Remaining", justify="right")
+
+        for job in jobs:
+            states = job.get("states")
+            table.add_row(
+                str(job["_id"]),
+                job["created_at"].strftime("%Y-%m-%d %H:%M"),
+                job.get("status", "-"),
+                str(job.get("total", 0)),
+                str(states.get("done", 0)) if states is not None else "-",
+                str(states.get("failed", 0)) if states is not None else "-",
+                str(states.get("pending", 0) + states.get("running", 0)) if states is not None else "-",
+            )
+
+        self.console.print(table)
+
+    def display_failed_job_keywords(self, items):
+        for item in items:
+            self.console.print(
+                f"[bold red]failed[/bold red] [cyan]{item['keywords']}[/cyan] "
+                f"after {item['attempts']} attempts: {item.get('error') or 'unknown error'}"
+            )
+
     def display_goodbye_message(self):
         self.console.print("\nThank you for using the Recipe Content Generator. Goodbye!", style="bold green")
 